@@ -0,0 +1,247 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from google import genai
+from google.genai import types
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Cheapest first; later models are only tried (or hedged in) when earlier ones are slow or failing
+DEFAULT_MODELS = ['gemini-2.0-flash-lite', 'gemini-2.0-flash', 'gemini-2.5-flash']
+
+# Point at a local fake Gemini server in development/tests, e.g. http://127.0.0.1:8089/
+GEMINI_BASE_URL = os.environ.get('GEMINI_BASE_URL', '')
+HEDGE_AFTER = float(os.environ.get('AI_HEDGE_AFTER', 2.0))
+LATENCY_BUDGET = float(os.environ.get('AI_LATENCY_BUDGET', 20.0))
+
+_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('AI_WORKERS', 8)), thread_name_prefix='moneymate-ai')
+_clients = TTLCache(maxsize=256, ttl=3600)
+
+
+class AIServiceError(Exception):
+    """No model produced a response within the latency budget"""
+    def __init__(self, message, last_error=None):
+        super().__init__(message)
+        self.last_error = last_error
+
+
+def is_rate_limited(error):
+    error_str = str(error)
+    return '429' in error_str or 'RESOURCE_EXHAUSTED' in error_str
+
+
+class CircuitBreaker:
+    """
+    Stops sending traffic to a model after repeated failures (or immediately
+    after a rate limit) and lets a single trial request through once the
+    cooldown has passed.
+    """
+    def __init__(self, failure_threshold=3, reset_timeout=30.0, rate_limit_timeout=60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.rate_limit_timeout = rate_limit_timeout
+        self.failures = 0
+        self.open_until = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.open_until == 0.0:
+            return 'closed'
+        return 'open' if time.monotonic() < self.open_until else 'half-open'
+
+    def allow(self):
+        with self._lock:
+            if self.open_until == 0.0:
+                return True
+            if time.monotonic() < self.open_until or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.open_until = 0.0
+            self._trial_in_flight = False
+
+    def record_failure(self, rate_limited=False):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if rate_limited:
+                self.open_until = time.monotonic() + self.rate_limit_timeout
+            elif self.failures >= self.failure_threshold:
+                self.open_until = time.monotonic() + self.reset_timeout
+
+    def release(self):
+        """Give up a trial that ended without an outcome so the next request can try again"""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(api_key, model):
+    """Breakers are per (key, model) since Gemini quotas are per project and per model"""
+    key = (api_key, model)
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = _breakers[key] = CircuitBreaker()
+        return breaker
+
+
+def get_client(api_key):
+    """Shared genai client per API key, honouring GEMINI_BASE_URL"""
+    def build():
+        if GEMINI_BASE_URL:
+            return genai.Client(api_key=api_key, http_options=types.HttpOptions(base_url=GEMINI_BASE_URL))
+        return genai.Client(api_key=api_key)
+    return _clients.get_or_load(api_key, build)
+
+
+def _call_model(client, model, contents, config):
+    response = client.models.generate_content(model=model, contents=contents, config=config)
+    return response.text
+
+
+def _record_outcome(breaker, model):
+    """
+    Done-callback that reports a call's result to its breaker, including calls
+    that finish after generate() has already returned or given up on them, so
+    a half-open trial is never left in flight.
+    """
+    def record(future):
+        if future.cancelled():
+            breaker.release()
+            return
+        error = future.exception()
+        if error is not None:
+            logger.warning(f"Model {model} failed: {error}")
+            breaker.record_failure(rate_limited=is_rate_limited(error))
+        elif future.result():
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+    return record
+
+
+def generate(api_key, contents, config=None, models=None, hedge_after=None, budget=None):
+    """
+    Return the text of the first successful response across `models`.
+
+    The first model whose breaker is closed is called straight away. If it
+    has not answered after `hedge_after` seconds, or it fails, the next model
+    is started in parallel, and so on. Whichever answers first wins. Raises
+    AIServiceError when every model fails or `budget` seconds elapse.
+    """
+    models = models or DEFAULT_MODELS
+    hedge_after = HEDGE_AFTER if hedge_after is None else hedge_after
+    deadline = time.monotonic() + (LATENCY_BUDGET if budget is None else budget)
+    client = get_client(api_key)
+
+    candidates = list(models)
+    pending = {}
+    last_error = None
+
+    def launch():
+        # Breakers are consulted only when a model is actually about to be called
+        while candidates:
+            model = candidates.pop(0)
+            breaker = get_breaker(api_key, model)
+            if breaker.allow():
+                future = _executor.submit(_call_model, client, model, contents, config)
+                future.add_done_callback(_record_outcome(breaker, model))
+                pending[future] = model
+                return True
+        return False
+
+    if not launch():
+        raise AIServiceError('All models are cooling down after recent failures')
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        done, _ = wait(pending, timeout=min(remaining, hedge_after) if candidates else remaining,
+                       return_when=FIRST_COMPLETED)
+        if not done:
+            if candidates and launch():
+                logger.info(f"Hedged Gemini request with {list(pending.values())[-1]}")
+            continue
+
+        # Breakers are updated by each future's done-callback, winners and losers alike
+        for future in done:
+            model = pending.pop(future)
+            try:
+                text = future.result()
+            except Exception as e:
+                last_error = e
+                continue
+            if text:
+                return text
+            last_error = AIServiceError(f'{model} returned an empty response')
+
+        if not pending:
+            launch()
+
+    raise AIServiceError('No model responded within the latency budget', last_error)
+
+
+def _open_stream(client, model, contents, config):
+    return client.models.generate_content_stream(model=model, contents=contents, config=config)
+
+
+def stream(api_key, contents, config=None, models=None):
+    """
+    Yield response text chunks as Gemini produces them.
+
+    Models are tried in order (skipping open breakers) until one produces its
+    first chunk; a model that fails before that point falls through to the
+    next one at no cost to the user. Once text has been yielded, a failure is
+    raised as AIServiceError since the partial answer cannot be retracted.
+    """
+    models = models or DEFAULT_MODELS
+    client = get_client(api_key)
+    last_error = None
+
+    for model in models:
+        breaker = get_breaker(api_key, model)
+        if not breaker.allow():
+            continue
+        started = settled = False
+        try:
+            for chunk in _open_stream(client, model, contents, config):
+                text = chunk.text
+                if not text:
+                    continue
+                if not started:
+                    started = settled = True
+                    breaker.record_success()
+                yield text
+        except Exception as e:
+            logger.warning(f"Model {model} stream failed: {e}")
+            if started:
+                raise AIServiceError('Response stream was interrupted', e)
+            breaker.record_failure(rate_limited=is_rate_limited(e))
+            settled = True
+            last_error = e
+            continue
+        finally:
+            # Closed or killed (client gone, worker timeout) before the model answered
+            if not settled:
+                breaker.release()
+        if started:
+            return
+        breaker.record_failure()
+        last_error = AIServiceError(f'{model} returned an empty response')
+
+    raise AIServiceError('No model produced a response', last_error)
@@ -1,35 +1,52 @@
 import os
 import io
+import base64
+import hashlib
 import csv
 import json
 import time
 import random
 import string
+import re
 import logging
 import calendar
+import threading
+import struct
 from calendar import monthrange
 from functools import wraps
-from datetime import datetime, timedelta
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, wait
+from decimal import Decimal
+from types import SimpleNamespace
+from datetime import datetime, timedelta, timezone
 from collections import defaultdict
 
-from flask import Flask, render_template, request, redirect, send_file, flash, jsonify, session, url_for
+from flask import Flask, Response, render_template, request, redirect, send_file, flash, jsonify, session, url_for, g, has_app_context, stream_with_context, abort
 from flask_migrate import Migrate
 from flask_wtf.csrf import CSRFProtect
 from flask_mail import Mail, Message
-from google import genai
+from sqlalchemy.exc import OperationalError, ProgrammingError
 from google.genai import types
 import requests
+import click
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
 from reportlab.lib.enums import TA_CENTER
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional: only the columnar export needs it
+    pa = pq = None
 
 from dotenv import load_dotenv
 load_dotenv()
 
-from models import db, Expense, Budget, SavingsGoal, Income, RecurringExpense, User, Achievement, BADGE_CATALOG
+import ai_client
+from cache import TTLCache
+from models import db, Expense, Budget, SavingsGoal, Income, RecurringExpense, User, Achievement, MonthlyRollup, ExpenseCategory, ExchangeRateSnapshot, UserTips, FinancialSnapshot, ExportCursor, OutboxEmail, ReminderLog, DigestLog, UserStats, CategoryMonthTotal, ExpenseDay, IncomeSource, BADGE_CATALOG
 
 app = Flask(__name__)
 logger = logging.getLogger(__name__)
@@ -46,14 +63,25 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
 app.config['WTF_CSRF_TIME_LIMIT'] = None
 app.config['GEMINI_API_KEY'] = os.environ.get('GEMINI_API_KEY', '')
+app.config['BACKGROUND_WORKERS'] = os.environ.get('BACKGROUND_WORKERS', '1') == '1'
+app.config['EXCHANGE_RATE_SOURCE'] = os.environ.get('EXCHANGE_RATE_SOURCE', 'open.er-api')
+app.config['RATE_REFRESH_INTERVAL'] = int(os.environ.get('RATE_REFRESH_INTERVAL', 3600))
+# Post due recurring expenses from the web process; set to 0 when `flask post-recurring` runs from cron instead
+app.config['POST_RECURRING'] = os.environ.get('POST_RECURRING', '1') == '1'
+# Queue due reminders and monthly digests from the web process; set to 0 when `flask send-digests` runs from cron
+app.config['SEND_DIGESTS'] = os.environ.get('SEND_DIGESTS', '1') == '1'
+app.config['REPORT_CACHE_DIR'] = os.environ.get('REPORT_CACHE_DIR', os.path.join(app.instance_path, 'reports'))
 
-# Email Configuration (Gmail)
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
+# Email Configuration (Gmail by default; point MAIL_SERVER at a local debug server such as
+# `python -m aiosmtpd -n -l localhost:1025` with MAIL_PORT=1025 MAIL_USE_TLS=0 for testing)
+app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
+app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', 587))
+app.config['MAIL_USE_TLS'] = os.environ.get('MAIL_USE_TLS', '1') == '1'
 app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME')
 app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD')
-app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_USERNAME')
+app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_DEFAULT_SENDER', os.environ.get('MAIL_USERNAME') or 'money-mate@localhost')
+# Without credentials or a configured server, queued emails are printed to the console instead
+app.config['MAIL_CONSOLE'] = not (app.config['MAIL_USERNAME'] or os.environ.get('MAIL_SERVER'))
 
 FALLBACK_TIPS = {
     'budgets': [
@@ -76,14 +104,6 @@ FALLBACK_TIPS = {
     ]
 }
 
-client = None
-if app.config['GEMINI_API_KEY']:
-    try:
-        client = genai.Client(api_key=app.config['GEMINI_API_KEY'])
-    except Exception as e:
-        logger.warning(f"Could not initialize Gemini client: {e}")
-        client = None
-
 db.init_app(app)
 migrate = Migrate(app, db)
 csrf = CSRFProtect(app)
@@ -210,28 +230,91 @@ def get_or_sync_local_user(user_data):
             
     return local_user
 
-# Currency conversion via API (base currency: INR)
-API_RATES_CACHE = {}
-LAST_FETCHED = None
-
-def get_exchange_rates():
-    global API_RATES_CACHE, LAST_FETCHED
-    now = datetime.now()
-    if not API_RATES_CACHE or (LAST_FETCHED and (now - LAST_FETCHED).total_seconds() > 3600):
-        try:
-            response = requests.get('https://open.er-api.com/v6/latest/INR', timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                API_RATES_CACHE = data.get('rates', {})
-                LAST_FETCHED = now
-        except Exception as e:
-            logger.warning(f"Failed to fetch exchange rates: {e}")
-    return API_RATES_CACHE
-
+# Currency conversion via persisted rate snapshots (base currency: INR).
+# Request threads only ever read the latest snapshot; the background refresher
+# (or `flask refresh-rates`) is the only thing that talks to the rate API.
 SYMBOL_TO_ISO = {'₹': 'INR', '$': 'USD', '€': 'EUR', '£': 'GBP', '¥': 'JPY'}
 ISO_TO_SYMBOL = {'INR': '₹', 'USD': '$', 'EUR': '€', 'GBP': '£', 'JPY': '¥'}
 STATIC_FALLBACK = {'INR': 1.0, 'USD': 0.012, 'EUR': 0.011, 'GBP': 0.0094, 'JPY': 1.80}
 
+SNAPSHOT_READ_TTL = 60  # seconds a worker reuses the snapshot it last read
+SNAPSHOT_RETENTION_DAYS = 7
+_rates_lock = threading.Lock()
+_rates_state = {'rates': {}, 'fetched_at': None, 'read_at': None}
+
+def fetch_open_er_rates():
+    response = requests.get('https://open.er-api.com/v6/latest/INR', timeout=5)
+    response.raise_for_status()
+    return response.json().get('rates', {})
+
+def fetch_stub_rates():
+    """Offline rate source for local development and tests"""
+    return dict(STATIC_FALLBACK)
+
+RATE_SOURCES = {
+    'open.er-api': fetch_open_er_rates,
+    'stub': fetch_stub_rates,
+}
+
+def refresh_exchange_rates(force=False):
+    """
+    Store a new rate snapshot if the latest one is older than RATE_REFRESH_INTERVAL.
+    Runs on the background refresher or the CLI, never on a request thread.
+    """
+    now = datetime.now()
+    latest = ExchangeRateSnapshot.query.order_by(ExchangeRateSnapshot.fetched_at.desc()).first()
+    if latest and not force and (now - latest.fetched_at).total_seconds() < app.config['RATE_REFRESH_INTERVAL']:
+        return latest
+    
+    source = app.config['EXCHANGE_RATE_SOURCE']
+    try:
+        rates = RATE_SOURCES[source]()
+    except Exception as e:
+        logger.warning(f"Failed to fetch exchange rates from {source}: {e}")
+        return latest
+    if not rates:
+        return latest
+    
+    snapshot = ExchangeRateSnapshot(base='INR', source=source, rates=json.dumps(rates), fetched_at=now)
+    db.session.add(snapshot)
+    ExchangeRateSnapshot.query.filter(
+        ExchangeRateSnapshot.fetched_at < now - timedelta(days=SNAPSHOT_RETENTION_DAYS)
+    ).delete()
+    db.session.commit()
+    return snapshot
+
+def get_exchange_rates():
+    """Rates from the latest persisted snapshot, re-read from the database at most once a minute per worker"""
+    with _rates_lock:
+        read_at = _rates_state['read_at']
+        if read_at is not None and time.monotonic() - read_at < SNAPSHOT_READ_TTL:
+            return _rates_state['rates']
+        _rates_state['read_at'] = time.monotonic()
+    try:
+        latest = ExchangeRateSnapshot.query.order_by(ExchangeRateSnapshot.fetched_at.desc()).first()
+        if latest:
+            with _rates_lock:
+                _rates_state['rates'] = json.loads(latest.rates)
+                _rates_state['fetched_at'] = latest.fetched_at
+    except Exception as e:
+        logger.warning(f"Failed to read exchange rate snapshot: {e}")
+    return _rates_state['rates']
+
+def get_rates_age():
+    """Seconds since the snapshot being served was fetched, or None when running on static fallback rates"""
+    get_exchange_rates()
+    fetched_at = _rates_state['fetched_at']
+    return (datetime.now() - fetched_at).total_seconds() if fetched_at else None
+
+def describe_stale_rates():
+    """Short age label such as '5h' when the served snapshot is past its refresh interval"""
+    age = get_rates_age()
+    if age is None or age < app.config['RATE_REFRESH_INTERVAL']:
+        return None
+    if age < 86400:
+        return f"{int(age // 3600)}h"
+    return f"{int(age // 86400)}d"
+
 def get_currency():
     curr = session.get('currency', '₹')
     return ISO_TO_SYMBOL.get(curr, curr) if len(curr) > 1 else curr
@@ -244,16 +327,33 @@ def set_currency(currency):
     session['currency'] = currency
 
 def get_currency_rate(target_currency):
+    # Resolve each currency once per request/app context; later lookups are a dict hit
+    memo = g.setdefault('currency_rates', {}) if has_app_context() else {}
+    if target_currency in memo:
+        return memo[target_currency]
     rates = get_exchange_rates()
     iso = SYMBOL_TO_ISO.get(target_currency, target_currency)
     if rates and iso in rates:
-        return rates[iso]
-    return STATIC_FALLBACK.get(iso, 1.0)
+        rate = rates[iso]
+    else:
+        rate = STATIC_FALLBACK.get(iso, 1.0)
+    memo[target_currency] = rate
+    return rate
 
 def convert_amount(amount, target_currency='₹'):
     rate = get_currency_rate(target_currency)
     return float(amount) * rate
 
+def convert_amounts(amounts, target_currency='₹'):
+    """Convert a whole column of amounts with a single rate lookup"""
+    rate = get_currency_rate(target_currency)
+    return [float(amount) * rate for amount in amounts]
+
+def convert_totals(totals, target_currency='₹'):
+    """Convert the values of a {key: amount} mapping with a single rate lookup"""
+    rate = get_currency_rate(target_currency)
+    return {key: float(amount) * rate for key, amount in totals.items()}
+
 def get_conversion_info(currency):
     iso = SYMBOL_TO_ISO.get(currency, currency)
     if iso == 'INR':
@@ -271,6 +371,1017 @@ def get_month_range(year, month):
     end = datetime(year, month, last_day).date()
     return start, end
 
+def shift_month(day, months):
+    """First day of the month that is `months` away from the month containing `day`"""
+    index = day.year * 12 + (day.month - 1) + months
+    return datetime(index // 12, index % 12 + 1, 1).date()
+
+# ==================== MONTHLY ROLLUPS ====================
+def apply_rollup_deltas(user_id, deltas):
+    """
+    Apply {month_start: [expense_amount, expense_count, income_amount, income_count]}
+    to the user's MonthlyRollup rows. Increments are emitted as SQL expressions so
+    concurrent writers don't overwrite each other. The caller commits.
+    """
+    rollups = {r.month_start: r for r in MonthlyRollup.query.filter(
+        MonthlyRollup.user_id == user_id, MonthlyRollup.month_start.in_(list(deltas))
+    )} if deltas else {}
+    for month_start, (expense_amount, expense_count, income_amount, income_count) in deltas.items():
+        rollup = rollups.get(month_start)
+        if rollup is None:
+            db.session.add(MonthlyRollup(user_id=user_id, month_start=month_start,
+                                         expense_total=Decimal(str(expense_amount)), expense_count=expense_count,
+                                         income_total=Decimal(str(income_amount)), income_count=income_count))
+            continue
+        rollup.expense_total = MonthlyRollup.expense_total + Decimal(str(expense_amount))
+        rollup.expense_count = MonthlyRollup.expense_count + expense_count
+        rollup.income_total = MonthlyRollup.income_total + Decimal(str(income_amount))
+        rollup.income_count = MonthlyRollup.income_count + income_count
+
+def snapshot_expense(expense):
+    """Detached copy of the fields derived tables care about, taken before an edit"""
+    return SimpleNamespace(user_id=expense.user_id, date=expense.date, category=expense.category,
+                           amount=expense.amount, payment_method=expense.payment_method)
+
+def apply_category_deltas(user_id, deltas):
+    """Apply {category: expense_count_delta} to the user's category registry. The caller commits."""
+    categories = {c.name: c for c in ExpenseCategory.query.filter(
+        ExpenseCategory.user_id == user_id, ExpenseCategory.name.in_(list(deltas))
+    )} if deltas else {}
+    for name, count in deltas.items():
+        category = categories.get(name)
+        if category is None:
+            db.session.add(ExpenseCategory(user_id=user_id, name=name, expense_count=count))
+            continue
+        category.expense_count = ExpenseCategory.expense_count + count
+
+def apply_category_month_deltas(user_id, deltas):
+    """Apply {(category, month_start): [amount, count]} to the user's CategoryMonthTotal rows. The caller commits."""
+    totals = {(t.category, t.month_start): t for t in CategoryMonthTotal.query.filter(
+        CategoryMonthTotal.user_id == user_id,
+        CategoryMonthTotal.month_start.in_({month for _category, month in deltas}),
+        CategoryMonthTotal.category.in_({category for category, _month in deltas})
+    )} if deltas else {}
+    for (category, month_start), (amount, count) in deltas.items():
+        total = totals.get((category, month_start))
+        if total is None:
+            db.session.add(CategoryMonthTotal(user_id=user_id, category=category, month_start=month_start,
+                                              total=Decimal(str(amount)), expense_count=count))
+            continue
+        total.total = CategoryMonthTotal.total + Decimal(str(amount))
+        total.expense_count = CategoryMonthTotal.expense_count + count
+
+def record_expense_change(expense, sign=1):
+    """Keep derived tables in step with an expense write (sign=1 add, -1 remove)"""
+    amount = Decimal(str(expense.amount)) * sign
+    apply_rollup_deltas(expense.user_id, {expense.date.replace(day=1): [amount, sign, 0, 0]})
+    apply_category_deltas(expense.user_id, {expense.category: sign})
+    apply_category_month_deltas(expense.user_id, {(expense.category, expense.date.replace(day=1)): [amount, sign]})
+    apply_snapshot_expense(expense, sign)
+    record_activity(expense.user_id, expense_days={expense.date: sign}, expense_count=sign)
+
+def record_expense_rows(user_id, rows):
+    """record_expense_change for a batch of new expense rows (dicts), folded into one delta per month and category"""
+    months = defaultdict(lambda: [0, 0, 0, 0])
+    categories = defaultdict(int)
+    category_months = defaultdict(lambda: [0, 0])
+    days = defaultdict(int)
+    for row in rows:
+        month = months[row['date'].replace(day=1)]
+        month[0] += row['amount']
+        month[1] += 1
+        categories[row['category']] += 1
+        category_month = category_months[(row['category'], row['date'].replace(day=1))]
+        category_month[0] += row['amount']
+        category_month[1] += 1
+        days[row['date']] += 1
+    apply_rollup_deltas(user_id, months)
+    apply_category_deltas(user_id, categories)
+    apply_category_month_deltas(user_id, category_months)
+    apply_snapshot_expense_rows(user_id, rows)
+    record_activity(user_id, expense_days=days, expense_count=len(rows))
+
+def record_income_change(income, sign=1):
+    """Keep derived tables in step with an income write (sign=1 add, -1 remove)"""
+    amount = Decimal(str(income.amount)) * sign
+    apply_rollup_deltas(income.user_id, {income.date.replace(day=1): [0, 0, amount, sign]})
+    apply_snapshot_income(income, sign)
+    record_activity(income.user_id, income_sources={income.source: sign})
+
+def rebuild_monthly_rollups():
+    """Recompute every user's rollup rows from the source tables with two GROUP BY queries"""
+    MonthlyRollup.query.delete()
+    deltas = defaultdict(lambda: [0, 0, 0, 0])
+    for key, (total, count) in aggregate_expenses(None, ('user_id', 'month')).items():
+        deltas[key][0:2] = [total, count]
+    for key, (total, count) in aggregate_income(None, ('user_id', 'month')).items():
+        deltas[key][2:4] = [total, count]
+    for (user_id, month_start), (expense_amount, expense_count, income_amount, income_count) in deltas.items():
+        db.session.add(MonthlyRollup(user_id=user_id, month_start=month_start,
+                                     expense_total=expense_amount, expense_count=expense_count,
+                                     income_total=income_amount, income_count=income_count))
+    db.session.commit()
+
+def rebuild_expense_categories():
+    """Recompute every user's category registry with one GROUP BY over expenses"""
+    ExpenseCategory.query.delete()
+    for (user_id, name), (_total, count) in aggregate_expenses(None, ('user_id', 'category')).items():
+        db.session.add(ExpenseCategory(user_id=user_id, name=name, expense_count=count))
+    db.session.commit()
+
+def rebuild_category_month_totals():
+    """Recompute every user's per-category month totals with one GROUP BY over expenses"""
+    CategoryMonthTotal.query.delete()
+    for (user_id, category, month_start), (total, count) in aggregate_expenses(None, ('user_id', 'category', 'month')).items():
+        db.session.add(CategoryMonthTotal(user_id=user_id, category=category, month_start=month_start,
+                                          total=total, expense_count=count))
+    db.session.commit()
+
+def get_categories(user_id):
+    """Sorted names of the user's categories that have at least one expense, read from the registry"""
+    rows = db.session.query(ExpenseCategory.name).filter(
+        ExpenseCategory.user_id == user_id,
+        ExpenseCategory.expense_count > 0
+    ).order_by(ExpenseCategory.name)
+    return [name for (name,) in rows]
+
+def get_monthly_rollups(user_id, months, today=None):
+    """The user's rollup rows for the last `months` months (oldest first) from one indexed range read; gaps are zero-filled"""
+    today = today or datetime.now().date()
+    first_month = shift_month(today, -(months - 1))
+    rows = MonthlyRollup.query.filter(MonthlyRollup.user_id == user_id,
+                                      MonthlyRollup.month_start >= first_month,
+                                      MonthlyRollup.month_start <= today).all()
+    by_month = {r.month_start: r for r in rows}
+    result = []
+    for i in range(months):
+        month_start = shift_month(first_month, i)
+        rollup = by_month.get(month_start)
+        result.append({
+            'month_start': month_start,
+            'expense_total': rollup.expense_total if rollup else 0,
+            'expense_count': rollup.expense_count if rollup else 0,
+            'income_total': rollup.income_total if rollup else 0,
+            'income_count': rollup.income_count if rollup else 0
+        })
+    return result
+
+# ==================== AGGREGATION QUERIES ====================
+EXPENSE_GROUP_COLUMNS = {
+    'user_id': Expense.user_id,
+    'category': Expense.category,
+    'payment_method': Expense.payment_method,
+}
+INCOME_GROUP_COLUMNS = {
+    'user_id': Income.user_id,
+    'source': Income.source,
+}
+
+def _aggregate(model, group_columns, user_id, group_by, filters):
+    if user_id is not None:
+        filters = [model.user_id == user_id, *filters]
+    select_columns = []
+    for name in group_by:
+        if name == 'month':
+            select_columns += [db.extract('year', model.date), db.extract('month', model.date)]
+        else:
+            select_columns.append(group_columns[name])
+    query = db.session.query(*select_columns, db.func.sum(model.amount), db.func.count(model.id)).filter(*filters)
+    if select_columns:
+        query = query.group_by(*select_columns)
+    
+    result = {}
+    for row in query:
+        key = []
+        position = 0
+        for name in group_by:
+            if name == 'month':
+                key.append(datetime(int(row[position]), int(row[position + 1]), 1).date())
+                position += 2
+            else:
+                key.append(row[position])
+                position += 1
+        if row[-1]:
+            result[tuple(key)] = (row[-2] or Decimal(0), row[-1])
+    return result
+
+def aggregate_expenses(user_id, group_by=(), filters=()):
+    """
+    Sum and count the user's expenses in the database with GROUP BY over any of
+    'category', 'payment_method' and 'month' (first day of the month).
+    Returns {key_tuple: (total, count)}; with no group_by the key is ().
+    user_id=None aggregates across all users (rebuilds group by 'user_id').
+    """
+    return _aggregate(Expense, EXPENSE_GROUP_COLUMNS, user_id, group_by, filters)
+
+def aggregate_income(user_id, group_by=(), filters=()):
+    """Same as aggregate_expenses for income, grouped by 'source' and/or 'month'"""
+    return _aggregate(Income, INCOME_GROUP_COLUMNS, user_id, group_by, filters)
+
+def sum_by(aggregates, position=0):
+    """Collapse aggregate results to {key[position]: total}"""
+    totals = defaultdict(Decimal)
+    for key, (total, _count) in aggregates.items():
+        totals[key[position]] += total
+    return dict(totals)
+
+def grand_total(aggregates):
+    """Overall (total, count) across aggregate results"""
+    return (sum((total for total, _count in aggregates.values()), Decimal(0)),
+            sum(count for _total, count in aggregates.values()))
+
+def get_category_spending(user_id, month_start):
+    """{category: total} of the user's expenses in the month starting `month_start`, read from the running totals"""
+    return {category: total for category, total in db.session.query(
+        CategoryMonthTotal.category, CategoryMonthTotal.total
+    ).filter(
+        CategoryMonthTotal.user_id == user_id, CategoryMonthTotal.month_start == month_start,
+        CategoryMonthTotal.expense_count > 0
+    )}
+
+# ==================== FINANCIAL SNAPSHOT ====================
+def _money(value):
+    return str(Decimal(str(value)).quantize(Decimal('0.01')))
+
+def _json_amounts(totals):
+    return json.dumps({key: _money(amount) for key, amount in sorted(totals.items()) if amount})
+
+def _adjust_json_amount(document, key, delta):
+    totals = json.loads(document)
+    amount = Decimal(totals.get(key, '0')) + delta
+    if amount:
+        totals[key] = _money(amount)
+    else:
+        totals.pop(key, None)
+    return json.dumps(dict(sorted(totals.items())))
+
+def _snapshot_totals(snapshot):
+    snapshot.category_totals = _json_amounts(sum_by(aggregate_expenses(snapshot.user_id, ('category',))))
+    snapshot.income_sources = _json_amounts(sum_by(aggregate_income(snapshot.user_id, ('source',))))
+    snapshot.expense_total = grand_total(aggregate_expenses(snapshot.user_id))[0]
+    snapshot.income_total = grand_total(aggregate_income(snapshot.user_id))[0]
+
+def _snapshot_month_spending(snapshot):
+    month_start = datetime.now().date().replace(day=1)
+    snapshot.month_start = month_start
+    snapshot.month_category_totals = _json_amounts(get_category_spending(snapshot.user_id, month_start))
+
+def _snapshot_recent(snapshot):
+    recent = Expense.query.filter_by(user_id=snapshot.user_id).order_by(Expense.date.desc(), Expense.id.desc()).limit(5).all()
+    snapshot.recent_expenses = json.dumps([
+        {'date': e.date.isoformat(), 'category': e.category, 'amount': _money(e.amount), 'note': e.note}
+        for e in recent
+    ])
+
+def _snapshot_budgets(snapshot):
+    today = datetime.now()
+    budgets = Budget.query.filter_by(user_id=snapshot.user_id, month=today.month, year=today.year).all()
+    snapshot.budgets = json.dumps([{'category': b.category, 'amount': _money(b.amount)} for b in budgets])
+
+def _snapshot_savings(snapshot):
+    snapshot.savings = json.dumps([
+        {'name': s.name, 'current': _money(s.current_amount), 'target': _money(s.target_amount),
+         'deadline': s.deadline.isoformat() if s.deadline else None}
+        for s in SavingsGoal.query.filter_by(user_id=snapshot.user_id).all()
+    ])
+
+def _snapshot_recurring(snapshot):
+    snapshot.recurring = json.dumps([
+        {'name': r.name, 'amount': _money(r.amount), 'frequency': r.frequency, 'next_due': r.next_due.isoformat()}
+        for r in RecurringExpense.query.filter_by(user_id=snapshot.user_id, is_active=True).all()
+    ])
+
+SNAPSHOT_SECTIONS = {
+    'totals': _snapshot_totals,
+    'month_spending': _snapshot_month_spending,
+    'recent': _snapshot_recent,
+    'budgets': _snapshot_budgets,
+    'savings': _snapshot_savings,
+    'recurring': _snapshot_recurring,
+}
+
+def get_financial_snapshot(user_id, for_update=False):
+    query = FinancialSnapshot.query.filter_by(user_id=user_id)
+    if for_update:
+        query = query.with_for_update()
+    return query.first()
+
+def refresh_snapshot(user_id, *sections):
+    """
+    Recompute the named sections (all when none given) of the user's
+    snapshot from the source tables, creating the row if needed. The caller commits.
+    """
+    snapshot = get_financial_snapshot(user_id, for_update=True)
+    if snapshot is None:
+        snapshot = FinancialSnapshot(user_id=user_id, data_version=0)
+        db.session.add(snapshot)
+        sections = ()
+    for name in sections or SNAPSHOT_SECTIONS:
+        SNAPSHOT_SECTIONS[name](snapshot)
+    snapshot.data_version = FinancialSnapshot.data_version + 1 if snapshot.id else 1
+    return snapshot
+
+def apply_snapshot_expense(expense, sign):
+    """Fold one expense write into the snapshot without rescanning expenses. The caller commits."""
+    snapshot = get_financial_snapshot(expense.user_id, for_update=True)
+    if snapshot is None:
+        # A fresh build already sees the pending write
+        refresh_snapshot(expense.user_id)
+        return
+    amount = Decimal(str(expense.amount)) * sign
+    snapshot.expense_total = FinancialSnapshot.expense_total + amount
+    snapshot.category_totals = _adjust_json_amount(snapshot.category_totals, expense.category, amount)
+    if snapshot.month_start and expense.date.replace(day=1) == snapshot.month_start:
+        snapshot.month_category_totals = _adjust_json_amount(snapshot.month_category_totals, expense.category, amount)
+    _snapshot_recent(snapshot)
+    snapshot.data_version = FinancialSnapshot.data_version + 1
+
+def apply_snapshot_expense_rows(user_id, rows):
+    """Fold a batch of new expense rows (dicts) into the snapshot. The caller commits."""
+    snapshot = get_financial_snapshot(user_id, for_update=True)
+    if snapshot is None:
+        refresh_snapshot(user_id)
+        return
+    category_totals = defaultdict(Decimal)
+    month_totals = defaultdict(Decimal)
+    for row in rows:
+        category_totals[row['category']] += row['amount']
+        if snapshot.month_start and row['date'].replace(day=1) == snapshot.month_start:
+            month_totals[row['category']] += row['amount']
+    snapshot.expense_total = FinancialSnapshot.expense_total + sum(category_totals.values())
+    for category, amount in category_totals.items():
+        snapshot.category_totals = _adjust_json_amount(snapshot.category_totals, category, amount)
+    for category, amount in month_totals.items():
+        snapshot.month_category_totals = _adjust_json_amount(snapshot.month_category_totals, category, amount)
+    _snapshot_recent(snapshot)
+    snapshot.data_version = FinancialSnapshot.data_version + 1
+
+def apply_snapshot_income(income, sign):
+    """Fold one income write into the snapshot. The caller commits."""
+    snapshot = get_financial_snapshot(income.user_id, for_update=True)
+    if snapshot is None:
+        refresh_snapshot(income.user_id)
+        return
+    amount = Decimal(str(income.amount)) * sign
+    snapshot.income_total = FinancialSnapshot.income_total + amount
+    snapshot.income_sources = _adjust_json_amount(snapshot.income_sources, income.source, amount)
+    snapshot.data_version = FinancialSnapshot.data_version + 1
+
+def read_financial_snapshot(user_id):
+    """The user's snapshot for the chat prompt; month-scoped sections roll over on the first read of a new month"""
+    snapshot = get_financial_snapshot(user_id)
+    if snapshot is None or snapshot.month_start != datetime.now().date().replace(day=1):
+        snapshot = refresh_snapshot(user_id, 'month_spending', 'budgets')
+        db.session.commit()
+    return snapshot
+
+# ==================== KEYSET PAGINATION ====================
+EXPENSE_PAGE_SIZE = 50
+
+# sort_by -> (column, descending); ties are broken on Expense.id in the same direction
+EXPENSE_SORT_KEYS = {
+    'date_desc': (Expense.date, True),
+    'date_asc': (Expense.date, False),
+    'amount_desc': (Expense.amount, True),
+    'amount_asc': (Expense.amount, False),
+    'category': (Expense.category, False),
+}
+
+def encode_cursor(value, row_id):
+    raw = json.dumps([str(value), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor, column):
+    """Turn a cursor back into (sort value, id); returns None for anything malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, row_id = json.loads(raw)
+        if column is Expense.date:
+            value = datetime.strptime(value, "%Y-%m-%d").date()
+        elif column is Expense.amount:
+            value = Decimal(value)
+        elif column is not Expense.category:
+            value = float(value)  # search rank
+        return value, int(row_id)
+    except (ValueError, TypeError, ArithmeticError):
+        return None
+
+def paginate_expenses(query, sort_by, after=None, before=None, page_size=EXPENSE_PAGE_SIZE, rank=None):
+    """
+    Seek pagination over (sort column, id). Returns (rows, next_cursor, prev_cursor);
+    each page is a single indexed range scan no matter how deep it is.
+    sort_by='relevance' orders by `rank` (best first) when a search supplies one.
+    """
+    if sort_by == 'relevance' and rank is not None:
+        column, descending = rank, False
+    else:
+        column, descending = EXPENSE_SORT_KEYS.get(sort_by, EXPENSE_SORT_KEYS['date_desc'])
+    backwards = bool(before)
+    cursor = decode_cursor(before if backwards else after, column) if (before or after) else None
+    scan_descending = descending != backwards
+    
+    if cursor:
+        position = db.tuple_(column, Expense.id)
+        query = query.filter(position < cursor if scan_descending else position > cursor)
+    if scan_descending:
+        query = query.order_by(column.desc(), Expense.id.desc())
+    else:
+        query = query.order_by(column.asc(), Expense.id.asc())
+    
+    # The sort value rides along with each row so cursors also work for computed columns
+    rows = query.add_columns(column).limit(page_size + 1).all()
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+    if not rows:
+        return [], None, None
+    
+    first = encode_cursor(rows[0][1], rows[0][0].id)
+    last = encode_cursor(rows[-1][1], rows[-1][0].id)
+    rows = [row[0] for row in rows]
+    if backwards:
+        return rows, last, first if has_more else None
+    return rows, last if has_more else None, first if cursor else None
+
+# ==================== FULL-TEXT SEARCH ====================
+# Set at startup: 'fts5' on SQLite, 'postgres' (tsvector + pg_trgm) or None for the plain ILIKE fallback
+SEARCH_BACKEND = None
+
+# External-content FTS5 index over expense notes and categories; the triggers keep it in sync with every write
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS expense_fts USING fts5("
+    "note, category, content='expense', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS expense_fts_ai AFTER INSERT ON expense BEGIN "
+    "INSERT INTO expense_fts(rowid, note, category) VALUES (new.id, new.note, new.category); END",
+    "CREATE TRIGGER IF NOT EXISTS expense_fts_ad AFTER DELETE ON expense BEGIN "
+    "INSERT INTO expense_fts(expense_fts, rowid, note, category) VALUES ('delete', old.id, old.note, old.category); END",
+    "CREATE TRIGGER IF NOT EXISTS expense_fts_au AFTER UPDATE OF note, category ON expense BEGIN "
+    "INSERT INTO expense_fts(expense_fts, rowid, note, category) VALUES ('delete', old.id, old.note, old.category); "
+    "INSERT INTO expense_fts(rowid, note, category) VALUES (new.id, new.note, new.category); END",
+]
+
+# Must stay identical to the expression indexed in migration 5b7e2d9c4a18, or Postgres ignores the GIN index
+EXPENSE_TSVECTOR = db.literal_column("to_tsvector('simple', coalesce(expense.note, '') || ' ' || expense.category)")
+
+expense_fts = db.table('expense_fts', db.column('rowid'))
+
+def ensure_search_index():
+    """Pick the full-text backend for expense search, creating the FTS5 index on SQLite"""
+    global SEARCH_BACKEND
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        existed = db.session.execute(db.text("SELECT 1 FROM sqlite_master WHERE name = 'expense_fts'")).first()
+        for statement in SQLITE_SEARCH_DDL:
+            db.session.execute(db.text(statement))
+        if not existed:
+            db.session.execute(db.text("INSERT INTO expense_fts(expense_fts) VALUES ('rebuild')"))
+        db.session.commit()
+        SEARCH_BACKEND = 'fts5'
+    elif dialect == 'postgresql':
+        if db.session.execute(db.text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first():
+            SEARCH_BACKEND = 'postgres'
+        else:
+            logger.warning("pg_trgm is not installed; run 'flask db upgrade' to enable full-text expense search")
+
+def search_terms(search_query):
+    return re.findall(r'\w+', search_query)
+
+def _fts_match(terms):
+    # Every term must match, each as a prefix ("gro" finds "groceries")
+    return db.literal_column('expense_fts').op('MATCH')(' '.join(f'"{term}"*' for term in terms))
+
+def _pg_tsquery(terms):
+    return db.func.to_tsquery('simple', ' & '.join(f'{term}:*' for term in terms))
+
+def expense_search_filter(search_query):
+    """WHERE clause matching expenses whose note or category contains the search terms"""
+    terms = search_terms(search_query)
+    if SEARCH_BACKEND == 'fts5' and terms:
+        return Expense.id.in_(db.select(expense_fts.c.rowid).where(_fts_match(terms)))
+    if SEARCH_BACKEND == 'postgres' and terms:
+        # The tsvector GIN index serves word matches, the trigram index serves substrings inside words
+        return EXPENSE_TSVECTOR.op('@@')(_pg_tsquery(terms)) | Expense.note.ilike(f"%{search_query}%")
+    return Expense.note.ilike(f"%{search_query}%") | Expense.category.ilike(f"%{search_query}%")
+
+def rank_search_results(query, search_query):
+    """Returns (query, rank) where lower rank is more relevant, or (query, None) without a full-text backend"""
+    terms = search_terms(search_query)
+    if SEARCH_BACKEND == 'fts5' and terms:
+        hits = db.select(expense_fts.c.rowid.label('expense_id'),
+                         db.func.bm25(db.literal_column('expense_fts')).label('rank')) \
+            .where(_fts_match(terms)).subquery()
+        return query.join(hits, hits.c.expense_id == Expense.id), hits.c.rank
+    if SEARCH_BACKEND == 'postgres' and terms:
+        relevance = db.func.ts_rank_cd(EXPENSE_TSVECTOR, _pg_tsquery(terms)) + \
+            db.func.similarity(db.func.coalesce(Expense.note, ''), search_query)
+        return query, -relevance
+    return query, None
+
+# ==================== STATEMENT IMPORT ====================
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 500))
+IMPORT_DEFAULT_CATEGORY = 'Uncategorized'
+IMPORT_DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%d-%m-%Y', '%d.%m.%Y', '%Y/%m/%d',
+                       '%d %b %Y', '%d-%b-%Y', '%d %b %y', '%b %d, %Y')
+IMPORT_HEADER_SEARCH_ROWS = 50
+
+# Lower-cased CSV header names used by bank exports, by the field they map to
+CSV_HEADER_ALIASES = {
+    'date': ('date', 'transaction date', 'txn date', 'posting date', 'posted date', 'value date', 'booking date'),
+    'amount': ('amount', 'transaction amount'),
+    'debit': ('debit', 'debit amount', 'withdrawal', 'withdrawals', 'withdrawal amt.', 'withdrawal amount',
+              'paid out', 'money out'),
+    'credit': ('credit', 'credit amount', 'deposit', 'deposits', 'deposit amt.', 'deposit amount',
+               'paid in', 'money in'),
+    'note': ('description', 'narration', 'note', 'notes', 'memo', 'details', 'particulars', 'payee',
+             'transaction details', 'remarks'),
+    'category': ('category',),
+    'payment_method': ('payment method',),
+}
+
+OFX_TAG = re.compile(r'<(/?[A-Za-z0-9.]+)>([^<]*)')
+
+def expense_import_hash(date, amount, note):
+    """Fingerprint of (date, amount, note); migration c91f4a7e2b65 backfills with the same formula"""
+    note = ' '.join((note or '').split()).lower()[:200]
+    key = f"{date.isoformat()}|{Decimal(str(amount)).quantize(Decimal('0.01'))}|{note}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+def parse_import_date(text, date_format=None):
+    text = text.strip()
+    for candidate in ((date_format,) if date_format else IMPORT_DATE_FORMATS):
+        try:
+            return datetime.strptime(text, candidate).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised date: {text!r}")
+
+def parse_import_amount(text):
+    """Decimal from a statement amount like '1,234.50', '(12.00)' or '45.00 DR'; None when blank"""
+    text = text.strip().upper()
+    negative = (text.startswith('(') and text.endswith(')')) or text.endswith('DR')
+    text = re.sub(r'[^0-9.\-]', '', text.removesuffix('DR').removesuffix('CR'))
+    if not text:
+        return None
+    amount = Decimal(text)
+    return -abs(amount) if negative else amount
+
+def _match_csv_header(record):
+    names = [cell.strip().lower() for cell in record]
+    columns = {}
+    for field, aliases in CSV_HEADER_ALIASES.items():
+        for index, name in enumerate(names):
+            if name in aliases:
+                columns[field] = index
+                break
+    if 'date' in columns and ('amount' in columns or 'debit' in columns):
+        return columns
+    return None
+
+def parse_statement_csv(stream, date_format=None):
+    """
+    Yield {'date', 'amount', 'note', 'category', 'payment_method'} per CSV
+    transaction, or None for a row that cannot be parsed. Amounts are signed
+    with money out negative. Preamble lines before the header row are skipped.
+    """
+    columns = None
+    for line_number, record in enumerate(csv.reader(stream)):
+        if columns is None:
+            columns = _match_csv_header(record)
+            if columns is None and line_number >= IMPORT_HEADER_SEARCH_ROWS:
+                raise ValueError("No header row with date and amount columns found")
+            continue
+        if not any(cell.strip() for cell in record):
+            continue
+
+        def cell(field):
+            index = columns.get(field)
+            return record[index].strip() if index is not None and index < len(record) else ''
+
+        try:
+            if 'amount' in columns:
+                amount = parse_import_amount(cell('amount'))
+            else:
+                debit = parse_import_amount(cell('debit'))
+                credit = parse_import_amount(cell('credit'))
+                # Both blank is an unreadable row, not a zero credit
+                amount = None if debit is None and credit is None else (credit or 0) - abs(debit or 0)
+            if amount is None:
+                raise ValueError("Missing amount")
+            yield {
+                'date': parse_import_date(cell('date'), date_format),
+                'amount': amount,
+                'note': cell('note'),
+                'category': cell('category'),
+                'payment_method': cell('payment_method')
+            }
+        except (ValueError, ArithmeticError):
+            yield None
+    if columns is None:
+        raise ValueError("No header row with date and amount columns found")
+
+def _ofx_tags(stream, chunk_size=65536):
+    """(TAG, value) pairs from an OFX 1.x (SGML) or 2.x (XML) file, read in chunks"""
+    buffer = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        buffer += chunk
+        # Hold back the last, possibly incomplete, tag until the next chunk arrives
+        cut = len(buffer) if not chunk else max(buffer.rfind('<'), 0)
+        for tag, value in OFX_TAG.findall(buffer[:cut]):
+            yield tag.upper(), value.strip()
+        buffer = buffer[cut:]
+        if not chunk:
+            return
+
+def _ofx_statement_row(fields):
+    try:
+        name, memo = fields.get('NAME', ''), fields.get('MEMO', '')
+        return {
+            'date': datetime.strptime(fields['DTPOSTED'][:8], '%Y%m%d').date(),
+            'amount': Decimal(fields['TRNAMT'].replace(',', '.')),
+            'note': f"{name} - {memo}" if name and memo and memo != name else (name or memo),
+            'category': '',
+            'payment_method': ''
+        }
+    except (KeyError, ValueError, ArithmeticError):
+        return None
+
+def parse_statement_ofx(stream):
+    """Yield one row per <STMTTRN>, in the same shape as parse_statement_csv()"""
+    fields = None
+    for tag, value in _ofx_tags(stream):
+        if tag == 'STMTTRN':
+            fields = {}
+        elif tag == '/STMTTRN' and fields is not None:
+            yield _ofx_statement_row(fields)
+            fields = None
+        elif fields is not None and not tag.startswith('/'):
+            fields[tag] = value
+
+def detect_statement_format(filename, statement_format=None):
+    if statement_format in ('csv', 'ofx'):
+        return statement_format
+    return 'ofx' if filename.lower().endswith(('.ofx', '.qfx')) else 'csv'
+
+def open_statement(binary_stream, statement_format, date_format=None):
+    """Row generator over an uploaded or on-disk statement, decoded lazily"""
+    text = io.TextIOWrapper(binary_stream, encoding='utf-8-sig', errors='replace', newline='')
+    if statement_format == 'ofx':
+        return parse_statement_ofx(text)
+    return parse_statement_csv(text, date_format)
+
+def _import_mapping(user_id, row, positive_debits, default_category):
+    """Expense insert values for a statement row, or None when it is money coming in"""
+    amount = row['amount'] if positive_debits else -row['amount']
+    if amount <= 0:
+        return None
+    amount = amount.quantize(Decimal('0.01'))
+    note = ' '.join(row['note'].split())[:200]
+    return {
+        'user_id': user_id,
+        'date': row['date'],
+        'category': (row['category'] or default_category)[:50],
+        'amount': amount,
+        'note': note,
+        'payment_method': (row['payment_method'] or 'bank_transfer')[:20],
+        'import_hash': expense_import_hash(row['date'], amount, note)
+    }
+
+def import_statement(user_id, rows, positive_debits=False, default_category=IMPORT_DEFAULT_CATEGORY,
+                     batch_size=IMPORT_BATCH_SIZE):
+    """
+    Insert parsed statement rows as the user's expenses, one transaction per
+    batch, yielding running totals after each commit.
+
+    A row is a duplicate while the statement has not yet seen more copies of
+    its (date, amount, note) than the user already had before the import, so
+    re-importing a file or an overlapping statement adds nothing, yet two
+    identical purchases on one day are both kept.
+    """
+    stats = {'rows': 0, 'imported': 0, 'duplicates': 0, 'credits': 0, 'invalid': 0}
+    existing = {}
+    seen = defaultdict(int)
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        stats['rows'] += len(batch)
+        mappings = []
+        for row in batch:
+            if row is None:
+                stats['invalid'] += 1
+                continue
+            mapping = _import_mapping(user_id, row, positive_debits, default_category)
+            if mapping is None:
+                stats['credits'] += 1
+            else:
+                mappings.append(mapping)
+
+        # Counts for hashes first seen in this batch, taken before this import inserts any of them
+        new_hashes = {m['import_hash'] for m in mappings} - existing.keys()
+        if new_hashes:
+            counts = dict(db.session.query(Expense.import_hash, db.func.count(Expense.id)).filter(
+                Expense.user_id == user_id, Expense.import_hash.in_(new_hashes)
+            ).group_by(Expense.import_hash).all())
+            for import_hash in new_hashes:
+                existing[import_hash] = counts.get(import_hash, 0)
+
+        inserts = []
+        for mapping in mappings:
+            seen[mapping['import_hash']] += 1
+            if seen[mapping['import_hash']] <= existing[mapping['import_hash']]:
+                stats['duplicates'] += 1
+            else:
+                inserts.append(mapping)
+
+        try:
+            if inserts:
+                db.session.execute(db.insert(Expense), inserts)
+                record_expense_rows(user_id, inserts)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        stats['imported'] += len(inserts)
+        # Per committed batch, so an import the client abandons halfway still alerts for what it wrote
+        check_budget_alerts(user_id, {(m['category'], m['date'].replace(day=1)) for m in inserts})
+        yield dict(stats)
+    if not stats['rows']:
+        yield dict(stats)
+
+def describe_import(stats):
+    return (f"{stats['imported']} expenses imported, {stats['duplicates']} duplicates skipped, "
+            f"{stats['credits']} credits ignored, {stats['invalid']} unreadable rows")
+
+def find_cli_user(username):
+    """The account a CLI command acts on, by username or email"""
+    user = User.query.filter((User.username == username) | (User.email == username)).first()
+    if user is None:
+        raise click.ClickException(f"No user named {username}")
+    return user
+
+@app.cli.command('import-statement')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--user', 'username', required=True, help='Username or email of the account to import into.')
+@click.option('--format', 'statement_format', type=click.Choice(['csv', 'ofx']), help='Defaults to the file extension.')
+@click.option('--category', default=IMPORT_DEFAULT_CATEGORY, show_default=True, help='Category for rows without one.')
+@click.option('--positive-debits', is_flag=True, help='Spending is listed as positive amounts.')
+@click.option('--date-format', help='strptime format for CSV dates, e.g. %d/%m/%Y.')
+@click.option('--batch-size', type=int, default=IMPORT_BATCH_SIZE, show_default=True)
+def import_statement_command(path, username, statement_format, category, positive_debits, date_format, batch_size):
+    """Import a CSV or OFX bank statement as a user's expenses."""
+    user = find_cli_user(username)
+    statement_format = detect_statement_format(path, statement_format)
+    with open(path, 'rb') as f:
+        rows = open_statement(f, statement_format, date_format)
+        try:
+            for stats in import_statement(user.id, rows, positive_debits, category, batch_size):
+                print(f"{stats['rows']} rows read: {describe_import(stats)}")
+        except ValueError as e:
+            raise click.ClickException(str(e))
+
+# ==================== RECURRING POSTING ====================
+RECURRING_FREQUENCIES = ('daily', 'weekly', 'monthly', 'yearly')
+RECURRING_POST_INTERVAL = int(os.environ.get('RECURRING_POST_INTERVAL', 3600))
+
+def advance_due_date(day, frequency, due_day=None):
+    """
+    The occurrence after `day`. Monthly and yearly items land on `due_day`
+    (default: day's own day), clamped to the end of shorter months.
+    """
+    if frequency == 'daily':
+        return day + timedelta(days=1)
+    if frequency == 'weekly':
+        return day + timedelta(days=7)
+    if frequency not in ('monthly', 'yearly'):
+        raise ValueError(f"Unknown frequency {frequency!r}")
+    month = shift_month(day, 1 if frequency == 'monthly' else 12)
+    return month.replace(day=min(due_day or day.day, monthrange(month.year, month.month)[1]))
+
+def recurring_posting_hash(recurring_id, day):
+    """import_hash of the expense a recurring item posts for `day`, so each occurrence is posted once"""
+    return hashlib.sha1(f"recurring:{recurring_id}:{day.isoformat()}".encode()).hexdigest()
+
+def post_due_recurring(today=None):
+    """
+    Post an expense for every occurrence of every active recurring item due
+    on or before `today`, and move each item's next_due past it, all in one
+    transaction. Items that fell behind catch up on every missed occurrence;
+    paused items skip ahead when they are resumed instead.
+    """
+    today = today or datetime.now().date()
+    stats = {'items': 0, 'posted': 0, 'skipped': 0}
+    due = RecurringExpense.query.filter(
+        RecurringExpense.is_active == True, RecurringExpense.next_due <= today
+    ).order_by(RecurringExpense.user_id, RecurringExpense.id).with_for_update().all()
+
+    rows_by_user = defaultdict(list)
+    for item in due:
+        if item.frequency not in RECURRING_FREQUENCIES:
+            logger.error(f"Recurring expense {item.id} has unknown frequency {item.frequency!r}")
+            continue
+        stats['items'] += 1
+        day = item.next_due
+        while day <= today:
+            rows_by_user[item.user_id].append({
+                'user_id': item.user_id,
+                'date': day,
+                'category': item.category,
+                'amount': Decimal(str(item.amount)),
+                'note': item.name,
+                'payment_method': 'bank_transfer',
+                'import_hash': recurring_posting_hash(item.id, day)
+            })
+            day = advance_due_date(day, item.frequency, item.due_day)
+        item.next_due = day
+
+    touched = {}
+    try:
+        for user_id, rows in rows_by_user.items():
+            # A run that overlapped this one may have posted some occurrences already
+            posted = {h for (h,) in db.session.query(Expense.import_hash).filter(
+                Expense.user_id == user_id, Expense.import_hash.in_({r['import_hash'] for r in rows})
+            )}
+            inserts = [r for r in rows if r['import_hash'] not in posted]
+            if inserts:
+                db.session.execute(db.insert(Expense), inserts)
+                record_expense_rows(user_id, inserts)
+            refresh_snapshot(user_id, 'recurring')
+            stats['posted'] += len(inserts)
+            stats['skipped'] += len(rows) - len(inserts)
+            touched[user_id] = {(r['category'], r['date'].replace(day=1)) for r in inserts}
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    for user_id, category_months in touched.items():
+        check_budget_alerts(user_id, category_months)
+    return stats
+
+def post_recurring_job():
+    stats = post_due_recurring()
+    if stats['posted']:
+        logger.info(f"Posted {stats['posted']} recurring expenses for {stats['items']} items")
+
+@app.cli.command('post-recurring')
+@click.option('--date', 'as_of', type=click.DateTime(formats=['%Y-%m-%d']), help='Post items due on or before this day (default: today).')
+def post_recurring_command(as_of):
+    """Post expenses for recurring items that have come due."""
+    stats = post_due_recurring(as_of.date() if as_of else None)
+    print(f"{stats['posted']} expenses posted for {stats['items']} recurring items, "
+          f"{stats['skipped']} already posted")
+
+# ==================== COLUMNAR EXPORT ====================
+COLUMNAR_BATCH_ROWS = int(os.environ.get('COLUMNAR_BATCH_ROWS', 10000))
+
+# name -> (model, exported columns, incremental); the rest are exported whole. Incremental exports follow an id
+# watermark, so they carry new rows only: edits and deletes of rows already exported are not sent again
+COLUMNAR_TABLES = {
+    'expenses': (Expense, ('id', 'date', 'category', 'amount', 'note', 'payment_method', 'created_at'), True),
+    'income': (Income, ('id', 'date', 'source', 'amount', 'note', 'created_at'), True),
+    'budgets': (Budget, ('id', 'category', 'amount', 'month', 'year', 'created_at'), False),
+    'savings_goals': (SavingsGoal, ('id', 'name', 'target_amount', 'current_amount', 'deadline', 'created_at'), False),
+    'recurring': (RecurringExpense, ('id', 'name', 'category', 'amount', 'frequency', 'next_due', 'is_active', 'created_at'), False),
+}
+
+# format -> (mimetype, file extension); Arrow IPC files can be memory-mapped by readers
+COLUMNAR_FORMATS = {
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.file', 'arrow'),
+}
+
+def arrow_type(column):
+    kind = column.type
+    if isinstance(kind, db.Boolean):
+        return pa.bool_()
+    if isinstance(kind, db.Integer):
+        return pa.int64()
+    if isinstance(kind, db.Numeric):
+        return pa.decimal128(kind.precision or 18, kind.scale or 2)
+    if isinstance(kind, db.DateTime):
+        return pa.timestamp('us')
+    if isinstance(kind, db.Date):
+        return pa.date32()
+    return pa.string()
+
+def columnar_schema(table):
+    model, columns, _incremental = COLUMNAR_TABLES[table]
+    return pa.schema([
+        pa.field(name, arrow_type(model.__table__.c[name]), nullable=model.__table__.c[name].nullable)
+        for name in columns
+    ])
+
+def columnar_batches(user_id, table, since_id=0, until_id=None):
+    """Arrow record batches of the user's rows with since_id < id <= until_id, read from the database a batch at a time"""
+    model, columns, _incremental = COLUMNAR_TABLES[table]
+    schema = columnar_schema(table)
+    query = db.select(*(getattr(model, name) for name in columns)).where(model.user_id == user_id, model.id > since_id)
+    if until_id is not None:
+        query = query.where(model.id <= until_id)
+    result = db.session.execute(query.order_by(model.id).execution_options(yield_per=COLUMNAR_BATCH_ROWS))
+    for partition in result.partitions():
+        yield pa.record_batch([pa.array(values, type=field.type) for values, field in zip(zip(*partition), schema)],
+                              schema=schema)
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that collects what a writer emits until it is drained into the response"""
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def stream_columnar(batches, schema, columnar_format):
+    """Yield the bytes of a Parquet (one row group per batch) or Arrow IPC file as each batch is written"""
+    sink = _ChunkSink()
+    if columnar_format == 'parquet':
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_file(sink, schema)
+    for batch in batches:
+        writer.write_batch(batch)
+        data = sink.drain()
+        if data:
+            yield data
+    writer.close()
+    yield sink.drain()
+
+def export_id_range(user_id, table, incremental):
+    """(since_id, until_id) for an export; incremental exports resume after the table's cursor and stop at today's last row"""
+    model, _columns, supports_incremental = COLUMNAR_TABLES[table]
+    if not (incremental and supports_incremental):
+        return 0, None
+    cursor = ExportCursor.query.filter_by(user_id=user_id, table_name=table).first()
+    since_id = cursor.last_id if cursor else 0
+    last_id = db.session.query(db.func.max(model.id)).filter(model.user_id == user_id).scalar() or 0
+    return since_id, max(since_id, last_id)
+
+def advance_export_cursor(user_id, table, until_id):
+    """Record that rows up to until_id have been exported. The caller commits."""
+    cursor = ExportCursor.query.filter_by(user_id=user_id, table_name=table).first()
+    if cursor is None:
+        cursor = ExportCursor(user_id=user_id, table_name=table)
+        db.session.add(cursor)
+    cursor.last_id = until_id
+    cursor.exported_at = datetime.now(timezone.utc)
+
+@app.cli.command('export-columnar')
+@click.option('--user', 'username', required=True, help='Username or email of the account to export.')
+@click.option('--format', 'columnar_format', type=click.Choice(list(COLUMNAR_FORMATS)), default='parquet', show_default=True)
+@click.option('--out', 'out_dir', type=click.Path(file_okay=False), default='.', show_default=True, help='Directory for the files.')
+@click.option('--table', 'tables', multiple=True, type=click.Choice(list(COLUMNAR_TABLES)), help='Repeatable; defaults to every table.')
+@click.option('--incremental', is_flag=True, help='Only expenses/income inserted since the last incremental export (edits and deletes are not included).')
+def export_columnar_command(username, columnar_format, out_dir, tables, incremental):
+    """Write one typed Parquet/Arrow file per table for analysis."""
+    if pa is None:
+        raise click.ClickException("pyarrow is not installed (pip install pyarrow)")
+    user = find_cli_user(username)
+    extension = COLUMNAR_FORMATS[columnar_format][1]
+    os.makedirs(out_dir, exist_ok=True)
+    for table in tables or COLUMNAR_TABLES:
+        since_id, until_id = export_id_range(user.id, table, incremental)
+        name = f"{table}_after_{since_id}.{extension}" if until_id is not None else f"{table}.{extension}"
+        path = os.path.join(out_dir, name)
+        with open(path, 'wb') as f:
+            for chunk in stream_columnar(columnar_batches(user.id, table, since_id, until_id),
+                                         columnar_schema(table), columnar_format):
+                f.write(chunk)
+        if until_id is not None:
+            advance_export_cursor(user.id, table, until_id)
+            db.session.commit()
+        print(f"Wrote {path}")
+
+@app.cli.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """Recompute the monthly rollups, category registries and totals, financial snapshots and badge counters from the source tables."""
+    rebuild_monthly_rollups()
+    rebuild_expense_categories()
+    rebuild_category_month_totals()
+    for (user_id,) in db.session.query(User.id):
+        refresh_snapshot(user_id)
+    db.session.commit()
+    rebuild_user_stats()
+    print(f"Rebuilt {MonthlyRollup.query.count()} monthly rollup rows, {ExpenseCategory.query.count()} categories, "
+          f"{CategoryMonthTotal.query.count()} category month totals, "
+          f"{FinancialSnapshot.query.count()} financial snapshots and {UserStats.query.count()} badge counters.")
+
 @app.context_processor
 def inject_global_vars():
     currency = get_currency()
@@ -280,32 +1391,33 @@ def inject_global_vars():
         'currency': currency,
         'get_currency': get_currency,
         'conversion_info': get_conversion_info(currency),
+        'stale_rates_age': describe_stale_rates() if iso_code != 'INR' else None,
         'currency_name': iso_code
     }
 
-converter_cache = {}
+converter_cache = TTLCache(
+    maxsize=int(os.environ.get('CONVERTER_CACHE_SIZE', 512)),
+    ttl=int(os.environ.get('CONVERTER_CACHE_TTL', 3600))
+)
+
+def fetch_frankfurter_rate(from_currency, to_currency):
+    try:
+        url = f"https://api.frankfurter.dev/latest?from={from_currency}&to={to_currency}"
+        response = requests.get(url, timeout=5)
+        if response.status_code == 200:
+            data = response.json()
+            return data['rates'][to_currency]
+        return None
+    except Exception as e:
+        logger.warning(f"Converter API error: {e}")
+        return None
 
 def get_frankfurter_rate(from_currency, to_currency):
     if from_currency == to_currency:
         return 1.0
         
     key = f"{from_currency}-{to_currency}"
-
-    if key in converter_cache:
-        return converter_cache[key]
-    else:
-        try:
-            url = f"https://api.frankfurter.dev/latest?from={from_currency}&to={to_currency}"
-            response = requests.get(url, timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                rate = data['rates'][to_currency]
-                converter_cache[key] = rate
-                return rate
-            return None
-        except Exception as e:
-            logger.warning(f"Converter API error: {e}")
-            return None
+    return converter_cache.get_or_load(key, lambda: fetch_frankfurter_rate(from_currency, to_currency))
 
 @app.route('/convert', methods=['GET'])
 def convert():
@@ -334,6 +1446,10 @@ def convert():
     else:
         return jsonify({"error": "Conversion failed"}), 500
 
+@app.route('/convert/stats', methods=['GET'])
+def convert_stats():
+    return jsonify(converter_cache.stats())
+
 @app.route("/set_currency/<currency>")
 def set_currency_route(currency):
     set_currency(currency)
@@ -344,7 +1460,67 @@ def set_currency_route(currency):
 @app.route("/api/currencies")
 def api_currencies():
     rates = get_exchange_rates()
-    return jsonify({"currencies": sorted(list(rates.keys())) if rates else list(STATIC_FALLBACK.keys())})
+    return jsonify({
+        "currencies": sorted(list(rates.keys())) if rates else list(STATIC_FALLBACK.keys()),
+        "rates_age_seconds": get_rates_age()
+    })
+
+@app.cli.command('refresh-rates')
+def refresh_rates_command():
+    """Fetch exchange rates now and store a new snapshot."""
+    snapshot = refresh_exchange_rates(force=True)
+    if snapshot:
+        print(f"Stored rate snapshot from {snapshot.source} at {snapshot.fetched_at:%Y-%m-%d %H:%M:%S}.")
+    else:
+        print("No exchange rates available.")
+
+# ==================== BACKGROUND WORKERS ====================
+_background_workers = {}
+_background_lock = threading.Lock()
+
+def start_background_worker(name, target, interval):
+    """Run target() every `interval` seconds on a daemon thread with an app context, once per process"""
+    with _background_lock:
+        if name in _background_workers:
+            return
+        
+        def loop():
+            while True:
+                try:
+                    with app.app_context():
+                        target()
+                except Exception as e:
+                    logger.error(f"Background worker {name} failed: {e}")
+                time.sleep(interval)
+        
+        thread = threading.Thread(target=loop, name=f"moneymate-{name}", daemon=True)
+        _background_workers[name] = thread
+        thread.start()
+
+# Short one-off jobs (AI tips, reports, ...) run here instead of on the request thread
+job_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('JOB_WORKERS', 2)), thread_name_prefix='moneymate-job')
+
+def submit_job(func, *args, **kwargs):
+    """Run func(*args, **kwargs) on the job pool inside an app context; failures are logged"""
+    def run():
+        try:
+            with app.app_context():
+                return func(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"Background job {func.__name__} failed: {e}")
+    return job_executor.submit(run)
+
+@app.before_request
+def ensure_background_workers():
+    # Started lazily from the first request so CLI commands (flask db upgrade, ...) don't spawn threads
+    if not app.config['BACKGROUND_WORKERS'] or app.config.get('TESTING'):
+        return
+    start_background_worker('exchange-rates', refresh_exchange_rates, 60)
+    if app.config['POST_RECURRING']:
+        start_background_worker('recurring', post_recurring_job, RECURRING_POST_INTERVAL)
+    start_background_worker('outbox', drain_outbox, OUTBOX_INTERVAL)
+    if app.config['SEND_DIGESTS']:
+        start_background_worker('digests', send_digests, DIGEST_INTERVAL)
 
 def login_required(f):
     @wraps(f)
@@ -358,6 +1534,7 @@ def login_required(f):
 @login_required
 def index():
     """Main dashboard with expense tracking and overview"""
+    user_id = session['user_id']
     if request.method == "POST":
         try:
             # Validate and process new expense
@@ -376,32 +1553,23 @@ def index():
                 return redirect("/")
             
             new_expense = Expense(
+                user_id=user_id,
                 date=date, 
                 category=category, 
                 amount=amount, 
                 note=note, 
-                payment_method=payment_method
+                payment_method=payment_method,
+                import_hash=expense_import_hash(date, amount, note)
             )
             db.session.add(new_expense)
+            record_expense_change(new_expense)
             db.session.commit()
             
-            # Check budget limits and trigger alert emails
+            # Alert once per threshold crossed by this month's spending in the category
             try:
-                user = User.query.get(session['user_id'])
-                if user and user.notify_budget_alerts:
-                    today_date = datetime.now()
-                    budget = Budget.query.filter_by(category=category, month=today_date.month, year=today_date.year).first()
-                    if budget:
-                        first_day = today_date.date().replace(day=1)
-                        month_expenses = Expense.query.filter(Expense.date >= first_day, Expense.category == category).all()
-                        total_spent = sum(float(e.amount) for e in month_expenses)
-                        budget_amt = float(budget.amount)
-                        
-                        if budget_amt > 0:
-                            pct = (total_spent / budget_amt) * 100
-                            if pct >= 80:
-                                send_budget_alert_email(user, budget, total_spent, pct)
+                check_budget_alert(user_id, category, date.replace(day=1))
             except Exception as e:
+                db.session.rollback()
                 logger.error(f"Error checking budget alert on add: {e}")
 
             flash("Expense added successfully! 🎉", "success")
@@ -413,23 +1581,6 @@ def index():
             flash("Error adding expense. Please try again.", "danger")
         return redirect("/")
 
-    if 'due_reminders_checked' not in session:
-        session['due_reminders_checked'] = True
-        try:
-            user = User.query.get(session['user_id'])
-            if user and user.notify_due_reminders:
-                today_date = datetime.now().date()
-                three_days_later = today_date + timedelta(days=3)
-                due_items = RecurringExpense.query.filter(
-                    RecurringExpense.is_active == True,
-                    RecurringExpense.next_due >= today_date,
-                    RecurringExpense.next_due <= three_days_later
-                ).all()
-                if due_items:
-                    send_due_reminder_email(user, due_items)
-        except Exception as e:
-            logger.error(f"Error checking due recurring expenses: {e}")
-
     # Apply filters
     category_filter = request.args.get("category_filter", "")
     date_filter = request.args.get("date_filter", "")
@@ -438,69 +1589,81 @@ def index():
     sort_by = request.args.get("sort_by", "date_desc")
     search_query = request.args.get("search_query", "")
     payment_filter = request.args.get("payment_filter", "")
+    min_amount = request.args.get("min_amount", "")
+    max_amount = request.args.get("max_amount", "")
     
-    expenses = Expense.query
+    filters = []
     
     today = datetime.now().date()
     if date_filter == "last_7_days":
         seven_days_ago = today - timedelta(days=7)
-        expenses = expenses.filter(Expense.date >= seven_days_ago)
+        filters.append(Expense.date >= seven_days_ago)
     elif date_filter == "last_30_days":
         thirty_days_ago = today - timedelta(days=30)
-        expenses = expenses.filter(Expense.date >= thirty_days_ago)
+        filters.append(Expense.date >= thirty_days_ago)
     elif date_filter == "this_month":
         first_day_of_month = today.replace(day=1)
-        expenses = expenses.filter(Expense.date >= first_day_of_month)
+        filters.append(Expense.date >= first_day_of_month)
     elif date_filter == "last_month":
         first_day_this_month = today.replace(day=1)
         last_day_last_month = first_day_this_month - timedelta(days=1)
         first_day_last_month = last_day_last_month.replace(day=1)
-        expenses = expenses.filter(Expense.date >= first_day_last_month, Expense.date <= last_day_last_month)
+        filters += [Expense.date >= first_day_last_month, Expense.date <= last_day_last_month]
     elif date_filter == "custom" and start_date and end_date:
         try:
             start = datetime.strptime(start_date, "%Y-%m-%d").date()
             end = datetime.strptime(end_date, "%Y-%m-%d").date()
-            expenses = expenses.filter(Expense.date >= start, Expense.date <= end)
+            filters += [Expense.date >= start, Expense.date <= end]
         except ValueError:
             pass
     
     if category_filter:
-        expenses = expenses.filter(Expense.category == category_filter)
+        filters.append(Expense.category == category_filter)
 
     if payment_filter:
-        expenses = expenses.filter(Expense.payment_method == payment_filter)
+        filters.append(Expense.payment_method == payment_filter)
+
+    currency = get_currency()
+    rate = get_currency_rate(currency)
+    # Amount bounds are entered in the display currency
+    try:
+        if min_amount:
+            filters.append(Expense.amount >= float(min_amount) / rate)
+        if max_amount:
+            filters.append(Expense.amount <= float(max_amount) / rate)
+    except ValueError:
+        pass
 
     if search_query:
-        expenses = expenses.filter(Expense.note.ilike(f"%{search_query}%"))
-
-    # Apply sorting
-    if sort_by == "date_desc":
-        expenses = expenses.order_by(Expense.date.desc())
-    elif sort_by == "date_asc":
-        expenses = expenses.order_by(Expense.date.asc())
-    elif sort_by == "amount_desc":
-        expenses = expenses.order_by(Expense.amount.desc())
-    elif sort_by == "amount_asc":
-        expenses = expenses.order_by(Expense.amount.asc())
-    elif sort_by == "category":
-        expenses = expenses.order_by(Expense.category.asc())
-    
-    expenses = expenses.all()
+        filters.append(expense_search_filter(search_query))
     
-    # Convert amounts to selected currency
-    currency = get_currency()
-    total = sum(convert_amount(e.amount, currency) for e in expenses)
+    expenses = Expense.query.filter_by(user_id=user_id).filter(*filters)
+    rank = None
+    if search_query and sort_by == 'relevance':
+        expenses, rank = rank_search_results(expenses, search_query)
+
+    # Apply sorting and fetch one page past the cursor
+    expenses, next_cursor, prev_cursor = paginate_expenses(
+        expenses, sort_by,
+        after=request.args.get("after"),
+        before=request.args.get("before"),
+        rank=rank
+    )
+    page_args = {k: v for k, v in request.args.items() if k not in ('after', 'before')}
+    next_url = url_for('index', after=next_cursor, **page_args) if next_cursor else None
+    prev_url = url_for('index', before=prev_cursor, **page_args) if prev_cursor else None
+    
+    # Totals for the filtered set come from one GROUP BY query
+    breakdown = aggregate_expenses(user_id, ('category', 'payment_method'), filters)
+    filtered_total, expense_count = grand_total(breakdown)
+    total = convert_amount(filtered_total, currency)
     
     # Get all categories for dropdown
-    all_expenses = Expense.query.all()
-    categories = sorted(set(e.category for e in all_expenses))
+    categories = get_categories(user_id)
     
     # Calculate category and payment totals
-    category_totals = defaultdict(float)
-    payment_totals = defaultdict(float)
-    for e in expenses:
-        category_totals[e.category] += convert_amount(e.amount, currency)
-        payment_totals[e.payment_method] += convert_amount(e.amount, currency)
+    category_totals = convert_totals(sum_by(breakdown, 0), currency)
+    payment_totals = convert_totals(sum_by(breakdown, 1), currency)
     
     top_categories = sorted(category_totals.items(), key=lambda x: x[1], reverse=True)[:5]
     
@@ -508,20 +1671,11 @@ def index():
     monthly_data = []
     monthly_labels = []
     monthly_totals = []
+    rollups = get_monthly_rollups(user_id, 6, today)
     
-    for i in range(5, -1, -1):
-        calc_month = today.month - i
-        calc_year = today.year
-        while calc_month <= 0:
-            calc_month += 12
-            calc_year -= 1
-        start, end = get_month_range(calc_year, calc_month)
-        month_total = db.session.query(db.func.sum(Expense.amount)).filter(
-            Expense.date >= start,
-            Expense.date <= end
-        ).scalar() or 0
-        month_name = start.strftime('%b %Y')
-        converted_total = convert_amount(month_total, currency)
+    for rollup in rollups:
+        month_name = rollup['month_start'].strftime('%b %Y')
+        converted_total = convert_amount(rollup['expense_total'], currency)
         monthly_data.append({
             'month': month_name,
             'total': converted_total
@@ -530,27 +1684,30 @@ def index():
         monthly_totals.append(converted_total)
     
     # Get income and expenses for current month
-    first_day_of_month = today.replace(day=1)
-    month_income = db.session.query(db.func.sum(Income.amount)).filter(
-        Income.date >= first_day_of_month
-    ).scalar() or 0
-    
-    month_expenses_total = db.session.query(db.func.sum(Expense.amount)).filter(
-        Expense.date >= first_day_of_month
-    ).scalar() or 0
+    month_income = rollups[-1]['income_total']
+    month_expenses_total = rollups[-1]['expense_total']
     
     month_income_converted = convert_amount(month_income, currency)
     month_expenses_converted = convert_amount(month_expenses_total, currency)
     net_savings = month_income_converted - month_expenses_converted
     
+    # Streaks come from the activity bitmap, not a scan of expense dates
+    stats = get_user_stats(user_id)
+    streak = {
+        'current': current_streak(stats.activity_bitmap, today),
+        'longest': stats.longest_streak,
+        'last_30': days_active(stats.activity_bitmap, today - timedelta(days=29), today)
+    }
+    
     # Convert expense amounts for display
     expense_list = []
-    for e in expenses:
+    converted_amounts = convert_amounts([e.amount for e in expenses], currency)
+    for e, amount in zip(expenses, converted_amounts):
         expense_list.append({
             'id': e.id,
             'date': e.date,
             'category': e.category,
-            'amount': convert_amount(e.amount, currency),
+            'amount': amount,
             'note': e.note,
             'payment_method': e.payment_method
         })
@@ -566,40 +1723,47 @@ def index():
         sort_by=sort_by,
         search_query=search_query,
         payment_filter=payment_filter,
+        min_amount=min_amount,
+        max_amount=max_amount,
         total=total,
         top_categories=top_categories,
         monthly_data=monthly_data,
         monthly_labels=monthly_labels,
         monthly_totals=monthly_totals,
-        expense_count=len(expenses),
+        expense_count=expense_count,
+        next_url=next_url,
+        prev_url=prev_url,
         payment_totals=payment_totals,
         month_income=month_income_converted,
-        net_savings=net_savings
+        net_savings=net_savings,
+        streak=streak
     )
 
 @app.route("/analytics")
 @login_required
 def analytics():
     """Comprehensive analytics and insights page"""
+    user_id = session['user_id']
     currency = get_currency()
+    record_analytics_visit(user_id)
+    db.session.commit()
     
-    all_expenses = Expense.query.all()
-    total_expenses = sum(convert_amount(e.amount, currency) for e in all_expenses)
-    expense_count = len(all_expenses)
+    breakdown = aggregate_expenses(user_id, ('category', 'payment_method'))
+    expense_sum, expense_count = grand_total(breakdown)
+    total_expenses = convert_amount(expense_sum, currency)
     
     # Get total income
-    all_income = Income.query.all()
-    total_income = sum(convert_amount(i.amount, currency) for i in all_income)
+    total_income = convert_amount(grand_total(aggregate_income(user_id))[0], currency)
     
     category_totals = defaultdict(float)
     category_counts = defaultdict(int)
     payment_totals = defaultdict(float)
     
-    for e in all_expenses:
-        converted_amount = convert_amount(e.amount, currency)
-        category_totals[e.category] += converted_amount
-        category_counts[e.category] += 1
-        payment_totals[e.payment_method] += converted_amount
+    for (category, payment_method), (amount, count) in breakdown.items():
+        converted_amount = convert_amount(amount, currency)
+        category_totals[category] += converted_amount
+        category_counts[category] += count
+        payment_totals[payment_method] += converted_amount
     
     category_data = [
         {
@@ -616,40 +1780,21 @@ def analytics():
     # 12-month trend analysis
     monthly_trend = []
     today = datetime.now().date()
-    for i in range(11, -1, -1):
-        calc_month = today.month - i
-        calc_year = today.year
-        while calc_month <= 0:
-            calc_month += 12
-            calc_year -= 1
-        start, end = get_month_range(calc_year, calc_month)
-        
-        month_total = db.session.query(db.func.sum(Expense.amount)).filter(
-            Expense.date >= start,
-            Expense.date <= end
-        ).scalar() or 0
-        
-        month_income = db.session.query(db.func.sum(Income.amount)).filter(
-            Income.date >= start,
-            Income.date <= end
-        ).scalar() or 0
-        
-        month_count = Expense.query.filter(Expense.date >= start, Expense.date <= end).count()
-        
-        month_total_converted = convert_amount(month_total, currency)
-        month_income_converted = convert_amount(month_income, currency)
+    for rollup in get_monthly_rollups(user_id, 12, today):
+        month_total_converted = convert_amount(rollup['expense_total'], currency)
+        month_income_converted = convert_amount(rollup['income_total'], currency)
         
         monthly_trend.append({
-            'month': start.strftime('%b %Y'),
+            'month': rollup['month_start'].strftime('%b %Y'),
             'total': month_total_converted,
             'income': month_income_converted,
-            'count': month_count,
+            'count': rollup['expense_count'],
             'savings': month_income_converted - month_total_converted
         })
     
     # Calculate averages
-    if all_expenses:
-        first_expense_date = min(e.date for e in all_expenses)
+    first_expense_date = db.session.query(db.func.min(Expense.date)).filter(Expense.user_id == user_id).scalar()
+    if first_expense_date:
         days_tracked = (today - first_expense_date).days + 1
         daily_avg = total_expenses / days_tracked if days_tracked > 0 else 0
     else:
@@ -684,6 +1829,7 @@ def analytics():
 @login_required
 def budgets():
     """Budget management page"""
+    user_id = session['user_id']
     currency = get_currency()
     today = datetime.now()
     current_month = today.month
@@ -700,16 +1846,20 @@ def budgets():
             
             # Check if budget already exists for this category and month
             existing_budget = Budget.query.filter_by(
+                user_id=user_id,
                 category=category,
                 month=current_month,
                 year=current_year
             ).first()
             
             if existing_budget:
+                if float(existing_budget.amount) != amount:
+                    existing_budget.alerted_threshold = None
                 existing_budget.amount = amount
                 flash(f"Budget for {category} updated! 💰", "success")
             else:
                 new_budget = Budget(
+                    user_id=user_id,
                     category=category,
                     amount=amount,
                     month=current_month,
@@ -718,6 +1868,7 @@ def budgets():
                 db.session.add(new_budget)
                 flash(f"Budget for {category} created! 💰", "success")
             
+            refresh_snapshot(user_id, 'budgets')
             db.session.commit()
         except ValueError:
             flash("Invalid input. Please check your data.", "danger")
@@ -728,15 +1879,12 @@ def budgets():
         return redirect("/budgets")
     
     # Get current month's budgets
-    budgets = Budget.query.filter_by(month=current_month, year=current_year).all()
+    budgets = Budget.query.filter_by(user_id=user_id, month=current_month, year=current_year).all()
     
     first_day = today.replace(day=1).date()
-    month_expenses = Expense.query.filter(Expense.date >= first_day).all()
     
     # Calculate category spending
-    category_spending = defaultdict(float)
-    for e in month_expenses:
-        category_spending[e.category] += convert_amount(e.amount, currency)
+    category_spending = convert_totals(get_category_spending(user_id, first_day), currency)
     
     budget_data = []
     total_budget = 0
@@ -764,8 +1912,7 @@ def budgets():
         total_budget += budget_amount
         total_spent += spent
     
-    all_expenses = Expense.query.all()
-    categories = sorted(set(e.category for e in all_expenses))
+    categories = get_categories(user_id)
     
     return render_template(
         "budgets.html",
@@ -774,13 +1921,15 @@ def budgets():
         current_month=calendar.month_name[current_month],
         current_year=current_year,
         total_budget=total_budget,
-        total_spent=total_spent
+        total_spent=total_spent,
+        ai_tips=get_user_tips(user_id, 'budgets')
     )
 
 @app.route("/savings", methods=["GET", "POST"])
 @login_required
 def savings():
     """Savings goals management"""
+    user_id = session['user_id']
     currency = get_currency()
     
     if request.method == "POST":
@@ -798,12 +1947,15 @@ def savings():
                 deadline = datetime.strptime(deadline, "%Y-%m-%d").date()
             
             new_goal = SavingsGoal(
+                user_id=user_id,
                 name=name,
                 target_amount=target_amount,
                 current_amount=current_amount,
                 deadline=deadline
             )
             db.session.add(new_goal)
+            refresh_snapshot(user_id, 'savings')
+            record_activity(user_id, **goal_stats(new_goal))
             db.session.commit()
             flash("Savings goal created successfully! 🎯", "success")
         except ValueError:
@@ -814,7 +1966,7 @@ def savings():
             flash("Error creating savings goal. Please try again.", "danger")
         return redirect("/savings")
     
-    savings_goals = SavingsGoal.query.all()
+    savings_goals = SavingsGoal.query.filter_by(user_id=user_id).all()
     
     # Convert amounts to selected currency
     goals_list = []
@@ -845,13 +1997,15 @@ def savings():
         savings_goals=goals_list,
         total_target=total_target,
         total_current=total_current,
-        overall_progress=overall_progress
+        overall_progress=overall_progress,
+        ai_tips=get_user_tips(user_id, 'savings')
     )
 
 @app.route("/income", methods=["GET", "POST"])
 @login_required
 def income():
     """Income tracking and management"""
+    user_id = session['user_id']
     currency = get_currency()
     
     if request.method == "POST":
@@ -866,12 +2020,14 @@ def income():
                 return redirect("/income")
             
             new_income = Income(
+                user_id=user_id,
                 date=date,
                 source=source,
                 amount=amount,
                 note=note
             )
             db.session.add(new_income)
+            record_income_change(new_income)
             db.session.commit()
             flash("Income added successfully! 💵", "success")
         except ValueError:
@@ -883,42 +2039,31 @@ def income():
         return redirect("/income")
     
     # Get all income records
-    income_records = Income.query.order_by(Income.date.desc()).all()
-    total_income = sum(convert_amount(i.amount, currency) for i in income_records)
+    income_records = Income.query.filter_by(user_id=user_id).order_by(Income.date.desc()).all()
+    income_amounts = convert_amounts([i.amount for i in income_records], currency)
+    total_income = sum(income_amounts)
     
-    # Get all expenses for comparison
-    all_expenses = Expense.query.all()
-    total_expenses = sum(convert_amount(e.amount, currency) for e in all_expenses)
+    # Get total expenses for comparison
+    total_expenses = convert_amount(grand_total(aggregate_expenses(user_id))[0], currency)
     net_savings = total_income - total_expenses
     
     # Monthly income trend
     monthly_income = []
-    today = datetime.now().date()
-    for i in range(5, -1, -1):
-        calc_month = today.month - i
-        calc_year = today.year
-        while calc_month <= 0:
-            calc_month += 12
-            calc_year -= 1
-        start, end = get_month_range(calc_year, calc_month)
-        month_total = db.session.query(db.func.sum(Income.amount)).filter(
-            Income.date >= start,
-            Income.date <= end
-        ).scalar() or 0
-        month_name = start.strftime('%b %Y')
+    for rollup in get_monthly_rollups(user_id, 6):
+        month_name = rollup['month_start'].strftime('%b %Y')
         monthly_income.append({
             'month': month_name,
-            'total': convert_amount(month_total, currency)
+            'total': convert_amount(rollup['income_total'], currency)
         })
     
     # Convert income amounts for display
     income_list = []
-    for i in income_records:
+    for i, amount in zip(income_records, income_amounts):
         income_list.append({
             'id': i.id,
             'date': i.date,
             'source': i.source,
-            'amount': convert_amount(i.amount, currency),
+            'amount': amount,
             'note': i.note
         })
     
@@ -935,6 +2080,7 @@ def income():
 @login_required
 def recurring():
     """Recurring expenses management"""
+    user_id = session['user_id']
     currency = get_currency()
     
     if request.method == "POST":
@@ -950,14 +2096,18 @@ def recurring():
                 return redirect("/recurring")
             
             new_recurring = RecurringExpense(
+                user_id=user_id,
                 name=name,
                 category=category,
                 amount=amount,
                 frequency=frequency,
                 next_due=next_due,
+                due_day=next_due.day,
                 is_active=True
             )
             db.session.add(new_recurring)
+            refresh_snapshot(user_id, 'recurring')
+            record_activity(user_id, recurring_count=1)
             db.session.commit()
             flash("Recurring expense added successfully! 🔄", "success")
         except ValueError:
@@ -968,9 +2118,8 @@ def recurring():
             flash("Error adding recurring expense. Please try again.", "danger")
         return redirect("/recurring")
     
-    recurring_expenses = RecurringExpense.query.filter_by(is_active=True).all()
-    all_expenses = Expense.query.all()
-    categories = sorted(set(e.category for e in all_expenses))
+    recurring_expenses = RecurringExpense.query.filter_by(user_id=user_id, is_active=True).all()
+    categories = get_categories(user_id)
     
     # Convert amounts for display
     recurring_list = []
@@ -988,7 +2137,8 @@ def recurring():
     return render_template(
         "recurring.html",
         recurring_expenses=recurring_list,
-        categories=categories
+        categories=categories,
+        ai_tips=get_user_tips(user_id, 'recurring')
     )
 
 # DELETE ROUTES
@@ -996,9 +2146,10 @@ def recurring():
 @login_required
 def delete_income(income_id):
     """Delete an income record"""
-    income_record = Income.query.get_or_404(income_id)
+    income_record = Income.query.filter_by(id=income_id, user_id=session['user_id']).first_or_404()
     try:
         db.session.delete(income_record)
+        record_income_change(income_record, -1)
         db.session.commit()
         flash("Income record deleted successfully!", "success")
     except Exception as e:
@@ -1011,9 +2162,15 @@ def delete_income(income_id):
 @login_required
 def toggle_recurring(recurring_id):
     """Toggle recurring expense active status"""
-    recurring = RecurringExpense.query.get_or_404(recurring_id)
+    recurring = RecurringExpense.query.filter_by(id=recurring_id, user_id=session['user_id']).first_or_404()
     try:
         recurring.is_active = not recurring.is_active
+        if recurring.is_active and recurring.frequency in RECURRING_FREQUENCIES:
+            # Occurrences that fell due while paused are skipped, not backfilled by the next posting run
+            today = datetime.now().date()
+            while recurring.next_due < today:
+                recurring.next_due = advance_due_date(recurring.next_due, recurring.frequency, recurring.due_day)
+        refresh_snapshot(recurring.user_id, 'recurring')
         db.session.commit()
         status = "activated" if recurring.is_active else "deactivated"
         flash(f"Recurring expense {status}!", "success")
@@ -1027,9 +2184,11 @@ def toggle_recurring(recurring_id):
 @login_required
 def delete_recurring(recurring_id):
     """Delete a recurring expense"""
-    recurring = RecurringExpense.query.get_or_404(recurring_id)
+    recurring = RecurringExpense.query.filter_by(id=recurring_id, user_id=session['user_id']).first_or_404()
     try:
         db.session.delete(recurring)
+        refresh_snapshot(recurring.user_id, 'recurring')
+        record_activity(recurring.user_id, recurring_count=-1)
         db.session.commit()
         flash("Recurring expense deleted successfully!", "success")
     except Exception as e:
@@ -1042,13 +2201,16 @@ def delete_recurring(recurring_id):
 @login_required
 def update_savings(goal_id):
     """Update savings goal progress"""
-    goal = SavingsGoal.query.get_or_404(goal_id)
+    goal = SavingsGoal.query.filter_by(id=goal_id, user_id=session['user_id']).first_or_404()
     try:
         current_amount = float(request.form["current_amount"])
         if current_amount < 0:
             flash("Amount cannot be negative!", "danger")
             return redirect("/savings")
+        previous = goal_stats(goal)
         goal.current_amount = current_amount
+        refresh_snapshot(goal.user_id, 'savings')
+        record_activity(goal.user_id, **{field: value - previous[field] for field, value in goal_stats(goal).items()})
         db.session.commit()
         flash("Savings goal updated successfully! 💰", "success")
     except Exception as e:
@@ -1061,9 +2223,11 @@ def update_savings(goal_id):
 @login_required
 def delete_savings(goal_id):
     """Delete a savings goal"""
-    goal = SavingsGoal.query.get_or_404(goal_id)
+    goal = SavingsGoal.query.filter_by(id=goal_id, user_id=session['user_id']).first_or_404()
     try:
         db.session.delete(goal)
+        refresh_snapshot(goal.user_id, 'savings')
+        record_activity(goal.user_id, **{field: -value for field, value in goal_stats(goal).items()})
         db.session.commit()
         flash("Savings goal deleted successfully!", "success")
     except Exception as e:
@@ -1076,9 +2240,10 @@ def delete_savings(goal_id):
 @login_required
 def delete_budget(budget_id):
     """Delete a budget"""
-    budget = Budget.query.get_or_404(budget_id)
+    budget = Budget.query.filter_by(id=budget_id, user_id=session['user_id']).first_or_404()
     try:
         db.session.delete(budget)
+        refresh_snapshot(budget.user_id, 'budgets')
         db.session.commit()
         flash("Budget deleted successfully!", "success")
     except Exception as e:
@@ -1087,111 +2252,224 @@ def delete_budget(budget_id):
         flash("Error deleting budget.", "danger")
     return redirect("/budgets")
 
-@app.route("/export")
+@app.route("/import", methods=["POST"])
 @login_required
-def export_csv():
-    """Export ALL user data to a comprehensive CSV file"""
-    currency = get_currency()
-    today_dt = datetime.now()
-    today = today_dt.date()
-    
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # SECTION 1: EXPENSES
-    writer.writerow(["=== EXPENSES ==="])
-    writer.writerow(["Date", "Category", "Amount", "Note", "Payment Method"])
-    expenses = Expense.query.order_by(Expense.date.desc()).all()
-    total_expenses = 0
-    for e in expenses:
-        amt = convert_amount(e.amount, currency)
-        total_expenses += amt
-        writer.writerow([e.date.strftime("%Y-%m-%d"), e.category, f"{amt:.2f}", e.note or "", e.payment_method])
-    writer.writerow(["", "", f"Total: {total_expenses:.2f}", "", ""])
-    writer.writerow([])
-    
-    # SECTION 2: INCOME
-    writer.writerow(["=== INCOME ==="])
-    writer.writerow(["Date", "Source", "Amount", "Note"])
-    income_records = Income.query.order_by(Income.date.desc()).all()
-    total_income = 0
-    for i in income_records:
-        amt = convert_amount(i.amount, currency)
-        total_income += amt
-        writer.writerow([i.date.strftime("%Y-%m-%d"), i.source, f"{amt:.2f}", i.note or ""])
-    writer.writerow(["", "", f"Total: {total_income:.2f}", ""])
-    writer.writerow([])
-    
-    # SECTION 3: BUDGETS
-    writer.writerow(["=== BUDGETS (Current Month) ==="])
-    writer.writerow(["Category", "Budget Amount", "Spent", "Remaining", "Utilization %"])
-    budgets_list = Budget.query.filter_by(month=today_dt.month, year=today_dt.year).all()
-    first_day = today.replace(day=1)
-    month_expenses = Expense.query.filter(Expense.date >= first_day).all()
-    cat_spending = defaultdict(float)
-    for e in month_expenses:
-        cat_spending[e.category] += convert_amount(e.amount, currency)
-    for b in budgets_list:
-        b_amt = convert_amount(b.amount, currency)
-        spent = cat_spending.get(b.category, 0)
-        writer.writerow([b.category, f"{b_amt:.2f}", f"{spent:.2f}", f"{b_amt - spent:.2f}", f"{(spent/b_amt*100) if b_amt > 0 else 0:.1f}%"])
-    writer.writerow([])
+def import_statement_upload():
+    """Import a CSV/OFX bank statement; progress is streamed as server-sent events when requested"""
+    user_id = session['user_id']
+    upload = request.files.get('statement')
+    streaming = 'text/event-stream' in request.headers.get('Accept', '')
+    if not upload or not upload.filename:
+        if streaming:
+            return jsonify({'success': False, 'error': 'Choose a statement file to import.'}), 400
+        flash("Choose a statement file to import.", "danger")
+        return redirect("/")
+
+    statement_format = detect_statement_format(upload.filename, request.form.get('format'))
+    rows = open_statement(upload.stream, statement_format)
+    imports = import_statement(user_id, rows,
+                               positive_debits=bool(request.form.get('positive_debits')),
+                               default_category=request.form.get('category', '').strip() or IMPORT_DEFAULT_CATEGORY)
+
+    if streaming:
+        def events():
+            stats = None
+            try:
+                for stats in imports:
+                    yield sse_event(stats, event='progress')
+                yield sse_event({'message': describe_import(stats), **stats}, event='done')
+            except ValueError as e:
+                yield sse_event({'error': str(e)}, event='error')
+            except Exception as e:
+                logger.error(f"Error importing statement: {e}")
+                yield sse_event({'error': 'Import failed part-way; the rows counted so far were saved.'}, event='error')
+        return Response(stream_with_context(events()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    try:
+        stats = None
+        for stats in imports:
+            pass
+        flash(f"Statement imported: {describe_import(stats)} 📥", "success")
+    except ValueError as e:
+        flash(f"Could not read statement: {e}", "danger")
+    except Exception as e:
+        logger.error(f"Error importing statement: {e}")
+        flash("Import failed part-way; the rows counted so far were saved.", "danger")
+    return redirect("/")
+
+EXPORT_YIELD_PER = 1000
+
+class _CSVLine:
+    """File-like target that hands csv.writer's formatted line straight back to the caller"""
+    def write(self, value):
+        return value
+
+@app.route("/export")
+@login_required
+def export_csv():
+    """Export ALL user data to a comprehensive CSV file, streamed as it is generated"""
+    user_id = session['user_id']
+    currency = get_currency()
+    today_dt = datetime.now()
+    today = today_dt.date()
+    rate = get_currency_rate(currency)
     
-    # SECTION 4: SAVINGS GOALS
-    writer.writerow(["=== SAVINGS GOALS ==="])
-    writer.writerow(["Goal Name", "Current Amount", "Target Amount", "Progress %", "Deadline"])
-    savings_goals = SavingsGoal.query.all()
-    for g in savings_goals:
-        cur = convert_amount(g.current_amount, currency)
-        tgt = convert_amount(g.target_amount, currency)
-        pct = (cur / tgt * 100) if tgt > 0 else 0
-        writer.writerow([g.name, f"{cur:.2f}", f"{tgt:.2f}", f"{pct:.1f}%", g.deadline.strftime("%Y-%m-%d") if g.deadline else "No deadline"])
-    writer.writerow([])
+    def generate():
+        writer = csv.writer(_CSVLine())
+        
+        # SECTION 1: EXPENSES (paged from the database, never held in memory)
+        yield writer.writerow(["=== EXPENSES ==="]) + writer.writerow(["Date", "Category", "Amount", "Note", "Payment Method"])
+        expenses = db.session.execute(
+            db.select(Expense.date, Expense.category, Expense.amount, Expense.note, Expense.payment_method)
+            .where(Expense.user_id == user_id).order_by(Expense.date.desc(), Expense.id.desc())
+            .execution_options(yield_per=EXPORT_YIELD_PER)
+        )
+        total_expenses = 0
+        expense_count = 0
+        for partition in expenses.partitions():
+            lines = []
+            for e in partition:
+                amt = float(e.amount) * rate
+                total_expenses += amt
+                lines.append(writer.writerow([e.date.strftime("%Y-%m-%d"), e.category, f"{amt:.2f}", e.note or "", e.payment_method]))
+            expense_count += len(partition)
+            yield ''.join(lines)
+        yield writer.writerow(["", "", f"Total: {total_expenses:.2f}", "", ""]) + writer.writerow([])
+        
+        # SECTION 2: INCOME
+        yield writer.writerow(["=== INCOME ==="]) + writer.writerow(["Date", "Source", "Amount", "Note"])
+        income_records = db.session.execute(
+            db.select(Income.date, Income.source, Income.amount, Income.note)
+            .where(Income.user_id == user_id).order_by(Income.date.desc(), Income.id.desc())
+            .execution_options(yield_per=EXPORT_YIELD_PER)
+        )
+        total_income = 0
+        income_count = 0
+        for partition in income_records.partitions():
+            lines = []
+            for i in partition:
+                amt = float(i.amount) * rate
+                total_income += amt
+                lines.append(writer.writerow([i.date.strftime("%Y-%m-%d"), i.source, f"{amt:.2f}", i.note or ""]))
+            income_count += len(partition)
+            yield ''.join(lines)
+        yield writer.writerow(["", "", f"Total: {total_income:.2f}", ""]) + writer.writerow([])
+        
+        # SECTION 3: BUDGETS
+        lines = [writer.writerow(["=== BUDGETS (Current Month) ==="]),
+                 writer.writerow(["Category", "Budget Amount", "Spent", "Remaining", "Utilization %"])]
+        budgets_list = Budget.query.filter_by(user_id=user_id, month=today_dt.month, year=today_dt.year).all()
+        first_day = today.replace(day=1)
+        cat_spending = convert_totals(get_category_spending(user_id, first_day), currency)
+        for b in budgets_list:
+            b_amt = convert_amount(b.amount, currency)
+            spent = cat_spending.get(b.category, 0)
+            lines.append(writer.writerow([b.category, f"{b_amt:.2f}", f"{spent:.2f}", f"{b_amt - spent:.2f}", f"{(spent/b_amt*100) if b_amt > 0 else 0:.1f}%"]))
+        lines.append(writer.writerow([]))
+        
+        # SECTION 4: SAVINGS GOALS
+        lines.append(writer.writerow(["=== SAVINGS GOALS ==="]))
+        lines.append(writer.writerow(["Goal Name", "Current Amount", "Target Amount", "Progress %", "Deadline"]))
+        savings_goals = SavingsGoal.query.filter_by(user_id=user_id).all()
+        for g in savings_goals:
+            cur = convert_amount(g.current_amount, currency)
+            tgt = convert_amount(g.target_amount, currency)
+            pct = (cur / tgt * 100) if tgt > 0 else 0
+            lines.append(writer.writerow([g.name, f"{cur:.2f}", f"{tgt:.2f}", f"{pct:.1f}%", g.deadline.strftime("%Y-%m-%d") if g.deadline else "No deadline"]))
+        lines.append(writer.writerow([]))
+        
+        # SECTION 5: RECURRING EXPENSES
+        lines.append(writer.writerow(["=== RECURRING EXPENSES ==="]))
+        lines.append(writer.writerow(["Name", "Category", "Amount", "Frequency", "Next Due", "Status"]))
+        recurring_list = RecurringExpense.query.filter_by(user_id=user_id).all()
+        for r in recurring_list:
+            r_amt = convert_amount(r.amount, currency)
+            lines.append(writer.writerow([r.name, r.category, f"{r_amt:.2f}", r.frequency, r.next_due.strftime("%Y-%m-%d"), "Active" if r.is_active else "Paused"]))
+        lines.append(writer.writerow([]))
+        
+        # SECTION 6: SUMMARY
+        lines += [
+            writer.writerow(["=== FINANCIAL SUMMARY ==="]),
+            writer.writerow(["Metric", "Value"]),
+            writer.writerow(["Total Income", f"{currency}{total_income:.2f}"]),
+            writer.writerow(["Total Expenses", f"{currency}{total_expenses:.2f}"]),
+            writer.writerow(["Net Balance", f"{currency}{total_income - total_expenses:.2f}"]),
+            writer.writerow(["Expense Count", expense_count]),
+            writer.writerow(["Income Records", income_count]),
+            writer.writerow(["Active Budgets", len(budgets_list)]),
+            writer.writerow(["Savings Goals", len(savings_goals)]),
+            writer.writerow(["Recurring Expenses", len(recurring_list)]),
+            writer.writerow(["Currency", currency]),
+            writer.writerow(["Export Date", today_dt.strftime("%Y-%m-%d %H:%M:%S")]),
+        ]
+        yield ''.join(lines)
     
-    # SECTION 5: RECURRING EXPENSES
-    writer.writerow(["=== RECURRING EXPENSES ==="])
-    writer.writerow(["Name", "Category", "Amount", "Frequency", "Next Due", "Status"])
-    recurring_list = RecurringExpense.query.all()
-    for r in recurring_list:
-        r_amt = convert_amount(r.amount, currency)
-        writer.writerow([r.name, r.category, f"{r_amt:.2f}", r.frequency, r.next_due.strftime("%Y-%m-%d"), "Active" if r.is_active else "Paused"])
-    writer.writerow([])
-    
-    # SECTION 6: SUMMARY
-    writer.writerow(["=== FINANCIAL SUMMARY ==="])
-    writer.writerow(["Metric", "Value"])
-    writer.writerow(["Total Income", f"{currency}{total_income:.2f}"])
-    writer.writerow(["Total Expenses", f"{currency}{total_expenses:.2f}"])
-    writer.writerow(["Net Balance", f"{currency}{total_income - total_expenses:.2f}"])
-    writer.writerow(["Expense Count", len(expenses)])
-    writer.writerow(["Income Records", len(income_records)])
-    writer.writerow(["Active Budgets", len(budgets_list)])
-    writer.writerow(["Savings Goals", len(savings_goals)])
-    writer.writerow(["Recurring Expenses", len(recurring_list)])
-    writer.writerow(["Currency", currency])
-    writer.writerow(["Export Date", today_dt.strftime("%Y-%m-%d %H:%M:%S")])
-    
-    output.seek(0)
     filename = f"money_mate_full_report_{today_dt.strftime('%Y%m%d_%H%M%S')}.csv"
-    
-    return send_file(
-        io.BytesIO(output.getvalue().encode()),
+    return Response(
+        stream_with_context(generate()),
         mimetype="text/csv",
-        as_attachment=True,
-        download_name=filename
+        headers={'Content-Disposition': f'attachment; filename={filename}', 'X-Accel-Buffering': 'no'}
     )
 
-@app.route("/export_pdf")
+@app.route("/export/columnar")
 @login_required
-def export_pdf():
-    """Export ALL user data to a well-structured PDF file"""
-    currency = get_currency()
+def export_columnar():
+    """
+    One table as a typed Parquet or Arrow IPC file, streamed batch by batch.
+    ?incremental=1 sends only expenses/income inserted since the last incremental
+    export; later edits and deletes of rows already sent are not included, so
+    take a full export to resync.
+    """
+    user_id = session['user_id']
+    if pa is None:
+        return jsonify({'success': False, 'error': 'Columnar export needs pyarrow installed on the server.'}), 501
+    table = request.args.get('table', 'expenses')
+    columnar_format = request.args.get('format', 'parquet')
+    if table not in COLUMNAR_TABLES or columnar_format not in COLUMNAR_FORMATS:
+        return jsonify({'success': False, 'error': f"Choose table from {', '.join(COLUMNAR_TABLES)} "
+                                                   f"and format from {', '.join(COLUMNAR_FORMATS)}."}), 400
+    
+    since_id, until_id = export_id_range(user_id, table, request.args.get('incremental') == '1')
+    mimetype, extension = COLUMNAR_FORMATS[columnar_format]
+    
+    def generate():
+        yield from stream_columnar(columnar_batches(user_id, table, since_id, until_id),
+                                   columnar_schema(table), columnar_format)
+        # Only a fully generated file moves the cursor, so an aborted download is sent again next time
+        if until_id is not None:
+            advance_export_cursor(user_id, table, until_id)
+            db.session.commit()
+    
+    filename = f"money_mate_{table}_after_{since_id}.{extension}" if until_id is not None else f"money_mate_{table}.{extension}"
+    headers = {'Content-Disposition': f'attachment; filename={filename}', 'X-Accel-Buffering': 'no'}
+    if until_id is not None and until_id > since_id:
+        headers['X-Export-Range'] = f"{since_id + 1}-{until_id}"
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers=headers)
+
+# ==================== PDF REPORTS ====================
+# Finished reports are files named <user>-<currency>-<key>.pdf; the key changes whenever the report content would
+REPORT_INLINE_WAIT = float(os.environ.get('REPORT_INLINE_WAIT', 3.0))
+
+_report_jobs = {}
+_report_jobs_lock = threading.Lock()
+
+def report_cache_key(user_id, currency):
+    """Hash of everything the PDF depends on: the user's data version, currency and rate, and today's date"""
+    snapshot = read_financial_snapshot(user_id)
+    parts = [user_id, currency, snapshot.data_version, datetime.now().date().isoformat(), get_currency_rate(currency)]
+    return hashlib.sha256(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+def report_artifact_path(user_id, currency, key):
+    iso = SYMBOL_TO_ISO.get(currency, currency)
+    return os.path.join(app.config['REPORT_CACHE_DIR'], f"{user_id}-{iso}-{key}.pdf")
+
+def build_pdf_report(user_id, currency, path):
+    """Render the user's full PDF report to `path`"""
     today_dt = datetime.now()
     today = today_dt.date()
     
-    # Create PDF buffer
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=50, leftMargin=50, topMargin=50, bottomMargin=50)
+    doc = SimpleDocTemplate(path, pagesize=letter, rightMargin=50, leftMargin=50, topMargin=50, bottomMargin=50)
     
     # Container for PDF elements
     elements = []
@@ -1223,11 +2501,11 @@ def export_pdf():
     # SECTION 1: FINANCIAL SUMMARY
     elements.append(Paragraph("Financial Summary", heading_style))
     
-    expenses = Expense.query.order_by(Expense.date.desc()).all()
-    total_expenses = sum(convert_amount(e.amount, currency) for e in expenses)
+    expense_sum, expense_count = grand_total(aggregate_expenses(user_id))
+    total_expenses = convert_amount(expense_sum, currency)
     
-    income_records = Income.query.order_by(Income.date.desc()).all()
-    total_income = sum(convert_amount(i.amount, currency) for i in income_records)
+    income_sum, income_count = grand_total(aggregate_income(user_id))
+    total_income = convert_amount(income_sum, currency)
     
     net_balance = total_income - total_expenses
     
@@ -1236,8 +2514,8 @@ def export_pdf():
         ['Total Income', f'{currency}{total_income:,.2f}'],
         ['Total Expenses', f'{currency}{total_expenses:,.2f}'],
         ['Net Balance', f'{currency}{net_balance:,.2f}'],
-        ['Total Transactions', str(len(expenses))],
-        ['Income Records', str(len(income_records))],
+        ['Total Transactions', str(expense_count)],
+        ['Income Records', str(income_count)],
         ['Currency', currency]
     ]
     
@@ -1260,7 +2538,7 @@ def export_pdf():
     elements.append(Paragraph("Recent Expenses", heading_style))
     
     expense_data = [['Date', 'Category', 'Amount', 'Payment', 'Note']]
-    for e in expenses[:20]:  # Show last 20 expenses
+    for e in Expense.query.filter_by(user_id=user_id).order_by(Expense.date.desc()).limit(20):  # Show last 20 expenses
         amt = convert_amount(e.amount, currency)
         expense_data.append([
             e.date.strftime("%Y-%m-%d"),
@@ -1293,7 +2571,7 @@ def export_pdf():
     elements.append(Paragraph("Income Records", heading_style))
     
     income_data = [['Date', 'Source', 'Amount', 'Note']]
-    for i in income_records[:15]:  # Show last 15 income records
+    for i in Income.query.filter_by(user_id=user_id).order_by(Income.date.desc()).limit(15):  # Show last 15 income records
         amt = convert_amount(i.amount, currency)
         income_data.append([
             i.date.strftime("%Y-%m-%d"),
@@ -1324,12 +2602,9 @@ def export_pdf():
     # SECTION 4: BUDGETS
     elements.append(Paragraph("Current Month Budgets", heading_style))
     
-    budgets_list = Budget.query.filter_by(month=today_dt.month, year=today_dt.year).all()
+    budgets_list = Budget.query.filter_by(user_id=user_id, month=today_dt.month, year=today_dt.year).all()
     first_day = today.replace(day=1)
-    month_expenses = Expense.query.filter(Expense.date >= first_day).all()
-    cat_spending = defaultdict(float)
-    for e in month_expenses:
-        cat_spending[e.category] += convert_amount(e.amount, currency)
+    cat_spending = convert_totals(get_category_spending(user_id, first_day), currency)
     
     budget_data = [['Category', 'Budget', 'Spent', 'Remaining', 'Usage %']]
     for b in budgets_list:
@@ -1366,7 +2641,7 @@ def export_pdf():
     # SECTION 5: SAVINGS GOALS
     elements.append(Paragraph("Savings Goals", heading_style))
     
-    savings_goals = SavingsGoal.query.all()
+    savings_goals = SavingsGoal.query.filter_by(user_id=user_id).all()
     savings_data = [['Goal Name', 'Current', 'Target', 'Progress %', 'Deadline']]
     for g in savings_goals:
         cur = convert_amount(g.current_amount, currency)
@@ -1401,7 +2676,7 @@ def export_pdf():
     # SECTION 6: RECURRING EXPENSES
     elements.append(Paragraph("Recurring Expenses", heading_style))
     
-    recurring_list = RecurringExpense.query.all()
+    recurring_list = RecurringExpense.query.filter_by(user_id=user_id).all()
     recurring_data = [['Name', 'Category', 'Amount', 'Frequency', 'Next Due', 'Status']]
     for r in recurring_list:
         r_amt = convert_amount(r.amount, currency)
@@ -1431,26 +2706,130 @@ def export_pdf():
     else:
         elements.append(Paragraph("No recurring expenses set.", styles['Normal']))
     
-    # Build PDF
     doc.build(elements)
-    
-    buffer.seek(0)
-    filename = f"money_mate_report_{today_dt.strftime('%Y%m%d_%H%M%S')}.pdf"
-    
+
+def render_report_artifact(user_id, currency, key):
+    """Job body: render to a temp file, publish it atomically and drop the user's older reports in this currency"""
+    path = report_artifact_path(user_id, currency, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{threading.get_ident()}.tmp"
+    try:
+        build_pdf_report(user_id, currency, temp_path)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    prefix = os.path.basename(path).rsplit('-', 1)[0] + '-'
+    for name in os.listdir(os.path.dirname(path)):
+        if name.startswith(prefix) and name.endswith('.pdf') and name != os.path.basename(path):
+            try:
+                os.remove(os.path.join(os.path.dirname(path), name))
+            except OSError:
+                pass
+
+def request_report(user_id, currency):
+    """
+    Returns (status, key) where status is 'ready', 'pending' or 'failed'.
+    Queues a render on the job pool unless the artifact already exists or one is in flight.
+    """
+    key = report_cache_key(user_id, currency)
+    if os.path.exists(report_artifact_path(user_id, currency, key)):
+        return 'ready', key
+    started = False
+    with _report_jobs_lock:
+        future = _report_jobs.get(key)
+        if future is not None and future.done():
+            # The file is missing, so the job failed; report it once and let the next request retry
+            del _report_jobs[key]
+            return 'failed', key
+        if future is None:
+            future = _report_jobs[key] = submit_job(render_report_artifact, user_id, currency, key)
+            started = True
+    if started:
+        # Outside the lock: a job that already finished runs the callback right here
+        future.add_done_callback(_forget_finished_report(key, report_artifact_path(user_id, currency, key)))
+    return 'pending', key
+
+def _forget_finished_report(key, path):
+    """Done-callback dropping a successful job from _report_jobs; failed ones stay until request_report reports them"""
+    def forget(future):
+        if os.path.exists(path):
+            with _report_jobs_lock:
+                if _report_jobs.get(key) is future:
+                    del _report_jobs[key]
+    return forget
+
+def wait_for_report(key, timeout):
+    with _report_jobs_lock:
+        future = _report_jobs.get(key)
+    if future is not None:
+        wait([future], timeout=timeout)
+
+def send_report(user_id, currency, key):
     return send_file(
-        buffer,
+        report_artifact_path(user_id, currency, key),
         mimetype="application/pdf",
         as_attachment=True,
-        download_name=filename
+        download_name=f"money_mate_report_{datetime.now().strftime('%Y%m%d')}.pdf"
     )
 
+@app.route("/export_pdf")
+@login_required
+def export_pdf():
+    """Download the PDF report, rendering it in the background when the data has changed"""
+    user_id = session['user_id']
+    currency = get_currency()
+    status, key = request_report(user_id, currency)
+    if status == 'pending':
+        # Small reports finish within the wait, so plain links keep working as before
+        wait_for_report(key, REPORT_INLINE_WAIT)
+        status, key = request_report(user_id, currency)
+    if status == 'ready':
+        return send_report(user_id, currency, key)
+    if status == 'failed':
+        flash("Could not generate the PDF report. Please try again.", "danger")
+    else:
+        flash("Your PDF report is being prepared. Try the download again in a moment. ⏳", "info")
+    return redirect("/")
+
+@app.route("/export_pdf/status")
+@login_required
+def export_pdf_status():
+    """Start (if needed) and poll the background PDF render"""
+    user_id = session['user_id']
+    status, key = request_report(user_id, get_currency())
+    return jsonify({
+        'status': status,
+        'download_url': url_for('export_pdf_download', key=key) if status == 'ready' else None
+    })
+
+@app.route("/export_pdf/download/<key>")
+@login_required
+def export_pdf_download(key):
+    """Serve a finished report artifact"""
+    user_id = session['user_id']
+    currency = get_currency()
+    if not re.fullmatch(r'[0-9a-f]{64}', key) or not os.path.exists(report_artifact_path(user_id, currency, key)):
+        abort(404)
+    return send_report(user_id, currency, key)
+
 @app.route("/clear", methods=["POST"])
 @login_required
 def clear_all():
-    """Clear all expenses (use with caution)"""
+    """Clear all of the user's expenses (use with caution)"""
+    user_id = session['user_id']
     try:
-        count = Expense.query.count()
-        Expense.query.delete()
+        count = Expense.query.filter_by(user_id=user_id).count()
+        Expense.query.filter_by(user_id=user_id).delete()
+        MonthlyRollup.query.filter_by(user_id=user_id).update({'expense_total': 0, 'expense_count': 0})
+        ExpenseCategory.query.filter_by(user_id=user_id).delete()
+        CategoryMonthTotal.query.filter_by(user_id=user_id).delete()
+        # Spending is back to zero, so every threshold alerts again on its next crossing
+        Budget.query.filter_by(user_id=user_id).update({'alerted_threshold': None})
+        ExpenseDay.query.filter_by(user_id=user_id).delete()
+        UserStats.query.filter_by(user_id=user_id).update({'expense_count': 0, 'expense_days': 0,
+                                                           'activity_bitmap': b'', 'longest_streak': 0})
+        refresh_snapshot(user_id, 'totals', 'month_spending', 'recent')
         db.session.commit()
         flash(f"Successfully cleared {count} expenses! 🗑️", "success")
     except Exception as e:
@@ -1463,42 +2842,37 @@ def clear_all():
 @login_required
 def edit_expense(expense_id):
     """Edit an existing expense"""
-    expense = Expense.query.get_or_404(expense_id)
-    all_expenses = Expense.query.all()
-    categories = sorted(set(e.category for e in all_expenses))
+    expense = Expense.query.filter_by(id=expense_id, user_id=session['user_id']).first_or_404()
+    categories = get_categories(expense.user_id)
     currency = get_currency()
     
     if request.method == "POST":
         try:
+            # Build missing derived rows before the edit is pending, or the build would count it and the delta again
+            get_user_stats(expense.user_id)
+            read_financial_snapshot(expense.user_id)
+            previous = snapshot_expense(expense)
             expense.date = datetime.strptime(request.form["date"], "%Y-%m-%d").date()
             expense.category = request.form["category"].strip()
             expense.amount = float(request.form["amount"])
             expense.note = request.form.get("note", "").strip()
             expense.payment_method = request.form.get("payment_method", "cash")
+            expense.import_hash = expense_import_hash(expense.date, expense.amount, expense.note)
             
             if expense.amount <= 0:
                 flash("Amount must be greater than 0!", "danger")
                 return render_template("edit.html", expense=expense, categories=categories)
             
+            record_expense_change(previous, -1)
+            record_expense_change(expense)
             db.session.commit()
             
-            # Check budget limits and trigger alert emails
+            # The old category/month may have dropped back under a threshold, the new one crossed it
             try:
-                user = User.query.get(session['user_id'])
-                if user and user.notify_budget_alerts:
-                    today_date = datetime.now()
-                    budget = Budget.query.filter_by(category=expense.category, month=today_date.month, year=today_date.year).first()
-                    if budget:
-                        first_day = today_date.date().replace(day=1)
-                        month_expenses = Expense.query.filter(Expense.date >= first_day, Expense.category == expense.category).all()
-                        total_spent = sum(float(e.amount) for e in month_expenses)
-                        budget_amt = float(budget.amount)
-                        
-                        if budget_amt > 0:
-                            pct = (total_spent / budget_amt) * 100
-                            if pct >= 80:
-                                send_budget_alert_email(user, budget, total_spent, pct)
+                check_budget_alert(expense.user_id, previous.category, previous.date.replace(day=1))
+                check_budget_alert(expense.user_id, expense.category, expense.date.replace(day=1))
             except Exception as e:
+                db.session.rollback()
                 logger.error(f"Error checking budget alert on edit: {e}")
 
             flash("Expense successfully updated! ✅", "success")
@@ -1526,10 +2900,20 @@ def edit_expense(expense_id):
 @login_required
 def delete_expense(expense_id):
     """Delete an expense"""
-    expense = Expense.query.get_or_404(expense_id)
+    expense = Expense.query.filter_by(id=expense_id, user_id=session['user_id']).first_or_404()
+    user_id, category, month_start = expense.user_id, expense.category, expense.date.replace(day=1)
     try:
         db.session.delete(expense)
+        record_expense_change(expense, -1)
         db.session.commit()
+
+        # Dropping back under a threshold re-arms it
+        try:
+            check_budget_alert(user_id, category, month_start)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error checking budget alert on delete: {e}")
+
         flash("Expense successfully deleted! 🗑️", "success")
     except Exception as e:
         db.session.rollback()
@@ -1543,10 +2927,7 @@ def delete_expense(expense_id):
 def chart_data():
     """API endpoint for chart data"""
     currency = get_currency()
-    all_expenses = Expense.query.all()
-    category_totals = defaultdict(float)
-    for e in all_expenses:
-        category_totals[e.category] += convert_amount(e.amount, currency)
+    category_totals = convert_totals(sum_by(aggregate_expenses(session['user_id'], ('category',))), currency)
     
     return jsonify({
         'categories': list(category_totals.keys()),
@@ -1562,9 +2943,10 @@ def expense_stats():
     week_ago = today - timedelta(days=7)
     month_ago = today - timedelta(days=30)
     
-    total_expenses = Expense.query.count()
-    weekly_expenses = Expense.query.filter(Expense.date >= week_ago).count()
-    monthly_expenses = Expense.query.filter(Expense.date >= month_ago).count()
+    user_expenses = Expense.query.filter_by(user_id=session['user_id'])
+    total_expenses = user_expenses.count()
+    weekly_expenses = user_expenses.filter(Expense.date >= week_ago).count()
+    monthly_expenses = user_expenses.filter(Expense.date >= month_ago).count()
     
     return jsonify({
         'total': total_expenses,
@@ -1572,49 +2954,26 @@ def expense_stats():
         'monthly': monthly_expenses
     })
 
-# AI Tips API (for dynamic personalized tips)
-@app.route('/api/ai-tips', methods=['GET'])
-@login_required
-def ai_tips_api():
-    """Generate personalized AI tips based on user data"""
-    import time
-    from google.genai import types
+def build_tips_prompt(user_id, page, currency):
+    """Prompt for the AI tips on `page`, built from the user's current data; None for unknown pages"""
+    context_parts = []
     
-    page = request.args.get('page', 'budgets')
-    currency = get_currency()
-    
-    try:
-        user = User.query.get(session['user_id'])
-        api_key = user.gemini_api_key if user and user.gemini_api_key else app.config.get('GEMINI_API_KEY')
-        if not api_key:
-            return jsonify({'success': False, 'error': 'Gemini API key not configured. Please add your key in the Settings page.'})
-            
-        user_client = genai.Client(api_key=api_key)
-
-        # Gather user context based on page
-        context_parts = []
-        
-        if page == 'budgets':
-            today = datetime.now()
-            budgets = Budget.query.filter_by(month=today.month, year=today.year).all()
-            first_day = today.date().replace(day=1)
-            month_expenses = Expense.query.filter(Expense.date >= first_day).all()
-            cat_spending = defaultdict(float)
-            for e in month_expenses:
-                cat_spending[e.category] += float(e.amount)
-            
-            for b in budgets:
-                spent = cat_spending.get(b.category, 0)
-                pct = (spent / float(b.amount) * 100) if float(b.amount) > 0 else 0
-                context_parts.append(f"- {b.category}: Budget {currency}{float(b.amount):,.2f}, Spent {currency}{spent:,.2f} ({pct:.0f}% used)")
-            
-            all_expenses = Expense.query.all()
-            total_exp = sum(float(e.amount) for e in all_expenses)
-            all_income = Income.query.all()
-            total_inc = sum(float(i.amount) for i in all_income)
-            
-            context_str = "\n".join(context_parts) if context_parts else "No budgets set yet."
-            prompt = f"""Based on this user's budget data, generate exactly 4 short personalized budgeting tips. Each tip should be 1 sentence max.
+    if page == 'budgets':
+        today = datetime.now()
+        budgets = Budget.query.filter_by(user_id=user_id, month=today.month, year=today.year).all()
+        first_day = today.date().replace(day=1)
+        cat_spending = get_category_spending(user_id, first_day)
+        
+        for b in budgets:
+            spent = float(cat_spending.get(b.category, 0))
+            pct = (spent / float(b.amount) * 100) if float(b.amount) > 0 else 0
+            context_parts.append(f"- {b.category}: Budget {currency}{float(b.amount):,.2f}, Spent {currency}{spent:,.2f} ({pct:.0f}% used)")
+        
+        total_exp = float(grand_total(aggregate_expenses(user_id))[0])
+        total_inc = float(grand_total(aggregate_income(user_id))[0])
+        
+        context_str = "\n".join(context_parts) if context_parts else "No budgets set yet."
+        return f"""Based on this user's budget data, generate exactly 4 short personalized budgeting tips. Each tip should be 1 sentence max.
 
 User's budgets this month:
 {context_str}
@@ -1623,18 +2982,17 @@ Total expenses: {currency}{total_exp:,.2f}
 
 Return ONLY the 4 tips, one per line, no numbering, no bullets, no extra text."""
 
-        elif page == 'savings':
-            savings = SavingsGoal.query.all()
-            for s in savings:
-                progress = (float(s.current_amount) / float(s.target_amount) * 100) if float(s.target_amount) > 0 else 0
-                deadline_str = f" (Deadline: {s.deadline.strftime('%d %b %Y')})" if s.deadline else ""
-                context_parts.append(f"- {s.name}: {currency}{float(s.current_amount):,.2f}/{currency}{float(s.target_amount):,.2f} ({progress:.0f}% done){deadline_str}")
-            
-            all_income = Income.query.all()
-            total_inc = sum(float(i.amount) for i in all_income)
-            
-            context_str = "\n".join(context_parts) if context_parts else "No savings goals yet."
-            prompt = f"""Based on this user's savings goals, generate exactly 4 short personalized saving tips. Each tip should be 1 sentence max.
+    elif page == 'savings':
+        savings = SavingsGoal.query.filter_by(user_id=user_id).all()
+        for s in savings:
+            progress = (float(s.current_amount) / float(s.target_amount) * 100) if float(s.target_amount) > 0 else 0
+            deadline_str = f" (Deadline: {s.deadline.strftime('%d %b %Y')})" if s.deadline else ""
+            context_parts.append(f"- {s.name}: {currency}{float(s.current_amount):,.2f}/{currency}{float(s.target_amount):,.2f} ({progress:.0f}% done){deadline_str}")
+        
+        total_inc = float(grand_total(aggregate_income(user_id))[0])
+        
+        context_str = "\n".join(context_parts) if context_parts else "No savings goals yet."
+        return f"""Based on this user's savings goals, generate exactly 4 short personalized saving tips. Each tip should be 1 sentence max.
 
 User's savings goals:
 {context_str}
@@ -1642,57 +3000,70 @@ Monthly income: {currency}{total_inc:,.2f}
 
 Return ONLY the 4 tips, one per line, no numbering, no bullets, no extra text."""
 
-        elif page == 'recurring':
-            recurring = RecurringExpense.query.filter_by(is_active=True).all()
-            total_monthly = 0
-            for r in recurring:
-                amt = float(r.amount)
-                if r.frequency == 'daily':
-                    monthly_cost = amt * 30
-                elif r.frequency == 'weekly':
-                    monthly_cost = amt * 4
-                elif r.frequency == 'yearly':
-                    monthly_cost = amt / 12
-                else:
-                    monthly_cost = amt
-                total_monthly += monthly_cost
-                context_parts.append(f"- {r.name}: {currency}{amt:,.2f}/{r.frequency} ({r.category}, due: {r.next_due.strftime('%d %b %Y')})")
-            
-            context_str = "\n".join(context_parts) if context_parts else "No recurring expenses yet."
-            prompt = f"""Based on this user's recurring expenses, generate exactly 4 short personalized tips. Each tip should be 1 sentence max.
+    elif page == 'recurring':
+        recurring = RecurringExpense.query.filter_by(user_id=user_id, is_active=True).all()
+        total_monthly = 0
+        for r in recurring:
+            amt = float(r.amount)
+            if r.frequency == 'daily':
+                monthly_cost = amt * 30
+            elif r.frequency == 'weekly':
+                monthly_cost = amt * 4
+            elif r.frequency == 'yearly':
+                monthly_cost = amt / 12
+            else:
+                monthly_cost = amt
+            total_monthly += monthly_cost
+            context_parts.append(f"- {r.name}: {currency}{amt:,.2f}/{r.frequency} ({r.category}, due: {r.next_due.strftime('%d %b %Y')})")
+        
+        context_str = "\n".join(context_parts) if context_parts else "No recurring expenses yet."
+        return f"""Based on this user's recurring expenses, generate exactly 4 short personalized tips. Each tip should be 1 sentence max.
 
 User's recurring expenses:
 {context_str}
 Estimated monthly cost: {currency}{total_monthly:,.2f}
 
 Return ONLY the 4 tips, one per line, no numbering, no bullets, no extra text."""
-        else:
+    
+    return None
+
+# AI Tips API (for dynamic personalized tips)
+@app.route('/api/ai-tips', methods=['GET'])
+@login_required
+def ai_tips_api():
+    """Generate personalized AI tips based on user data"""
+    page = request.args.get('page', 'budgets')
+    currency = get_currency()
+    
+    try:
+        user = User.query.get(session['user_id'])
+        api_key = user.gemini_api_key if user and user.gemini_api_key else app.config.get('GEMINI_API_KEY')
+        if not api_key:
+            return jsonify({'success': False, 'error': 'Gemini API key not configured. Please add your key in the Settings page.'})
+
+        # Gather user context based on page
+        prompt = build_tips_prompt(user.id, page, currency)
+        if prompt is None:
             return jsonify({'success': False, 'error': 'Invalid page'})
         
-        # Try models with fallback
-        models_to_try = ['gemini-2.0-flash-lite', 'gemini-2.0-flash', 'gemini-2.5-flash']
+        # Identical context -> identical tips; skip the model call entirely
+        context_hash = tips_context_hash(prompt)
+        cached_tips = get_cached_tips(user.id, page, context_hash)
+        if cached_tips is not None:
+            return jsonify({'success': True, 'tips': cached_tips, 'cached': True})
         
-        for model_name in models_to_try:
-            try:
-                response = user_client.models.generate_content(
-                    model=model_name,
-                    contents=prompt,
-                    config=types.GenerateContentConfig(
-                        temperature=0.8,
-                        max_output_tokens=300
-                    )
-                )
-                
-                if response.text:
-                    tips = [tip.strip() for tip in response.text.strip().split('\n') if tip.strip()]
-                    return jsonify({'success': True, 'tips': tips})
-            except Exception as e:
-                logger.warning(f"Tips model {model_name} failed: {e}")
-                if '429' in str(e) or 'RESOURCE_EXHAUSTED' in str(e):
-                    time.sleep(2)
-                continue
+        try:
+            text = ai_client.generate(api_key, prompt, config=types.GenerateContentConfig(
+                temperature=0.8,
+                max_output_tokens=300
+            ))
+        except ai_client.AIServiceError as e:
+            logger.warning(f"Tips generation failed: {e} ({e.last_error})")
+            return jsonify({'success': False, 'error': 'AI service busy'})
         
-        return jsonify({'success': False, 'error': 'AI service busy'})
+        tips = [tip.strip() for tip in text.strip().split('\n') if tip.strip()]
+        store_user_tips(user.id, page, tips, context_hash)
+        return jsonify({'success': True, 'tips': tips})
         
     except Exception as e:
         logger.error(f"Error generating tips: {e}")
@@ -1713,8 +3084,6 @@ def ai_support_api():
                 'error': 'AI support is not configured. Please go to the Settings page and add your Gemini API Key.'
             })
         
-        user_client = genai.Client(api_key=api_key)
-        
         data = request.get_json()
         user_message = data.get('message', '')
         history = data.get('history', [])
@@ -1722,49 +3091,37 @@ def ai_support_api():
         if not user_message:
             return jsonify({'success': False, 'error': 'No message provided'})
         
-        # Fetch comprehensive user stats to provide full context to the AI
+        # Full financial context comes from the precomputed snapshot: one row, no table scans
         currency = session.get('currency', '₹')
-        today = datetime.now().date()
+        snapshot = read_financial_snapshot(user.id)
         
         # Expenses
-        all_expenses = Expense.query.all()
-        all_income = Income.query.all()
-        total_expense = sum(float(e.amount) for e in all_expenses)
-        total_income = sum(float(i.amount) for i in all_income)
-        
-        category_totals = defaultdict(float)
-        for e in all_expenses:
-            category_totals[e.category] += float(e.amount)
+        category_totals = {cat: float(amt) for cat, amt in json.loads(snapshot.category_totals).items()}
+        income_sources = {src: float(amt) for src, amt in json.loads(snapshot.income_sources).items()}
+        total_expense = float(snapshot.expense_total)
+        total_income = float(snapshot.income_total)
+        
         cat_stats = ", ".join([f"{cat}: {currency}{amt:,.2f}" for cat, amt in sorted(category_totals.items(), key=lambda x: x[1], reverse=True)])
         
         # Recent 5 expenses
-        recent_expenses = Expense.query.order_by(Expense.date.desc()).limit(5).all()
-        recent_exp_str = "\n".join([f"  - {e.date.strftime('%d %b')}: {e.category} - {currency}{float(e.amount):,.2f} ({e.note or 'no note'})" for e in recent_expenses])
+        recent_expenses = json.loads(snapshot.recent_expenses)
+        recent_exp_str = "\n".join([f"  - {datetime.strptime(e['date'], '%Y-%m-%d').strftime('%d %b')}: {e['category']} - {currency}{float(e['amount']):,.2f} ({e['note'] or 'no note'})" for e in recent_expenses])
         
         # Income sources
-        income_sources = defaultdict(float)
-        for i in all_income:
-            income_sources[i.source] += float(i.amount)
         income_str = ", ".join([f"{src}: {currency}{amt:,.2f}" for src, amt in income_sources.items()])
         
         # Budgets (current month)
-        current_month = today.month
-        current_year = today.year
-        budgets = Budget.query.filter_by(month=current_month, year=current_year).all()
-        first_day = today.replace(day=1)
-        month_exp = Expense.query.filter(Expense.date >= first_day).all()
-        month_cat_spending = defaultdict(float)
-        for e in month_exp:
-            month_cat_spending[e.category] += float(e.amount)
-        budget_str = "\n".join([f"  - {b.category}: Budget {currency}{float(b.amount):,.2f}, Spent {currency}{month_cat_spending.get(b.category, 0):,.2f} ({(month_cat_spending.get(b.category, 0)/float(b.amount)*100) if float(b.amount) > 0 else 0:.0f}% used)" for b in budgets]) if budgets else "  No budgets set"
+        budgets = json.loads(snapshot.budgets)
+        month_cat_spending = {cat: float(amt) for cat, amt in json.loads(snapshot.month_category_totals).items()}
+        budget_str = "\n".join([f"  - {b['category']}: Budget {currency}{float(b['amount']):,.2f}, Spent {currency}{month_cat_spending.get(b['category'], 0):,.2f} ({(month_cat_spending.get(b['category'], 0)/float(b['amount'])*100) if float(b['amount']) > 0 else 0:.0f}% used)" for b in budgets]) if budgets else "  No budgets set"
         
         # Savings Goals
-        savings = SavingsGoal.query.all()
-        savings_str = "\n".join([f"  - {s.name}: {currency}{float(s.current_amount):,.2f}/{currency}{float(s.target_amount):,.2f} ({(float(s.current_amount)/float(s.target_amount)*100) if float(s.target_amount) > 0 else 0:.0f}% done){' - Deadline: ' + s.deadline.strftime('%d %b %Y') if s.deadline else ''}" for s in savings]) if savings else "  No savings goals"
+        savings = json.loads(snapshot.savings)
+        savings_str = "\n".join([f"  - {s['name']}: {currency}{float(s['current']):,.2f}/{currency}{float(s['target']):,.2f} ({(float(s['current'])/float(s['target'])*100) if float(s['target']) > 0 else 0:.0f}% done){' - Deadline: ' + datetime.strptime(s['deadline'], '%Y-%m-%d').strftime('%d %b %Y') if s['deadline'] else ''}" for s in savings]) if savings else "  No savings goals"
         
         # Recurring Expenses
-        recurring = RecurringExpense.query.filter_by(is_active=True).all()
-        recurring_str = "\n".join([f"  - {r.name}: {currency}{float(r.amount):,.2f}/{r.frequency} (Next due: {r.next_due.strftime('%d %b %Y')})" for r in recurring]) if recurring else "  No recurring expenses"
+        recurring = json.loads(snapshot.recurring)
+        recurring_str = "\n".join([f"  - {r['name']}: {currency}{float(r['amount']):,.2f}/{r['frequency']} (Next due: {datetime.strptime(r['next_due'], '%Y-%m-%d').strftime('%d %b %Y')})" for r in recurring]) if recurring else "  No recurring expenses"
         
         user_context = f"""
 
@@ -1818,10 +3175,6 @@ Keep responses concise and practical. Use emojis occasionally. Always base your
         # Add current message
         full_prompt += f"User: {user_message}\nAssistant:"
         
-        # Use the configured Gemini client
-        from google.genai import types
-        import time
-        
         # Build contents from history
         contents = []
         for msg in history[-10:]:
@@ -1831,61 +3184,36 @@ Keep responses concise and practical. Use emojis occasionally. Always base your
         # Add current message
         contents.append(types.Content(role='user', parts=[types.Part.from_text(text=user_message)]))
         
-        # Try multiple models with retries for rate limiting (free tier has per-model quotas)
-        models_to_try = ['gemini-2.0-flash-lite', 'gemini-2.0-flash', 'gemini-2.5-flash']
-        last_error = None
-        max_retries = 2
-        
-        for model_name in models_to_try:
-            for attempt in range(max_retries):
-                try:
-                    response = user_client.models.generate_content(
-                        model=model_name,
-                        contents=contents,
-                        config=types.GenerateContentConfig(
-                            system_instruction=system_prompt,
-                            temperature=0.7,
-                            max_output_tokens=500
-                        )
-                    )
-                    
-                    if response.text:
-                        return jsonify({
-                            'success': True,
-                            'response': response.text
-                        })
-                except Exception as model_error:
-                    last_error = model_error
-                    error_str = str(model_error)
-                    logger.warning(f"Model {model_name} attempt {attempt+1} failed: {error_str}")
-                    # If rate limited, wait before retrying the same model
-                    if '429' in error_str or 'RESOURCE_EXHAUSTED' in error_str:
-                        if attempt < max_retries - 1:
-                            time.sleep(3)
-                            continue
-                    break  # Non-rate-limit error, try next model
-            time.sleep(1)  # Brief pause between models
+        config = types.GenerateContentConfig(
+            system_instruction=system_prompt,
+            temperature=0.7,
+            max_output_tokens=500
+        )
         
-        # All models failed
-        logger.warning(f"All AI models failed. Last error: {last_error}")
-        error_msg = str(last_error) if last_error else 'Unknown error'
+        # Streaming mode: flush tokens to the widget as they arrive
+        if data.get('stream') or 'text/event-stream' in request.headers.get('Accept', ''):
+            return Response(
+                stream_with_context(ai_support_events(api_key, contents, config)),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
         
-        # Provide user-friendly error messages
-        if 'API key expired' in error_msg or 'API_KEY_INVALID' in error_msg:
-            return jsonify({
-                'success': False,
-                'error': 'AI features are temporarily unavailable due to API key issues. The core app features still work perfectly!'
-            })
-        elif '429' in error_msg or 'RESOURCE_EXHAUSTED' in error_msg or 'quota' in error_msg.lower():
-            return jsonify({
-                'success': False,
-                'error': 'AI service quota exceeded. Please try again later. All other features work normally!'
-            })
-        else:
+        # Models are raced with hedging and per-model circuit breakers (see ai_client)
+        try:
+            text = ai_client.generate(api_key, contents, config=config)
             return jsonify({
-                'success': False,
-                'error': 'AI service is temporarily unavailable. Please try again later.'
+                'success': True,
+                'response': text
             })
+        except ai_client.AIServiceError as e:
+            last_error = e.last_error or e
+        
+        # All models failed
+        logger.warning(f"All AI models failed. Last error: {last_error}")
+        return jsonify({
+            'success': False,
+            'error': ai_error_message(last_error)
+        })
             
     except Exception as e:
         logger.error(f"Error in AI support: {e}")
@@ -1894,179 +3222,386 @@ Keep responses concise and practical. Use emojis occasionally. Always base your
             'error': 'An error occurred processing your request'
         })
 
-def generate_tips_on_login():
+def ai_error_message(error):
+    """User-friendly message for a failed AI call"""
+    error_msg = str(error)
+    if 'API key expired' in error_msg or 'API_KEY_INVALID' in error_msg:
+        return 'AI features are temporarily unavailable due to API key issues. The core app features still work perfectly!'
+    elif '429' in error_msg or 'RESOURCE_EXHAUSTED' in error_msg or 'quota' in error_msg.lower():
+        return 'AI service quota exceeded. Please try again later. All other features work normally!'
+    return 'AI service is temporarily unavailable. Please try again later.'
+
+def sse_event(payload, event=None):
+    prefix = f"event: {event}\n" if event else ''
+    return f"{prefix}data: {json.dumps(payload)}\n\n"
+
+def ai_support_events(api_key, contents, config):
+    """Server-sent events for a streamed chat answer: delta* then done | error"""
+    try:
+        for text in ai_client.stream(api_key, contents, config=config):
+            yield sse_event({'delta': text})
+        yield sse_event({}, event='done')
+    except ai_client.AIServiceError as e:
+        last_error = e.last_error or e
+        logger.warning(f"AI support stream failed. Last error: {last_error}")
+        yield sse_event({'error': ai_error_message(last_error)}, event='error')
+
+AI_TIPS_TTL = int(os.environ.get('AI_TIPS_TTL', 6 * 3600))
+
+def tips_context_hash(prompt):
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+def get_cached_tips(user_id, page, context_hash):
+    """Tips generated for exactly this prompt context within AI_TIPS_TTL, or None"""
+    cutoff = datetime.now() - timedelta(seconds=AI_TIPS_TTL)
+    row = UserTips.query.filter(
+        UserTips.user_id == user_id,
+        UserTips.page == page,
+        UserTips.context_hash == context_hash,
+        UserTips.created_at >= cutoff
+    ).first()
+    return json.loads(row.tips) if row else None
+
+def store_user_tips(user_id, page, tips, context_hash):
+    row = UserTips.query.filter_by(user_id=user_id, page=page, context_hash=context_hash).first()
+    if row is None:
+        row = UserTips(user_id=user_id, page=page, context_hash=context_hash)
+        db.session.add(row)
+    row.tips = json.dumps(tips)
+    row.created_at = datetime.now()
+    UserTips.query.filter(
+        UserTips.user_id == user_id,
+        UserTips.page == page,
+        UserTips.created_at < datetime.now() - timedelta(seconds=AI_TIPS_TTL)
+    ).delete()
+    db.session.commit()
+
+def get_user_tips(user_id, page):
+    """Most recent AI tips stored for this user/page, or [] while they are still being generated"""
+    row = UserTips.query.filter_by(user_id=user_id, page=page).order_by(UserTips.created_at.desc()).first()
+    return json.loads(row.tips) if row else []
+
+_tip_jobs = set()
+_tip_jobs_lock = threading.Lock()
+
+def queue_tip_generation(user_id, currency):
+    """Generate tips on the job pool; pages show FALLBACK_TIPS until the stored tips are ready"""
     if not app.config.get('GEMINI_API_KEY'):
+        return
+    with _tip_jobs_lock:
+        if user_id in _tip_jobs:
+            return
+        _tip_jobs.add(user_id)
+    
+    def job():
+        try:
+            generate_tips_on_login(user_id, currency)
+        finally:
+            with _tip_jobs_lock:
+                _tip_jobs.discard(user_id)
+    submit_job(job)
+
+def generate_tips_on_login(user_id, currency):
+    api_key = app.config.get('GEMINI_API_KEY')
+    if not api_key:
         return FALLBACK_TIPS
     
-    currency = get_currency()
-    today = datetime.now()
     tips_data = {}
     pages = ['budgets', 'savings', 'recurring']
     
     for page in pages:
         try:
-            context_parts = []
+            prompt = build_tips_prompt(user_id, page, currency)
+            context_hash = tips_context_hash(prompt)
+            cached_tips = get_cached_tips(user_id, page, context_hash)
+            if cached_tips is not None:
+                tips_data[page] = cached_tips
+                continue
             
-            if page == 'budgets':
-                budgets = Budget.query.filter_by(month=today.month, year=today.year).all()
-                first_day = today.date().replace(day=1)
-                month_expenses = Expense.query.filter(Expense.date >= first_day).all()
-                cat_spending = defaultdict(float)
-                for e in month_expenses:
-                    cat_spending[e.category] += float(e.amount)
-                
-                for b in budgets:
-                    spent = cat_spending.get(b.category, 0)
-                    pct = (spent / float(b.amount) * 100) if float(b.amount) > 0 else 0
-                    context_parts.append(f"- {b.category}: Budget {currency}{float(b.amount):,.2f}, Spent {currency}{spent:,.2f} ({pct:.0f}% used)")
-                
-                all_expenses = Expense.query.all()
-                total_exp = sum(float(e.amount) for e in all_expenses)
-                all_income = Income.query.all()
-                total_inc = sum(float(i.amount) for i in all_income)
-                
-                context_str = "\n".join(context_parts) if context_parts else "No budgets set yet."
-                prompt = f"""Based on this user's budget data, generate exactly 4 short personalized budgeting tips. Each tip should be 1 sentence max.
+            try:
+                text = ai_client.generate(api_key, prompt, config=types.GenerateContentConfig(
+                    temperature=0.8,
+                    max_output_tokens=300
+                ))
+            except ai_client.AIServiceError as e:
+                logger.warning(f"Tips generation failed for {page}: {e} ({e.last_error})")
+                tips_data[page] = FALLBACK_TIPS.get(page, [])
+                continue
+            
+            tips = [tip.strip() for tip in text.strip().split('\n') if tip.strip()]
+            tips_data[page] = tips[:4]
+            store_user_tips(user_id, page, tips_data[page], context_hash)
+        
+        except Exception as e:
+            logger.error(f"Error generating tips for {page}: {e}")
+            tips_data[page] = FALLBACK_TIPS.get(page, [])
+    
+    return tips_data
 
-User's budgets this month:
-{context_str}
-Total income: {currency}{total_inc:,.2f}
-Total expenses: {currency}{total_exp:,.2f}
+# ==================== ACTIVITY BITMAP ====================
+# Days since ACTIVITY_EPOCH; days before it are not tracked
+ACTIVITY_EPOCH = datetime(2000, 1, 1).date()
+# A bitmap is this header (the day its first byte starts at, a multiple of 8) then one bit per day
+# from there, so it only spans the user's own logged history
+ACTIVITY_HEADER = struct.Struct('<I')
 
-Return ONLY the 4 tips, one per line, no numbering, no bullets, no extra text."""
+def activity_index(day):
+    return (day - ACTIVITY_EPOCH).days
 
-            elif page == 'savings':
-                savings = SavingsGoal.query.all()
-                for s in savings:
-                    progress = (float(s.current_amount) / float(s.target_amount) * 100) if float(s.target_amount) > 0 else 0
-                    deadline_str = f" (Deadline: {s.deadline.strftime('%d %b %Y')})" if s.deadline else ""
-                    context_parts.append(f"- {s.name}: {currency}{float(s.current_amount):,.2f}/{currency}{float(s.target_amount):,.2f} ({progress:.0f}% done){deadline_str}")
-                
-                all_income = Income.query.all()
-                total_inc = sum(float(i.amount) for i in all_income)
-                
-                context_str = "\n".join(context_parts) if context_parts else "No savings goals yet."
-                prompt = f"""Based on this user's savings goals, generate exactly 4 short personalized saving tips. Each tip should be 1 sentence max.
+def _unpack_activity(bitmap):
+    """(first day index, bits) of a stored bitmap; bit i is day first + i"""
+    if not bitmap:
+        return 0, 0
+    (first,) = ACTIVITY_HEADER.unpack_from(bitmap)
+    return first, int.from_bytes(bitmap[ACTIVITY_HEADER.size:], 'little')
 
-User's savings goals:
-{context_str}
-Monthly income: {currency}{total_inc:,.2f}
+def _pack_activity(first, bits):
+    if not bits:
+        return b''
+    empty_bytes = ((bits & -bits).bit_length() - 1) // 8
+    bits >>= empty_bytes * 8
+    return ACTIVITY_HEADER.pack(first + empty_bytes * 8) + bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
 
-Return ONLY the 4 tips, one per line, no numbering, no bullets, no extra text."""
+def set_activity_days(bitmap, days):
+    """Copy of `bitmap` with each day in {day: logged} set or cleared"""
+    first, bits = _unpack_activity(bitmap)
+    indexes = {activity_index(day): logged for day, logged in days.items() if activity_index(day) >= 0}
+    earliest = min((index for index, logged in indexes.items() if logged), default=None)
+    if earliest is not None and (not bits or earliest < first):
+        start = earliest - earliest % 8
+        if bits:
+            bits <<= first - start
+        first = start
+    for index, logged in indexes.items():
+        if index < first:
+            continue
+        if logged:
+            bits |= 1 << (index - first)
+        else:
+            bits &= ~(1 << (index - first))
+    return _pack_activity(first, bits)
 
-            elif page == 'recurring':
-                recurring = RecurringExpense.query.filter_by(is_active=True).all()
-                total_monthly = 0
-                for r in recurring:
-                    amt = float(r.amount)
-                    if r.frequency == 'daily':
-                        monthly_cost = amt * 30
-                    elif r.frequency == 'weekly':
-                        monthly_cost = amt * 4
-                    elif r.frequency == 'yearly':
-                        monthly_cost = amt / 12
-                    else:
-                        monthly_cost = amt
-                    total_monthly += monthly_cost
-                    context_parts.append(f"- {r.name}: {currency}{amt:,.2f}/{r.frequency} ({r.category}, due: {r.next_due.strftime('%d %b %Y')})")
-                
-                context_str = "\n".join(context_parts) if context_parts else "No recurring expenses yet."
-                prompt = f"""Based on this user's recurring expenses, generate exactly 4 short personalized tips. Each tip should be 1 sentence max.
+def current_streak(bitmap, today=None):
+    """Consecutive logged days ending today, or yesterday while today has nothing logged yet"""
+    first, bits = _unpack_activity(bitmap)
+    end = activity_index(today or datetime.now().date()) - first
+    if end >= 0 and not bits >> end & 1:
+        end -= 1
+    if end < 0 or not bits >> end & 1:
+        return 0
+    gaps = ~bits & ((1 << (end + 1)) - 1)
+    return end + 1 if not gaps else end - (gaps.bit_length() - 1)
 
-User's recurring expenses:
-{context_str}
-Estimated monthly cost: {currency}{total_monthly:,.2f}
+def longest_streak(bitmap):
+    """
+    Longest run of logged days, in O(log n) shifts: runs[k] marks days that
+    start 2**k logged days in a row, then the run length is built up from
+    the largest power down, like a binary search.
+    """
+    runs = [_unpack_activity(bitmap)[1]]
+    if not runs[0]:
+        return 0
+    while True:
+        starts = runs[-1] & (runs[-1] >> (1 << (len(runs) - 1)))
+        if not starts:
+            break
+        runs.append(starts)
+    length = 1 << (len(runs) - 1)
+    starts = runs[-1]
+    for k in range(len(runs) - 2, -1, -1):
+        longer = starts & (runs[k] >> length)
+        if longer:
+            starts = longer
+            length += 1 << k
+    return length
 
-Return ONLY the 4 tips, one per line, no numbering, no bullets, no extra text."""
-            
-            models_to_try = ['gemini-2.0-flash-lite', 'gemini-2.0-flash', 'gemini-2.5-flash']
-            for model_name in models_to_try:
-                try:
-                    response = client.models.generate_content(
-                        model=model_name,
-                        contents=prompt,
-                        config=types.GenerateContentConfig(
-                            temperature=0.8,
-                            max_output_tokens=300
-                        )
-                    )
-                    if response.text:
-                        tips = [tip.strip() for tip in response.text.strip().split('\n') if tip.strip()]
-                        tips_data[page] = tips[:4]
-                        break
-                except Exception as e:
-                    logger.warning(f"Tips model {model_name} failed for {page}: {e}")
-                    if '429' in str(e) or 'RESOURCE_EXHAUSTED' in str(e):
-                        time.sleep(2)
-                    continue
-            
-            if page not in tips_data:
-                tips_data[page] = FALLBACK_TIPS.get(page, [])
-        
-        except Exception as e:
-            logger.error(f"Error generating tips for {page}: {e}")
-            tips_data[page] = FALLBACK_TIPS.get(page, [])
-    
-    return tips_data
+def days_active(bitmap, start, end):
+    """Number of logged days from start to end inclusive"""
+    first, bits = _unpack_activity(bitmap)
+    low, high = max(activity_index(start) - first, 0), activity_index(end) - first
+    if high < low:
+        return 0
+    return (bits >> low & ((1 << (high - low + 1)) - 1)).bit_count()
 
-def check_and_award_badges(user_id):
-    awarded = []
-    existing = {a.badge_key for a in Achievement.query.filter_by(user_id=user_id).all()}
-    
-    def award(key):
-        if key not in existing:
-            db.session.add(Achievement(user_id=user_id, badge_key=key))
-            awarded.append(key)
-            existing.add(key)
-    
-    if Expense.query.first():
-        award('first_expense')
-    
-    from sqlalchemy import func
-    distinct_days = db.session.query(func.count(func.distinct(Expense.date))).scalar() or 0
-    if distinct_days >= 7:
-        award('expense_streak_7')
-    
-    today = datetime.now()
-    budgets = Budget.query.filter_by(month=today.month, year=today.year).all()
-    if budgets:
-        first_day = today.date().replace(day=1)
-        month_expenses = Expense.query.filter(Expense.date >= first_day).all()
-        cat_spending = defaultdict(float)
-        for e in month_expenses:
-            cat_spending[e.category] += float(e.amount)
-        all_under = all(cat_spending.get(b.category, 0) <= float(b.amount) for b in budgets)
-        if all_under:
-            award('budget_master')
-    
-    if SavingsGoal.query.first():
-        award('savings_starter')
-    
-    completed_goals = SavingsGoal.query.all()
-    if any(g.is_completed for g in completed_goals):
-        award('goal_crusher')
-    
-    distinct_sources = db.session.query(func.count(func.distinct(Income.source))).scalar() or 0
-    if distinct_sources >= 3:
-        award('income_diversifier')
-    
-    total_saved = sum(float(g.current_amount) for g in SavingsGoal.query.all())
-    if total_saved >= 10000:
-        award('big_saver')
-    
-    expense_count = Expense.query.count()
-    if expense_count >= 100:
-        award('century_club')
-    
-    recurring_count = RecurringExpense.query.count()
-    if recurring_count >= 5:
-        award('recurring_champion')
-    
-    if awarded:
-        db.session.commit()
-    
+# ==================== ACHIEVEMENTS ====================
+# badge key -> (UserStats counter, threshold); budget_master is judged per month instead
+BADGE_RULES = {
+    'first_expense': ('expense_count', 1),
+    'century_club': ('expense_count', 100),
+    'expense_streak_7': ('longest_streak', 7),
+    'savings_starter': ('savings_goals', 1),
+    'goal_crusher': ('completed_goals', 1),
+    'big_saver': ('total_saved', 10000),
+    'income_diversifier': ('income_sources', 3),
+    'analytics_pro': ('analytics_visits', 10),
+    'recurring_champion': ('recurring_count', 5),
+}
+
+def award_badges(user_id, keys):
+    """Unlock whichever of `keys` the user doesn't have yet. The caller commits."""
+    if not keys:
+        return []
+    unlocked = {key for (key,) in db.session.query(Achievement.badge_key).filter(
+        Achievement.user_id == user_id, Achievement.badge_key.in_(keys)
+    )}
+    awarded = [key for key in keys if key not in unlocked]
+    for key in awarded:
+        db.session.add(Achievement(user_id=user_id, badge_key=key))
     return awarded
 
+def crossed_badges(before, after):
+    """Badges whose threshold a counter reached in this write; before=None checks every rule"""
+    return [key for key, (field, threshold) in BADGE_RULES.items()
+            if field in after and after[field] >= threshold
+            and (before is None or before[field] < threshold)]
+
+def apply_day_deltas(user_id, deltas):
+    """Apply {day: expense_count_delta} to the user's ExpenseDay rows; returns {day: logged} for days that gained their first or lost their last expense"""
+    days = {d.day: d for d in ExpenseDay.query.filter(
+        ExpenseDay.user_id == user_id, ExpenseDay.day.in_(list(deltas))
+    )}
+    changed = {}
+    for day, count in deltas.items():
+        row = days.get(day)
+        before = row.expense_count if row else 0
+        if (before > 0) != (before + count > 0):
+            changed[day] = before + count > 0
+        if row is None:
+            db.session.add(ExpenseDay(user_id=user_id, day=day, expense_count=count))
+        else:
+            row.expense_count = ExpenseDay.expense_count + count
+    return changed
+
+def apply_source_deltas(user_id, deltas):
+    """Apply {source: income_count_delta} to the user's IncomeSource rows; returns the change in distinct sources"""
+    sources = {s.name: s for s in IncomeSource.query.filter(
+        IncomeSource.user_id == user_id, IncomeSource.name.in_(list(deltas))
+    )}
+    change = 0
+    for name, count in deltas.items():
+        row = sources.get(name)
+        before = row.income_count if row else 0
+        change += (before + count > 0) - (before > 0)
+        if row is None:
+            db.session.add(IncomeSource(user_id=user_id, name=name, income_count=count))
+        else:
+            row.income_count = IncomeSource.income_count + count
+    return change
+
+def goal_stats(goal):
+    """A savings goal's share of the UserStats savings counters"""
+    return {'savings_goals': 1, 'completed_goals': int(goal.is_completed),
+            'total_saved': Decimal(str(goal.current_amount or 0))}
+
+def build_user_stats(user_id, stats=None):
+    """
+    (Re)compute the user's counters and day/source registries from the source
+    tables and unlock every badge they already qualify for. Activity-only
+    counters (analytics visits) are kept. The caller commits.
+    """
+    if stats is None:
+        stats = UserStats(user_id=user_id, analytics_visits=0)
+        db.session.add(stats)
+    ExpenseDay.query.filter_by(user_id=user_id).delete()
+    IncomeSource.query.filter_by(user_id=user_id).delete()
+    day_counts = db.session.query(Expense.date, db.func.count(Expense.id)).filter(
+        Expense.user_id == user_id).group_by(Expense.date).all()
+    source_counts = db.session.query(Income.source, db.func.count(Income.id)).filter(
+        Income.user_id == user_id).group_by(Income.source).all()
+    db.session.add_all(ExpenseDay(user_id=user_id, day=day, expense_count=count) for day, count in day_counts)
+    db.session.add_all(IncomeSource(user_id=user_id, name=name, income_count=count) for name, count in source_counts)
+
+    counters = {'savings_goals': 0, 'completed_goals': 0, 'total_saved': Decimal(0)}
+    for goal in SavingsGoal.query.filter_by(user_id=user_id):
+        for field, value in goal_stats(goal).items():
+            counters[field] += value
+    counters.update(
+        expense_count=sum(count for _day, count in day_counts),
+        expense_days=len(day_counts),
+        income_sources=len(source_counts),
+        recurring_count=RecurringExpense.query.filter_by(user_id=user_id).count(),
+    )
+    stats.activity_bitmap = set_activity_days(None, {day: True for day, _count in day_counts})
+    counters['longest_streak'] = longest_streak(stats.activity_bitmap)
+    for field, value in counters.items():
+        setattr(stats, field, value)
+    stats.budget_month = datetime.now().date().replace(day=1)
+    counters['analytics_visits'] = stats.analytics_visits or 0
+    award_badges(user_id, crossed_badges(None, counters))
+    return stats
+
+def judge_budget_month(user_id, month_start):
+    """Unlock budget_master if every budget the user set for the month ended at or under its limit"""
+    budgets = Budget.query.filter_by(user_id=user_id, month=month_start.month, year=month_start.year).all()
+    if not budgets:
+        return
+    spending = get_category_spending(user_id, month_start)
+    if all(spending.get(b.category, 0) <= b.amount for b in budgets):
+        award_badges(user_id, ['budget_master'])
+
+def record_activity(user_id, expense_days=None, income_sources=None, **deltas):
+    """
+    Fold one write into the user's UserStats and unlock the badges whose
+    threshold it crossed. `expense_days`/`income_sources` are {day: delta} /
+    {source: delta} registry changes; other keyword arguments are counter
+    deltas. The first write of a month also settles last month's budget_master.
+    The caller commits.
+    """
+    stats = UserStats.query.filter_by(user_id=user_id).with_for_update().first()
+    if stats is None or stats.activity_bitmap is None:
+        # A fresh build already sees the pending write
+        build_user_stats(user_id, stats)
+        return
+    if expense_days:
+        changed = apply_day_deltas(user_id, expense_days)
+        if changed:
+            deltas['expense_days'] = sum(1 if logged else -1 for logged in changed.values())
+            stats.activity_bitmap = set_activity_days(stats.activity_bitmap, changed)
+            deltas['longest_streak'] = longest_streak(stats.activity_bitmap) - stats.longest_streak
+    if income_sources:
+        deltas['income_sources'] = apply_source_deltas(user_id, income_sources)
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    before = {field: getattr(stats, field) for field in deltas}
+    for field, delta in deltas.items():
+        setattr(stats, field, getattr(UserStats, field) + delta)
+    award_badges(user_id, crossed_badges(before, {field: before[field] + delta for field, delta in deltas.items()}))
+
+    month_start = datetime.now().date().replace(day=1)
+    if stats.budget_month != month_start:
+        if stats.budget_month is not None and stats.budget_month < month_start:
+            judge_budget_month(user_id, shift_month(month_start, -1))
+        stats.budget_month = month_start
+
+def record_analytics_visit(user_id):
+    """
+    Count a visit with one atomic UPDATE rather than record_activity's locked
+    read, so the read-only analytics page never waits on the stats row.
+    Unlocks analytics_pro on the visit that reaches its threshold. The caller commits.
+    """
+    increment = db.update(UserStats).where(UserStats.user_id == user_id).values(
+        analytics_visits=UserStats.analytics_visits + 1).returning(UserStats.analytics_visits)
+    visits = db.session.execute(increment).scalar()
+    if visits is None:
+        get_user_stats(user_id)
+        visits = db.session.execute(increment).scalar()
+    _field, threshold = BADGE_RULES['analytics_pro']
+    if visits == threshold:
+        award_badges(user_id, ['analytics_pro'])
+
+def get_user_stats(user_id):
+    """The user's counters for display, built (and committed) on first use"""
+    stats = UserStats.query.filter_by(user_id=user_id).first()
+    if stats is None or stats.activity_bitmap is None:
+        stats = build_user_stats(user_id, stats)
+        db.session.commit()
+    return stats
+
+def rebuild_user_stats():
+    """Recompute the counters of every user that has them"""
+    for stats in UserStats.query.all():
+        build_user_stats(stats.user_id, stats)
+    db.session.commit()
+
 @app.route('/settings', methods=['GET', 'POST'])
 @login_required
 def settings():
@@ -2086,7 +3621,6 @@ def settings():
         flash('Settings saved successfully!', 'success')
         return redirect(url_for('settings'))
     
-    check_and_award_badges(user.id)
     achievements = Achievement.query.filter_by(user_id=user.id).all()
     unlocked_keys = {a.badge_key for a in achievements}
     
@@ -2116,7 +3650,7 @@ def test_gemini_key():
         if not api_key.strip():
             return jsonify({'success': False, 'error': 'No API key provided'})
         
-        test_client = genai.Client(api_key=api_key)
+        test_client = ai_client.get_client(api_key)
         response = test_client.models.generate_content(
             model='gemini-2.0-flash-lite',
             contents='Say "Hello" in one word.'
@@ -2137,14 +3671,52 @@ def test_gemini_key():
         return jsonify({'success': False, 'error': f'Error: {error_msg[:100]}'})
 
 # ==================== EMAIL NOTIFICATION HELPERS ====================
-def send_budget_alert_email(user, budget, spent, percentage):
-    """Send email when budget threshold is exceeded"""
-    try:
-        if not user.email or not user.notify_budget_alerts:
-            return
-        currency = user.preferred_currency or '₹'
-        subject = f"⚠️ Budget Alert: {budget.category} at {percentage:.0f}%"
-        body = f"""Hi {user.username},
+BUDGET_ALERT_THRESHOLDS = (80, 100)
+
+def check_budget_alert(user_id, category, month_start):
+    """
+    Queue a budget alert when the category's spending for the month first
+    reaches a threshold in BUDGET_ALERT_THRESHOLDS. The level reached is kept
+    on the budget, so each threshold alerts once; dropping back below lowers
+    it again so a later crossing alerts anew. Commits when the level changes.
+    """
+    budget = Budget.query.filter_by(user_id=user_id, category=category,
+                                    month=month_start.month, year=month_start.year).first()
+    if budget is None or budget.amount <= 0:
+        return
+    spent = db.session.query(CategoryMonthTotal.total).filter_by(
+        user_id=user_id, month_start=month_start, category=category
+    ).scalar() or Decimal(0)
+    percentage = float(spent) / float(budget.amount) * 100
+    level = max((t for t in BUDGET_ALERT_THRESHOLDS if percentage >= t), default=None)
+    if level == budget.alerted_threshold:
+        return
+    if level is not None and (budget.alerted_threshold is None or level > budget.alerted_threshold):
+        queue_budget_alert_email(User.query.get(user_id), budget, float(spent), percentage)
+    budget.alerted_threshold = level
+    db.session.commit()
+
+def check_budget_alerts(user_id, category_months):
+    """check_budget_alert for every (category, month_start) a bulk write touched that has a budget"""
+    if not category_months:
+        return
+    budgeted = {(b.category, datetime(b.year, b.month, 1).date()) for b in Budget.query.filter(
+        Budget.user_id == user_id, Budget.year.in_({month_start.year for _category, month_start in category_months})
+    )}
+    for category, month_start in sorted(set(category_months) & budgeted):
+        try:
+            check_budget_alert(user_id, category, month_start)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error checking budget alert for {category} {month_start}: {e}")
+
+def queue_budget_alert_email(user, budget, spent, percentage):
+    """Queue the email for a budget threshold being reached. The caller commits."""
+    if not user.email or not user.notify_budget_alerts:
+        return
+    currency = user.preferred_currency or '₹'
+    subject = f"⚠️ Budget Alert: {budget.category} at {percentage:.0f}%"
+    body = f"""Hi {user.username},
 
 Your {budget.category} budget is at {percentage:.0f}% usage this month.
 
@@ -2157,56 +3729,219 @@ Remaining: {currency}{max(0, float(budget.amount) - spent):,.2f}
 Review your spending in Money Mate to stay on track.
 
 — Money Mate"""
-        
-        # Development Mode Console fallback
-        if not app.config.get('MAIL_USERNAME'):
-            print("\n" + "="*60)
-            print(f"📧 [DEVELOPMENT MODE] BUDGET ALERT EMAIL TO: {user.email}")
-            print(f"Subject: {subject}")
-            print("-"*60)
-            print(body)
-            print("="*60 + "\n")
-            return
-
-        msg = Message(subject, recipients=[user.email])
-        msg.body = body
-        mail.send(msg)
-    except Exception as e:
-        logger.error(f"Failed to send budget alert email: {e}")
+    queue_email(user, 'budget_alert', subject, body)
 
-def send_due_reminder_email(user, due_items):
-    """Send reminder for recurring expenses due soon"""
-    try:
-        if not user.email or not user.notify_due_reminders or not due_items:
-            return
-        currency = user.preferred_currency or '₹'
-        items_text = "\n".join([f"  • {item.name}: {currency}{float(item.amount):,.2f} (due {item.next_due.strftime('%d %b %Y')})" for item in due_items])
-        subject = f"📅 Upcoming Due Payments ({len(due_items)} items)"
-        body = f"""Hi {user.username},
+def queue_due_reminder_email(user, due_items):
+    """Queue a reminder for recurring expenses due soon. The caller commits."""
+    if not user.email or not user.notify_due_reminders or not due_items:
+        return
+    currency = user.preferred_currency or '₹'
+    items_text = "\n".join([f"  • {item.name}: {currency}{float(item.amount):,.2f} (due {item.next_due.strftime('%d %b %Y')})" for item in due_items])
+    subject = f"📅 Upcoming Due Payments ({len(due_items)} items)"
+    body = f"""Hi {user.username},
 
-You have {len(due_items)} recurring expense(s) due within the next 3 days:
+You have {len(due_items)} recurring expense(s) due within the next {REMINDER_DAYS_AHEAD} days:
 
 {items_text}
 
 Log in to Money Mate to manage your payments.
 
 — Money Mate"""
-        
-        # Development Mode Console fallback
-        if not app.config.get('MAIL_USERNAME'):
-            print("\n" + "="*60)
-            print(f"📧 [DEVELOPMENT MODE] RECURRING DUE REMINDER TO: {user.email}")
-            print(f"Subject: {subject}")
-            print("-"*60)
-            print(body)
-            print("="*60 + "\n")
-            return
+    queue_email(user, 'due_reminder', subject, body)
+
+# ==================== EMAIL OUTBOX ====================
+OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', 50))
+OUTBOX_INTERVAL = int(os.environ.get('OUTBOX_INTERVAL', 15))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 6))
+OUTBOX_RETRY_BASE = 60  # seconds before the first retry, doubling after each failure
+
+def queue_email(user, kind, subject, body):
+    """Add an email for `user` to the outbox; it is sent once the caller's transaction commits"""
+    db.session.add(OutboxEmail(user_id=user.id, kind=kind, recipient=user.email, subject=subject[:200], body=body))
 
-        msg = Message(subject, recipients=[user.email])
-        msg.body = body
-        mail.send(msg)
+def outbox_retry_delay(attempts):
+    return timedelta(seconds=min(OUTBOX_RETRY_BASE * 2 ** (attempts - 1), 6 * 3600))
+
+def _print_email(email):
+    # Development Mode Console fallback
+    print("\n" + "="*60)
+    print(f"📧 [DEVELOPMENT MODE] {email.kind.replace('_', ' ').upper()} EMAIL TO: {email.recipient}")
+    print(f"Subject: {email.subject}")
+    print("-"*60)
+    print(email.body)
+    print("="*60 + "\n")
+
+def _record_failure(email, error, now):
+    email.attempts += 1
+    email.last_error = str(error)[:500]
+    if email.attempts >= OUTBOX_MAX_ATTEMPTS:
+        email.status = 'failed'
+        logger.error(f"Giving up on email {email.id} to {email.recipient} after {email.attempts} attempts: {error}")
+    else:
+        email.next_attempt_at = now + outbox_retry_delay(email.attempts)
+
+def deliver_outbox(batch_size=OUTBOX_BATCH_SIZE):
+    """
+    Send one batch of due outbox emails over a single SMTP connection and
+    commit the outcome. A failed send is retried with exponential backoff up
+    to OUTBOX_MAX_ATTEMPTS. Returns the number of emails sent.
+    """
+    now = datetime.now(timezone.utc)
+    batch = OutboxEmail.query.filter(
+        OutboxEmail.status == 'pending', OutboxEmail.next_attempt_at <= now
+    ).order_by(OutboxEmail.id).limit(batch_size).with_for_update(skip_locked=True).all()
+    if not batch:
+        return 0
+
+    sent = 0
+    attempted = set()
+    try:
+        if app.config['MAIL_CONSOLE']:
+            for email in batch:
+                _print_email(email)
+                email.status, email.sent_at = 'sent', now
+                sent += 1
+        else:
+            with mail.connect() as connection:
+                for email in batch:
+                    attempted.add(email.id)
+                    try:
+                        connection.send(Message(email.subject, recipients=[email.recipient], body=email.body))
+                    except Exception as e:
+                        _record_failure(email, e, now)
+                        continue
+                    email.status, email.sent_at = 'sent', now
+                    sent += 1
     except Exception as e:
-        logger.error(f"Failed to send due reminder email: {e}")
+        # The connection could not be opened (or closed cleanly): the rest of the batch waits for a retry
+        logger.error(f"SMTP connection to {app.config['MAIL_SERVER']} failed: {e}")
+        for email in batch:
+            if email.id not in attempted:
+                _record_failure(email, e, now)
+    db.session.commit()
+    return sent
+
+def drain_outbox():
+    """Deliver batches until nothing due is left; returns the number of emails sent"""
+    total = 0
+    while True:
+        sent = deliver_outbox()
+        total += sent
+        if not sent:
+            return total
+
+# ==================== DIGESTS ====================
+REMINDER_DAYS_AHEAD = 3
+DIGEST_INTERVAL = int(os.environ.get('DIGEST_INTERVAL', 86400))
+
+def send_due_reminders(today=None):
+    """
+    Queue one reminder digest per user for active recurring items due in the
+    next REMINDER_DAYS_AHEAD days, with one range query over next_due for all
+    users. Each (item, due date) is logged, so an item is reminded once per
+    due date however often this runs. Returns the number of digests queued.
+    """
+    today = today or datetime.now().date()
+    due = db.session.query(RecurringExpense, User).join(User, User.id == RecurringExpense.user_id).filter(
+        RecurringExpense.is_active == True,
+        RecurringExpense.next_due >= today,
+        RecurringExpense.next_due <= today + timedelta(days=REMINDER_DAYS_AHEAD),
+        User.notify_due_reminders == True
+    ).order_by(RecurringExpense.user_id, RecurringExpense.next_due).all()
+    if not due:
+        return 0
+    reminded = set(db.session.query(ReminderLog.recurring_id, ReminderLog.due_date).filter(
+        ReminderLog.recurring_id.in_({item.id for item, _user in due}), ReminderLog.due_date >= today
+    ))
+
+    digests = defaultdict(list)
+    users = {}
+    for item, user in due:
+        if (item.id, item.next_due) not in reminded:
+            digests[user.id].append(item)
+            users[user.id] = user
+    for user_id, items in digests.items():
+        queue_due_reminder_email(users[user_id], items)
+        db.session.add_all(ReminderLog(user_id=user_id, recurring_id=item.id, due_date=item.next_due) for item in items)
+    db.session.commit()
+    return len(digests)
+
+def queue_monthly_digest_email(user, month_start):
+    """Queue the summary of `month_start`'s income, spending and budgets. The caller commits."""
+    if not user.email:
+        return
+    currency = user.preferred_currency or '₹'
+    rollup = MonthlyRollup.query.filter_by(user_id=user.id, month_start=month_start).first()
+    expense_total = convert_amount(rollup.expense_total if rollup else 0, currency)
+    income_total = convert_amount(rollup.income_total if rollup else 0, currency)
+    spending = get_category_spending(user.id, month_start)
+    top_categories = sorted(spending.items(), key=lambda x: x[1], reverse=True)[:5]
+    budgets = Budget.query.filter_by(user_id=user.id, month=month_start.month, year=month_start.year).all()
+    over_budget = [b.category for b in budgets if spending.get(b.category, 0) > b.amount]
+
+    category_lines = "\n".join(
+        f"  • {category}: {currency}{convert_amount(total, currency):,.2f}" for category, total in top_categories
+    ) or "  • No expenses recorded"
+    if not budgets:
+        budget_line = "You had no budgets set for this month."
+    elif over_budget:
+        budget_line = f"Over budget in {len(over_budget)} of {len(budgets)} categories: {', '.join(over_budget)}."
+    else:
+        budget_line = f"You stayed within all {len(budgets)} budgets. 🎯"
+    month_name = month_start.strftime('%B %Y')
+    subject = f"📊 Your Money Mate summary for {month_name}"
+    body = f"""Hi {user.username},
+
+Here is how {month_name} went:
+
+Income: {currency}{income_total:,.2f}
+Expenses: {currency}{expense_total:,.2f} ({rollup.expense_count if rollup else 0} transactions)
+Net Savings: {currency}{income_total - expense_total:,.2f}
+
+Top categories:
+{category_lines}
+
+{budget_line}
+
+Log in to Money Mate for the full breakdown.
+
+— Money Mate"""
+    queue_email(user, 'monthly_digest', subject, body)
+
+def send_monthly_digests(today=None):
+    """Queue last month's digest for every opted-in user who hasn't had it yet; returns the number queued"""
+    today = today or datetime.now().date()
+    month_start = shift_month(today, -1)
+    users = User.query.filter(
+        User.notify_monthly_digest == True,
+        ~db.select(DigestLog.id).where(DigestLog.user_id == User.id, DigestLog.month_start == month_start).exists()
+    ).all()
+    for user in users:
+        queue_monthly_digest_email(user, month_start)
+        db.session.add(DigestLog(user_id=user.id, month_start=month_start))
+    db.session.commit()
+    return len(users)
+
+def send_digests(today=None):
+    reminders = send_due_reminders(today)
+    monthly = send_monthly_digests(today)
+    if reminders or monthly:
+        logger.info(f"Queued {reminders} due reminders and {monthly} monthly digests")
+    return reminders, monthly
+
+@app.cli.command('send-digests')
+@click.option('--date', 'as_of', type=click.DateTime(formats=['%Y-%m-%d']), help='Run as if today were this day.')
+def send_digests_command(as_of):
+    """Queue due-payment reminders and last month's digests (run once a day)."""
+    reminders, monthly = send_digests(as_of.date() if as_of else None)
+    print(f"{reminders} due reminders and {monthly} monthly digests queued.")
+
+@app.cli.command('send-outbox')
+def send_outbox_command():
+    """Deliver queued emails now (the web process also does this every OUTBOX_INTERVAL seconds)."""
+    sent = drain_outbox()
+    pending = OutboxEmail.query.filter_by(status='pending').count()
+    print(f"{sent} emails sent, {pending} waiting for a retry.")
 
 # Authentication routes (Powered by Sentinel API Security Lab)
 @app.route('/login', methods=['GET', 'POST'])
@@ -2233,15 +3968,8 @@ def login():
             session['refresh_token'] = data.get('refreshToken')
             session['login_success'] = True
             
-            # Generate tips on login
-            tips_data = generate_tips_on_login()
-            session['ai_tips'] = tips_data
-            
-            # Check and award any new badges
-            try:
-                check_and_award_badges(local_user.id)
-            except Exception as e:
-                logger.error(f"Badge check error: {e}")
+            # Generate tips in the background so login isn't held up by the AI provider
+            queue_tip_generation(local_user.id, get_currency())
             
             return redirect(url_for('index'))
         else:
@@ -2325,14 +4053,8 @@ def verify_otp():
             session.pop('pending_email', None)
             session.pop('pending_username', None)
             
-            # Award initial badges & tips
-            try:
-                check_and_award_badges(local_user.id)
-            except Exception as e:
-                logger.error(f"Badge check error: {e}")
-                
-            tips_data = generate_tips_on_login()
-            session['ai_tips'] = tips_data
+            # Generate initial tips in the background
+            queue_tip_generation(local_user.id, get_currency())
             
             flash('Account verified & logged in successfully! Welcome to Money Mate.', 'success')
             return redirect(url_for('index'))
@@ -2523,6 +4245,21 @@ def logout():
 
 with app.app_context():
     db.create_all()
+    try:
+        if not MonthlyRollup.query.first() and (Expense.query.first() or Income.query.first()):
+            rebuild_monthly_rollups()
+        if not ExpenseCategory.query.first() and Expense.query.first():
+            rebuild_expense_categories()
+    except (OperationalError, ProgrammingError) as e:
+        # Tables created before per-user ownership; 'flask db upgrade' migrates them
+        db.session.rollback()
+        logger.warning(f"Skipping derived table backfill until the database is upgraded: {e}")
+    try:
+        ensure_search_index()
+    except (OperationalError, ProgrammingError) as e:
+        # e.g. a SQLite build without FTS5; search falls back to ILIKE
+        db.session.rollback()
+        logger.warning(f"Full-text expense search unavailable: {e}")
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 5000)))
\ No newline at end of file
@@ -0,0 +1,123 @@
+"""Add user_id ownership to the financial tables
+
+Revision ID: 3f2a9c1d7b40
+Revises: 
+Create Date: 2026-10-18 10:12:31.402118
+
+Until now the schema was created by db.create_all(), so this first
+revision inspects the live database and only changes what is missing:
+it works both on existing installs and on databases create_all() has
+already built with the new models.
+
+Existing rows are assigned to the lowest user id. Derived tables without
+a user_id (monthly rollups, category registry, financial snapshot) are
+dropped; the app recreates them with per-user keys and rebuilds them on start.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c1d7b40'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+OWNED_TABLES = {
+    'expense': [
+        ('idx_expense_user_date_id', ['user_id', 'date', 'id']),
+        ('idx_expense_user_amount_id', ['user_id', 'amount', 'id']),
+        ('idx_expense_user_category_date', ['user_id', 'category', 'date']),
+    ],
+    'income': [
+        ('idx_income_user_date', ['user_id', 'date']),
+    ],
+    'budget': [
+        ('idx_user_month_year', ['user_id', 'month', 'year']),
+    ],
+    'savings_goal': [
+        ('ix_savings_goal_user_id', ['user_id']),
+    ],
+    'recurring_expense': [
+        ('ix_recurring_expense_user_id', ['user_id']),
+    ],
+}
+
+# Global indexes superseded by the per-user ones above
+OBSOLETE_INDEXES = {
+    'expense': [
+        ('idx_expense_date_id', ['date', 'id']),
+        ('idx_expense_amount_id', ['amount', 'id']),
+    ],
+    'budget': [
+        ('idx_month_year', ['month', 'year']),
+    ],
+}
+
+DERIVED_TABLES = ['monthly_rollup', 'expense_category', 'financial_snapshot']
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = set(inspector.get_table_names())
+    owner_id = bind.execute(sa.text('SELECT MIN(id) FROM "user"')).scalar() if 'user' in tables else None
+
+    for table, indexes in OWNED_TABLES.items():
+        if table not in tables:
+            continue
+        columns = {c['name'] for c in inspector.get_columns(table)}
+        existing_indexes = {i['name'] for i in inspector.get_indexes(table)}
+
+        if 'user_id' not in columns:
+            op.add_column(table, sa.Column('user_id', sa.Integer(), nullable=True))
+            row_count = bind.execute(sa.text(f'SELECT COUNT(*) FROM {table}')).scalar()
+            if row_count:
+                if owner_id is None:
+                    raise RuntimeError(f"{table} has {row_count} rows but no user exists to own them; create a user first")
+                bind.execute(sa.text(f'UPDATE {table} SET user_id = :owner_id'), {'owner_id': owner_id})
+
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=False)
+                batch_op.create_foreign_key(f'fk_{table}_user_id', 'user', ['user_id'], ['id'])
+                if table == 'budget':
+                    batch_op.drop_constraint('uix_category_month_year', type_='unique')
+                    batch_op.create_unique_constraint('uix_user_category_month_year', ['user_id', 'category', 'month', 'year'])
+
+        for name, _columns in OBSOLETE_INDEXES.get(table, []):
+            if name in existing_indexes:
+                op.drop_index(name, table_name=table)
+        for name, index_columns in indexes:
+            if name not in existing_indexes:
+                op.create_index(name, table, index_columns)
+
+    for table in DERIVED_TABLES:
+        if table in tables and 'user_id' not in {c['name'] for c in inspector.get_columns(table)}:
+            op.drop_table(table)
+
+
+def downgrade():
+    # All rows collapse back into one shared data set; derived tables are rebuilt on start
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    for table in DERIVED_TABLES:
+        if table in tables:
+            op.drop_table(table)
+
+    for table, indexes in OWNED_TABLES.items():
+        if table not in tables:
+            continue
+        foreign_keys = [fk['name'] for fk in inspector.get_foreign_keys(table)
+                        if fk['constrained_columns'] == ['user_id'] and fk['name']]
+        for name, _columns in indexes:
+            op.drop_index(name, table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            if table == 'budget':
+                batch_op.drop_constraint('uix_user_category_month_year', type_='unique')
+                batch_op.create_unique_constraint('uix_category_month_year', ['category', 'month', 'year'])
+            for name in foreign_keys:
+                batch_op.drop_constraint(name, type_='foreignkey')
+            batch_op.drop_column('user_id')
+        for name, index_columns in OBSOLETE_INDEXES.get(table, []):
+            op.create_index(name, table, index_columns)
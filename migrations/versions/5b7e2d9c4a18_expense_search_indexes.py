@@ -0,0 +1,40 @@
+"""Full-text search indexes for expense notes
+
+Revision ID: 5b7e2d9c4a18
+Revises: 8c41d2e6a913
+Create Date: 2026-10-18 13:42:10.518204
+
+Postgres only: a GIN index over the notes/category tsvector for ranked word
+matches, and a pg_trgm GIN index on the note so substring ILIKE searches
+stop scanning the table. The tsvector expression must match
+EXPENSE_TSVECTOR in app.py exactly.
+
+SQLite databases get their FTS5 index and sync triggers from
+ensure_search_index() at app startup, so there is nothing to do here.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5b7e2d9c4a18'
+down_revision = '8c41d2e6a913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_expense_search_tsv ON expense "
+        "USING gin (to_tsvector('simple', coalesce(note, '') || ' ' || category))"
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS idx_expense_note_trgm ON expense USING gin (note gin_trgm_ops)")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("DROP INDEX IF EXISTS idx_expense_note_trgm")
+    op.execute("DROP INDEX IF EXISTS idx_expense_search_tsv")
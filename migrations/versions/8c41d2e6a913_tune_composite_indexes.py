@@ -0,0 +1,65 @@
+"""Composite indexes tuned to the hot query shapes
+
+Revision ID: 8c41d2e6a913
+Revises: 3f2a9c1d7b40
+Create Date: 2026-10-18 11:04:52.771305
+
+Every expense, income and recurring query is per user, so the old global
+single-column indexes are never chosen and only slow down writes. They
+are replaced with composite indexes matching the queries app.py runs:
+
+- budget alert total: user_id + category + date range, SUM(amount)
+- category spending since a date: user_id + date range, GROUP BY category
+- due reminders: is_active + next_due range, across users and per user
+
+scripts/bench_indexes.py prints plans and timings for both index sets.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c41d2e6a913'
+down_revision = '3f2a9c1d7b40'
+branch_labels = None
+depends_on = None
+
+
+NEW_INDEXES = [
+    ('expense', 'idx_expense_user_category_date_amount', ['user_id', 'category', 'date', 'amount']),
+    ('expense', 'idx_expense_user_date_category_amount', ['user_id', 'date', 'category', 'amount']),
+    ('recurring_expense', 'idx_recurring_user_active_next_due', ['user_id', 'is_active', 'next_due']),
+    ('recurring_expense', 'idx_recurring_active_next_due', ['is_active', 'next_due']),
+]
+
+OLD_INDEXES = [
+    ('expense', 'idx_expense_user_category_date', ['user_id', 'category', 'date']),
+    ('expense', 'ix_expense_date', ['date']),
+    ('expense', 'ix_expense_category', ['category']),
+    ('expense', 'ix_expense_payment_method', ['payment_method']),
+    ('income', 'ix_income_date', ['date']),
+    ('recurring_expense', 'ix_recurring_expense_user_id', ['user_id']),
+]
+
+
+def _existing_indexes(inspector, table):
+    return {i['name'] for i in inspector.get_indexes(table)}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    for table, name, columns in NEW_INDEXES:
+        if table in tables and name not in _existing_indexes(inspector, table):
+            op.create_index(name, table, columns)
+    for table, name, _columns in OLD_INDEXES:
+        if table in tables and name in _existing_indexes(inspector, table):
+            op.drop_index(name, table_name=table)
+
+
+def downgrade():
+    for table, name, columns in OLD_INDEXES:
+        op.create_index(name, table, columns)
+    for table, name, _columns in NEW_INDEXES:
+        op.drop_index(name, table_name=table)
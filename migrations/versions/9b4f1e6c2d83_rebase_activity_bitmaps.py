@@ -0,0 +1,29 @@
+"""Store activity bitmaps from each user's first logged day
+
+Revision ID: 9b4f1e6c2d83
+Revises: e6a9d2c47b01
+Create Date: 2026-10-19 10:12:45.204871
+
+Bitmaps used to start at 2000-01-01. They are cleared to NULL, which makes
+the app rebuild each user's counters, and the bitmap in the new layout, from
+the source tables on their next write or dashboard visit.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b4f1e6c2d83'
+down_revision = 'e6a9d2c47b01'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    user_stats = sa.table('user_stats', sa.column('activity_bitmap', sa.LargeBinary))
+    op.execute(user_stats.update().values(activity_bitmap=None))
+
+
+def downgrade():
+    user_stats = sa.table('user_stats', sa.column('activity_bitmap', sa.LargeBinary))
+    op.execute(user_stats.update().values(activity_bitmap=None))
@@ -0,0 +1,38 @@
+"""Add recurring_expense.due_day for calendar-aware posting
+
+Revision ID: a7d3f51c9e24
+Revises: e4a8c2f60d17
+Create Date: 2026-10-18 18:12:09.417350
+
+Existing items take the day of their current next_due, which is the best
+record of the day they were meant to fall on.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d3f51c9e24'
+down_revision = 'e4a8c2f60d17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if 'due_day' not in {c['name'] for c in sa.inspect(bind).get_columns('recurring_expense')}:
+        op.add_column('recurring_expense', sa.Column('due_day', sa.SmallInteger(), nullable=True))
+
+    recurring = sa.table('recurring_expense', sa.column('id', sa.Integer), sa.column('next_due', sa.Date),
+                         sa.column('due_day', sa.SmallInteger))
+    rows = bind.execute(sa.select(recurring.c.id, recurring.c.next_due).where(recurring.c.due_day.is_(None))).all()
+    if rows:
+        bind.execute(
+            recurring.update().where(recurring.c.id == sa.bindparam('recurring_id')),
+            [{'recurring_id': row.id, 'due_day': row.next_due.day} for row in rows]
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('recurring_expense') as batch_op:
+        batch_op.drop_column('due_day')
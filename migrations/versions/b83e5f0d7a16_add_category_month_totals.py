@@ -0,0 +1,71 @@
+"""Add category_month_total running totals and budget.alerted_threshold
+
+Revision ID: b83e5f0d7a16
+Revises: f2c8a6d41b93
+Create Date: 2026-10-18 20:31:12.578204
+
+Totals are backfilled with one GROUP BY over expenses, the same result
+rebuild_category_month_totals() in app.py produces.
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b83e5f0d7a16'
+down_revision = 'f2c8a6d41b93'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if 'alerted_threshold' not in {c['name'] for c in inspector.get_columns('budget')}:
+        op.add_column('budget', sa.Column('alerted_threshold', sa.SmallInteger(), nullable=True))
+    category_month_total = sa.table(
+        'category_month_total', sa.column('user_id', sa.Integer), sa.column('month_start', sa.Date),
+        sa.column('category', sa.String), sa.column('total', sa.Numeric(14, 2)), sa.column('expense_count', sa.Integer)
+    )
+    # The app's create_all() may already have made the table, empty, on startup
+    if 'category_month_total' not in inspector.get_table_names():
+        op.create_table(
+            'category_month_total',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('month_start', sa.Date(), nullable=False),
+            sa.Column('category', sa.String(length=50), nullable=False),
+            sa.Column('total', sa.Numeric(precision=14, scale=2), nullable=False),
+            sa.Column('expense_count', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id'], name='fk_category_month_total_user_id'),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('user_id', 'month_start', 'category', name='uix_user_month_category')
+        )
+    elif bind.execute(sa.select(sa.func.count()).select_from(category_month_total)).scalar():
+        return
+
+    expense = sa.table('expense', sa.column('user_id', sa.Integer), sa.column('date', sa.Date),
+                       sa.column('category', sa.String), sa.column('amount', sa.Numeric(10, 2)))
+    year, month = sa.extract('year', expense.c.date), sa.extract('month', expense.c.date)
+    # One row per user, category and month, far fewer than expenses
+    rows = bind.execute(
+        sa.select(expense.c.user_id, expense.c.category, year, month,
+                  sa.func.sum(expense.c.amount), sa.func.count())
+        .group_by(expense.c.user_id, expense.c.category, year, month)
+    ).all()
+    for start in range(0, len(rows), BACKFILL_BATCH_SIZE):
+        op.bulk_insert(category_month_total, [
+            {'user_id': user_id, 'category': category, 'month_start': date(int(y), int(m), 1),
+             'total': total, 'expense_count': count}
+            for user_id, category, y, m, total, count in rows[start:start + BACKFILL_BATCH_SIZE]
+        ])
+
+
+def downgrade():
+    op.drop_table('category_month_total')
+    with op.batch_alter_table('budget') as batch_op:
+        batch_op.drop_column('alerted_threshold')
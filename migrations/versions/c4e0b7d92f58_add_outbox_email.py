@@ -0,0 +1,44 @@
+"""Add outbox_email for background email delivery
+
+Revision ID: c4e0b7d92f58
+Revises: b83e5f0d7a16
+Create Date: 2026-10-18 21:14:40.390517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e0b7d92f58'
+down_revision = 'b83e5f0d7a16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'outbox_email' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'outbox_email',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('kind', sa.String(length=30), nullable=False),
+        sa.Column('recipient', sa.String(length=120), nullable=False),
+        sa.Column('subject', sa.String(length=200), nullable=False),
+        sa.Column('body', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=10), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.String(length=500), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], name='fk_outbox_email_user_id'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_outbox_status_next_attempt', 'outbox_email', ['status', 'next_attempt_at'])
+
+
+def downgrade():
+    op.drop_index('idx_outbox_status_next_attempt', table_name='outbox_email')
+    op.drop_table('outbox_email')
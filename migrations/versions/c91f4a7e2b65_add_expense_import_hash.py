@@ -0,0 +1,63 @@
+"""Add expense.import_hash for statement import deduplication
+
+Revision ID: c91f4a7e2b65
+Revises: 5b7e2d9c4a18
+Create Date: 2026-10-18 15:20:37.904116
+
+Existing expenses are fingerprinted so the first statement import already
+skips transactions that were entered by hand. The fingerprint must match
+expense_import_hash() in app.py.
+"""
+import hashlib
+from decimal import Decimal
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c91f4a7e2b65'
+down_revision = '5b7e2d9c4a18'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def _import_hash(date, amount, note):
+    note = ' '.join((note or '').split()).lower()[:200]
+    key = f"{date.isoformat()}|{Decimal(str(amount)).quantize(Decimal('0.01'))}|{note}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if 'import_hash' not in {c['name'] for c in inspector.get_columns('expense')}:
+        op.add_column('expense', sa.Column('import_hash', sa.String(length=40), nullable=True))
+    if 'idx_expense_user_import_hash' not in {i['name'] for i in inspector.get_indexes('expense')}:
+        op.create_index('idx_expense_user_import_hash', 'expense', ['user_id', 'import_hash'])
+
+    expense = sa.table('expense', sa.column('id', sa.Integer), sa.column('date', sa.Date),
+                       sa.column('amount', sa.Numeric(10, 2)), sa.column('note', sa.String),
+                       sa.column('import_hash', sa.String))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(expense.c.id, expense.c.date, expense.c.amount, expense.c.note)
+            .where(expense.c.id > last_id, expense.c.import_hash.is_(None))
+            .order_by(expense.c.id).limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            expense.update().where(expense.c.id == sa.bindparam('expense_id')),
+            [{'expense_id': row.id, 'import_hash': _import_hash(row.date, row.amount, row.note)} for row in rows]
+        )
+        last_id = rows[-1].id
+
+
+def downgrade():
+    op.drop_index('idx_expense_user_import_hash', table_name='expense')
+    with op.batch_alter_table('expense') as batch_op:
+        batch_op.drop_column('import_hash')
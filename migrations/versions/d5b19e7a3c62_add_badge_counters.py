@@ -0,0 +1,68 @@
+"""Add user_stats, expense_day and income_source for event-driven badges
+
+Revision ID: d5b19e7a3c62
+Revises: a7d3f51c9e24
+Create Date: 2026-10-18 19:03:51.662014
+
+No backfill: each user's counters are built from the source tables by the
+app on their first write after the upgrade.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5b19e7a3c62'
+down_revision = 'a7d3f51c9e24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    if 'user_stats' not in existing:
+        op.create_table(
+            'user_stats',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('expense_count', sa.Integer(), nullable=False),
+            sa.Column('expense_days', sa.Integer(), nullable=False),
+            sa.Column('income_sources', sa.Integer(), nullable=False),
+            sa.Column('savings_goals', sa.Integer(), nullable=False),
+            sa.Column('completed_goals', sa.Integer(), nullable=False),
+            sa.Column('total_saved', sa.Numeric(precision=14, scale=2), nullable=False),
+            sa.Column('recurring_count', sa.Integer(), nullable=False),
+            sa.Column('analytics_visits', sa.Integer(), nullable=False),
+            sa.Column('budget_month', sa.Date(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id'], name='fk_user_stats_user_id'),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('user_id')
+        )
+    if 'expense_day' not in existing:
+        op.create_table(
+            'expense_day',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('expense_count', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id'], name='fk_expense_day_user_id'),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('user_id', 'day', name='uix_user_expense_day')
+        )
+    if 'income_source' not in existing:
+        op.create_table(
+            'income_source',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=50), nullable=False),
+            sa.Column('income_count', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id'], name='fk_income_source_user_id'),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('user_id', 'name', name='uix_user_income_source')
+        )
+
+
+def downgrade():
+    op.drop_table('income_source')
+    op.drop_table('expense_day')
+    op.drop_table('user_stats')
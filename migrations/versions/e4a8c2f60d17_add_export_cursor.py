@@ -0,0 +1,36 @@
+"""Add export_cursor for incremental columnar exports
+
+Revision ID: e4a8c2f60d17
+Revises: c91f4a7e2b65
+Create Date: 2026-10-18 17:05:44.236981
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a8c2f60d17'
+down_revision = 'c91f4a7e2b65'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'export_cursor' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'export_cursor',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('table_name', sa.String(length=30), nullable=False),
+        sa.Column('last_id', sa.Integer(), nullable=False),
+        sa.Column('exported_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], name='fk_export_cursor_user_id'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'table_name', name='uix_user_export_table')
+    )
+
+
+def downgrade():
+    op.drop_table('export_cursor')
@@ -0,0 +1,50 @@
+"""Add reminder_log and digest_log so scheduled digests are sent once
+
+Revision ID: e6a9d2c47b01
+Revises: c4e0b7d92f58
+Create Date: 2026-10-18 21:52:07.816342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6a9d2c47b01'
+down_revision = 'c4e0b7d92f58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    if 'reminder_log' not in existing:
+        op.create_table(
+            'reminder_log',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('recurring_id', sa.Integer(), nullable=False),
+            sa.Column('due_date', sa.Date(), nullable=False),
+            sa.Column('sent_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id'], name='fk_reminder_log_user_id'),
+            sa.ForeignKeyConstraint(['recurring_id'], ['recurring_expense.id'], name='fk_reminder_log_recurring_id',
+                                    ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('recurring_id', 'due_date', name='uix_reminder_recurring_due')
+        )
+    if 'digest_log' not in existing:
+        op.create_table(
+            'digest_log',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('month_start', sa.Date(), nullable=False),
+            sa.Column('sent_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id'], name='fk_digest_log_user_id'),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('user_id', 'month_start', name='uix_user_digest_month')
+        )
+
+
+def downgrade():
+    op.drop_table('digest_log')
+    op.drop_table('reminder_log')
@@ -0,0 +1,32 @@
+"""Add user_stats.activity_bitmap and longest_streak for streak tracking
+
+Revision ID: f2c8a6d41b93
+Revises: d5b19e7a3c62
+Create Date: 2026-10-18 19:48:26.104573
+
+Rows are left with a NULL bitmap, which makes the app rebuild that user's
+counters from the source tables on their next write or dashboard visit.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c8a6d41b93'
+down_revision = 'd5b19e7a3c62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('user_stats')}
+    if 'activity_bitmap' not in columns:
+        op.add_column('user_stats', sa.Column('activity_bitmap', sa.LargeBinary(), nullable=True))
+    if 'longest_streak' not in columns:
+        op.add_column('user_stats', sa.Column('longest_streak', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('user_stats') as batch_op:
+        batch_op.drop_column('longest_streak')
+        batch_op.drop_column('activity_bitmap')
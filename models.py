@@ -37,12 +37,24 @@ class User(db.Model):
 class Expense(db.Model):
     __tablename__ = 'expense'
     id = db.Column(db.Integer, primary_key=True)
-    date = db.Column(db.Date, nullable=False, index=True)
-    category = db.Column(db.String(50), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    category = db.Column(db.String(50), nullable=False)
     amount = db.Column(Numeric(precision=10, scale=2), nullable=False)
     note = db.Column(db.String(200))
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
-    payment_method = db.Column(db.String(20), default='cash', index=True)
+    payment_method = db.Column(db.String(20), default='cash')
+    # Fingerprint of (date, amount, note) used to skip rows a statement import has already seen,
+    # or of (recurring item, due date) for rows posted by `flask post-recurring`
+    import_hash = db.Column(db.String(40))
+    # Every query is per user; see scripts/bench_indexes.py for the query shapes these serve
+    __table_args__ = (
+        db.Index('idx_expense_user_date_id', 'user_id', 'date', 'id'),
+        db.Index('idx_expense_user_import_hash', 'user_id', 'import_hash'),
+        db.Index('idx_expense_user_amount_id', 'user_id', 'amount', 'id'),
+        db.Index('idx_expense_user_category_date_amount', 'user_id', 'category', 'date', 'amount'),
+        db.Index('idx_expense_user_date_category_amount', 'user_id', 'date', 'category', 'amount'),
+    )
 
     def __repr__(self):
         return f'<Expense {self.category}: {self.amount}>'
@@ -50,14 +62,17 @@ class Expense(db.Model):
 class Budget(db.Model):
     __tablename__ = 'budget'
     id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     category = db.Column(db.String(50), nullable=False)
     amount = db.Column(Numeric(precision=10, scale=2), nullable=False)
     month = db.Column(db.Integer, nullable=False)
     year = db.Column(db.Integer, nullable=False)
+    # Highest alert threshold (percent) already sent for this budget; cleared when the amount changes
+    alerted_threshold = db.Column(db.SmallInteger)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     __table_args__ = (
-        db.UniqueConstraint('category', 'month', 'year', name='uix_category_month_year'),
-        db.Index('idx_month_year', 'month', 'year'),
+        db.UniqueConstraint('user_id', 'category', 'month', 'year', name='uix_user_category_month_year'),
+        db.Index('idx_user_month_year', 'user_id', 'month', 'year'),
     )
 
     def __repr__(self):
@@ -66,6 +81,7 @@ class Budget(db.Model):
 class SavingsGoal(db.Model):
     __tablename__ = 'savings_goal'
     id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     name = db.Column(db.String(100), nullable=False)
     target_amount = db.Column(Numeric(precision=10, scale=2), nullable=False)
     current_amount = db.Column(Numeric(precision=10, scale=2), default=0)
@@ -88,11 +104,15 @@ class SavingsGoal(db.Model):
 class Income(db.Model):
     __tablename__ = 'income'
     id = db.Column(db.Integer, primary_key=True)
-    date = db.Column(db.Date, nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
     source = db.Column(db.String(50), nullable=False)
     amount = db.Column(Numeric(precision=10, scale=2), nullable=False)
     note = db.Column(db.String(200))
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    __table_args__ = (
+        db.Index('idx_income_user_date', 'user_id', 'date'),
+    )
 
     def __repr__(self):
         return f'<Income {self.source}: {self.amount}>'
@@ -100,17 +120,193 @@ class Income(db.Model):
 class RecurringExpense(db.Model):
     __tablename__ = 'recurring_expense'
     id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     name = db.Column(db.String(100), nullable=False)
     category = db.Column(db.String(50), nullable=False)
     amount = db.Column(Numeric(precision=10, scale=2), nullable=False)
     frequency = db.Column(db.String(20), nullable=False)
     next_due = db.Column(db.Date, nullable=False)
+    # Day of the month monthly/yearly items fall on, kept so a 31st doesn't drift to the 28th after February
+    due_day = db.Column(db.SmallInteger)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    __table_args__ = (
+        db.Index('idx_recurring_user_active_next_due', 'user_id', 'is_active', 'next_due'),
+        db.Index('idx_recurring_active_next_due', 'is_active', 'next_due'),
+    )
 
     def __repr__(self):
         return f'<RecurringExpense {self.name}: {self.amount} ({self.frequency})>'
 
+class MonthlyRollup(db.Model):
+    __tablename__ = 'monthly_rollup'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    month_start = db.Column(db.Date, nullable=False)
+    expense_total = db.Column(Numeric(precision=14, scale=2), nullable=False, default=0)
+    expense_count = db.Column(db.Integer, nullable=False, default=0)
+    income_total = db.Column(Numeric(precision=14, scale=2), nullable=False, default=0)
+    income_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'month_start', name='uix_user_month_start'),
+    )
+
+    def __repr__(self):
+        return f'<MonthlyRollup {self.month_start}: {self.expense_total}/{self.income_total}>'
+
+class CategoryMonthTotal(db.Model):
+    """Per-user expense total per category per month, kept in step with expense writes for budget checks"""
+    __tablename__ = 'category_month_total'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    month_start = db.Column(db.Date, nullable=False)
+    category = db.Column(db.String(50), nullable=False)
+    total = db.Column(Numeric(precision=14, scale=2), nullable=False, default=0)
+    expense_count = db.Column(db.Integer, nullable=False, default=0)
+    # Leading (user_id, month_start) also serves "all categories this month"
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'month_start', 'category', name='uix_user_month_category'),
+    )
+
+    def __repr__(self):
+        return f'<CategoryMonthTotal {self.month_start} {self.category}: {self.total}>'
+
+class ExpenseCategory(db.Model):
+    __tablename__ = 'expense_category'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    name = db.Column(db.String(50), nullable=False)
+    expense_count = db.Column(db.Integer, nullable=False, default=0)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'name', name='uix_user_category_name'),
+    )
+
+    def __repr__(self):
+        return f'<ExpenseCategory {self.name}: {self.expense_count}>'
+
+class ExchangeRateSnapshot(db.Model):
+    __tablename__ = 'exchange_rate_snapshot'
+    id = db.Column(db.Integer, primary_key=True)
+    base = db.Column(db.String(10), nullable=False, default='INR')
+    source = db.Column(db.String(50), nullable=False)
+    rates = db.Column(db.Text, nullable=False)
+    fetched_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<ExchangeRateSnapshot {self.source} @ {self.fetched_at}>'
+
+class UserTips(db.Model):
+    __tablename__ = 'user_tips'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    page = db.Column(db.String(20), nullable=False)
+    context_hash = db.Column(db.String(64), nullable=False, default='')
+    tips = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'page', 'context_hash', name='uix_user_tips_context'),
+    )
+
+    def __repr__(self):
+        return f'<UserTips {self.page} for user {self.user_id}>'
+
+class FinancialSnapshot(db.Model):
+    """
+    Precomputed per-user financial summary read by the AI assistant in one query.
+    Totals are adjusted incrementally on expense/income writes; the small
+    list sections (JSON) are refreshed when their source table changes.
+    """
+    __tablename__ = 'financial_snapshot'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, unique=True)
+    expense_total = db.Column(Numeric(precision=14, scale=2), nullable=False, default=0)
+    income_total = db.Column(Numeric(precision=14, scale=2), nullable=False, default=0)
+    category_totals = db.Column(db.Text, nullable=False, default='{}')
+    income_sources = db.Column(db.Text, nullable=False, default='{}')
+    month_start = db.Column(db.Date, nullable=True)
+    month_category_totals = db.Column(db.Text, nullable=False, default='{}')
+    recent_expenses = db.Column(db.Text, nullable=False, default='[]')
+    budgets = db.Column(db.Text, nullable=False, default='[]')
+    savings = db.Column(db.Text, nullable=False, default='[]')
+    recurring = db.Column(db.Text, nullable=False, default='[]')
+    data_version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self):
+        return f'<FinancialSnapshot user {self.user_id} v{self.data_version}>'
+
+class ExportCursor(db.Model):
+    """Highest row id already sent by an incremental columnar export, per user and table"""
+    __tablename__ = 'export_cursor'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    table_name = db.Column(db.String(30), nullable=False)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    exported_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'table_name', name='uix_user_export_table'),
+    )
+
+    def __repr__(self):
+        return f'<ExportCursor {self.table_name} for user {self.user_id}: {self.last_id}>'
+
+class OutboxEmail(db.Model):
+    """
+    An email waiting for the background sender. Rows are written in the same
+    transaction as the change that triggers them and delivered in batches
+    over one SMTP connection, with retries and backoff on failure.
+    """
+    __tablename__ = 'outbox_email'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    kind = db.Column(db.String(30), nullable=False)
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(10), nullable=False, default='pending')  # pending, sent or failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    last_error = db.Column(db.String(500))
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    sent_at = db.Column(db.DateTime)
+    __table_args__ = (
+        db.Index('idx_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+    def __repr__(self):
+        return f'<OutboxEmail {self.kind} to {self.recipient}: {self.status}>'
+
+class ReminderLog(db.Model):
+    """A recurring item's due date that a reminder digest has already covered"""
+    __tablename__ = 'reminder_log'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    recurring_id = db.Column(db.Integer, db.ForeignKey('recurring_expense.id', ondelete='CASCADE'), nullable=False)
+    due_date = db.Column(db.Date, nullable=False)
+    sent_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    __table_args__ = (
+        db.UniqueConstraint('recurring_id', 'due_date', name='uix_reminder_recurring_due'),
+    )
+
+    def __repr__(self):
+        return f'<ReminderLog {self.recurring_id} due {self.due_date}>'
+
+class DigestLog(db.Model):
+    """A month whose summary digest has already been queued for a user"""
+    __tablename__ = 'digest_log'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    month_start = db.Column(db.Date, nullable=False)
+    sent_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'month_start', name='uix_user_digest_month'),
+    )
+
+    def __repr__(self):
+        return f'<DigestLog {self.month_start} for user {self.user_id}>'
+
 class Achievement(db.Model):
     __tablename__ = 'achievement'
     id = db.Column(db.Integer, primary_key=True)
@@ -125,6 +321,60 @@ class Achievement(db.Model):
     def __repr__(self):
         return f'<Achievement {self.badge_key} for user {self.user_id}>'
 
+class UserStats(db.Model):
+    """
+    Per-user counters the badge rules are checked against, adjusted on every
+    write so unlocking a badge never needs a scan. Built from the source
+    tables the first time a user writes after the table appears.
+    """
+    __tablename__ = 'user_stats'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, unique=True)
+    expense_count = db.Column(db.Integer, nullable=False, default=0)
+    expense_days = db.Column(db.Integer, nullable=False, default=0)
+    income_sources = db.Column(db.Integer, nullable=False, default=0)
+    savings_goals = db.Column(db.Integer, nullable=False, default=0)
+    completed_goals = db.Column(db.Integer, nullable=False, default=0)
+    total_saved = db.Column(Numeric(precision=14, scale=2), nullable=False, default=0)
+    recurring_count = db.Column(db.Integer, nullable=False, default=0)
+    analytics_visits = db.Column(db.Integer, nullable=False, default=0)
+    # First tracked day, then bit i set when the user has an expense on that day + i (see set_activity_days)
+    activity_bitmap = db.Column(db.LargeBinary)
+    longest_streak = db.Column(db.Integer, nullable=False, default=0)
+    # First day of the month the budget_master check last ran for, so each month is judged once
+    budget_month = db.Column(db.Date)
+
+    def __repr__(self):
+        return f'<UserStats for user {self.user_id}>'
+
+class ExpenseDay(db.Model):
+    """Expenses per day per user, so expense_days only moves when a day gains its first or loses its last expense"""
+    __tablename__ = 'expense_day'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    expense_count = db.Column(db.Integer, nullable=False, default=0)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'day', name='uix_user_expense_day'),
+    )
+
+    def __repr__(self):
+        return f'<ExpenseDay {self.day}: {self.expense_count}>'
+
+class IncomeSource(db.Model):
+    """Income records per source per user, the income counterpart of ExpenseCategory"""
+    __tablename__ = 'income_source'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    name = db.Column(db.String(50), nullable=False)
+    income_count = db.Column(db.Integer, nullable=False, default=0)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'name', name='uix_user_income_source'),
+    )
+
+    def __repr__(self):
+        return f'<IncomeSource {self.name}: {self.income_count}>'
+
 # Badge definitions — static catalog
 BADGE_CATALOG = {
     'first_expense': {
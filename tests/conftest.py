@@ -0,0 +1,38 @@
+import os
+import tempfile
+
+import pytest
+
+# The app binds its database at import time
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='moneymate-tests-'), 'test.db')
+os.environ.setdefault('EXCHANGE_RATE_SOURCE', 'stub')
+
+import app as money_mate  # noqa: E402
+from models import User, db  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    money_mate.app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with money_mate.app.app_context():
+        yield money_mate.app
+        db.session.rollback()
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+
+
+@pytest.fixture
+def user(app):
+    user = User(username='alice', email='alice@example.com')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def client(app, user):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user.id
+    return client
@@ -0,0 +1,38 @@
+import random
+from datetime import date, timedelta
+
+from app import ACTIVITY_HEADER, current_streak, days_active, longest_streak, set_activity_days
+
+
+def reference(days, today, start, end):
+    """Brute-force current streak, longest streak and days active over a set of days"""
+    current, day = 0, today if today in days else today - timedelta(days=1)
+    while day in days:
+        current, day = current + 1, day - timedelta(days=1)
+    longest = max((next(n for n in range(len(days) + 1) if d + timedelta(days=n) not in days)
+                   for d in days if d - timedelta(days=1) not in days), default=0)
+    active = sum(1 for d in days if start <= d <= end)
+    return current, longest, active
+
+
+def test_bitmap_is_compact():
+    bitmap = set_activity_days(None, {date(2026, 10, 18): True})
+    assert len(bitmap) == ACTIVITY_HEADER.size + 1
+    assert set_activity_days(bitmap, {date(2026, 10, 18): False}) == b''
+
+
+def test_streaks_match_reference_as_days_are_set_and_cleared():
+    rng = random.Random(7)
+    today = date(2026, 10, 18)
+    for _ in range(200):
+        days, bitmap = set(), None
+        for _ in range(rng.randint(1, 40)):
+            day = today - timedelta(days=rng.randint(0, 60))
+            logged = rng.random() < 0.75
+            bitmap = set_activity_days(bitmap, {day: logged})
+            (days.add if logged else days.discard)(day)
+        start = today - timedelta(days=rng.randint(0, 60))
+        end = start + timedelta(days=rng.randint(0, 60))
+        assert (current_streak(bitmap, today), longest_streak(bitmap), days_active(bitmap, start, end)) == \
+            reference(days, today, start, end)
+        assert len(bitmap) <= ACTIVITY_HEADER.size + 9
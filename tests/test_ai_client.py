@@ -0,0 +1,110 @@
+import time
+
+import pytest
+
+import ai_client
+from ai_client import AIServiceError, CircuitBreaker
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers(monkeypatch):
+    monkeypatch.setattr(ai_client, '_breakers', {})
+    monkeypatch.setattr(ai_client, 'get_client', lambda api_key: object())
+
+
+def half_open(model):
+    breaker = ai_client.get_breaker('key', model)
+    breaker.failures = breaker.failure_threshold
+    breaker.open_until = time.monotonic() - 1
+    return breaker
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def fake_models(monkeypatch, behaviours):
+    """behaviours: {model: (delay, text or exception)}"""
+    def call(client, model, contents, config):
+        delay, outcome = behaviours[model]
+        time.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    monkeypatch.setattr(ai_client, '_call_model', call)
+
+
+def test_breaker_opens_after_threshold_and_allows_one_trial():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.allow()
+
+
+def test_rate_limit_opens_immediately():
+    breaker = CircuitBreaker(rate_limit_timeout=60)
+    breaker.record_failure(rate_limited=ai_client.is_rate_limited(Exception('429 RESOURCE_EXHAUSTED')))
+    assert breaker.state == 'open'
+
+
+def test_hedged_request_returns_first_answer(monkeypatch):
+    fake_models(monkeypatch, {'slow': (0.3, 'slow answer'), 'fast': (0, 'fast answer')})
+    assert ai_client.generate('key', 'hi', models=['slow', 'fast'], hedge_after=0.05, budget=2) == 'fast answer'
+
+
+def test_losing_half_open_trial_still_records_success(monkeypatch):
+    breaker = half_open('slow')
+    fake_models(monkeypatch, {'slow': (0.2, 'late answer'), 'fast': (0, 'fast answer')})
+    assert ai_client.generate('key', 'hi', models=['slow', 'fast'], hedge_after=0.05, budget=2) == 'fast answer'
+    assert wait_for(lambda: breaker.state == 'closed')
+    assert breaker.allow()
+
+
+def test_half_open_trial_abandoned_at_budget_recovers(monkeypatch):
+    breaker = half_open('slow')
+    fake_models(monkeypatch, {'slow': (0.2, RuntimeError('boom'))})
+    with pytest.raises(AIServiceError):
+        ai_client.generate('key', 'hi', models=['slow'], budget=0.05)
+    # The late failure re-opens the breaker rather than leaving the trial in flight forever
+    assert wait_for(lambda: not breaker._trial_in_flight)
+    assert breaker.state == 'open'
+    breaker.open_until = time.monotonic() - 1
+    assert breaker.allow()
+
+
+def test_stream_releases_trial_when_aborted(monkeypatch):
+    breaker = half_open('m')
+
+    def aborted(client, model, contents, config):
+        raise SystemExit('worker timeout')
+        yield
+    monkeypatch.setattr(ai_client, '_open_stream', aborted)
+    with pytest.raises(SystemExit):
+        list(ai_client.stream('key', 'hi', models=['m']))
+    assert breaker.allow()
+
+
+def test_stream_falls_through_to_next_model(monkeypatch):
+    class Chunk:
+        def __init__(self, text):
+            self.text = text
+
+    def streams(client, model, contents, config):
+        if model == 'bad':
+            raise RuntimeError('down')
+        yield Chunk('he')
+        yield Chunk('llo')
+    monkeypatch.setattr(ai_client, '_open_stream', streams)
+    assert ''.join(ai_client.stream('key', 'hi', models=['bad', 'good'])) == 'hello'
+    assert ai_client.get_breaker('key', 'bad').failures == 1
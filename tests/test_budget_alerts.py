@@ -0,0 +1,98 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app import import_statement, post_due_recurring
+from models import Budget, Expense, OutboxEmail, RecurringExpense, db
+
+
+@pytest.fixture
+def budget(client, user):
+    user.notify_budget_alerts = True
+    db.session.commit()
+    client.post('/budgets', data={'category': 'Food', 'amount': '100'})
+    return Budget.query.filter_by(user_id=user.id, category='Food').one()
+
+
+def add(client, amount, day=None):
+    client.post('/', data={'date': (day or date.today()).isoformat(), 'category': 'Food', 'amount': str(amount),
+                           'note': '', 'payment_method': 'cash'})
+    return Expense.query.order_by(Expense.id.desc()).first()
+
+
+def alerts():
+    return [e.subject for e in OutboxEmail.query.filter_by(kind='budget_alert').order_by(OutboxEmail.id)]
+
+
+def test_each_threshold_alerts_once(client, budget):
+    add(client, 50)
+    assert alerts() == []
+    add(client, 30)
+    add(client, 5)
+    assert len(alerts()) == 1 and '80%' in alerts()[0]
+    add(client, 20)
+    assert len(alerts()) == 2 and '105%' in alerts()[1]
+    add(client, 10)
+    assert len(alerts()) == 2
+    assert budget.alerted_threshold == 100
+
+
+def test_delete_rearms_threshold(client, budget):
+    add(client, 50)
+    mistake = add(client, 60)
+    assert len(alerts()) == 1
+
+    client.post(f'/delete/{mistake.id}')
+    db.session.refresh(budget)
+    assert budget.alerted_threshold is None
+
+    add(client, 35)
+    assert len(alerts()) == 2 and '85%' in alerts()[1]
+
+
+def test_clear_rearms_thresholds(client, budget):
+    add(client, 110)
+    assert len(alerts()) == 1
+    client.post('/clear')
+    db.session.refresh(budget)
+    assert budget.alerted_threshold is None
+
+    add(client, 85)
+    assert len(alerts()) == 2 and '85%' in alerts()[1]
+
+
+def test_changing_the_budget_amount_rearms_alerts(client, budget):
+    add(client, 90)
+    client.post('/budgets', data={'category': 'Food', 'amount': '200'})
+    add(client, 80)
+    assert len(alerts()) == 2 and '85%' in alerts()[1]
+
+
+def test_import_alerts_each_threshold_once(client, user, budget):
+    day = date.today()
+    rows = [{'date': day, 'amount': Decimal('-30'), 'note': f'shop {i}', 'category': 'Food', 'payment_method': None}
+            for i in range(4)]
+    for _ in import_statement(user.id, rows, batch_size=1):
+        pass
+    assert len(alerts()) == 2 and '90%' in alerts()[0] and '120%' in alerts()[1]
+
+
+def test_abandoned_import_alerts_for_committed_batches(client, user, budget):
+    rows = [{'date': date.today(), 'amount': Decimal('-90'), 'note': f'shop {i}', 'category': 'Food',
+             'payment_method': None} for i in range(3)]
+    progress = import_statement(user.id, rows, batch_size=1)
+    next(progress)
+    progress.close()
+    assert len(alerts()) == 1 and '90%' in alerts()[0]
+
+
+def test_recurring_posting_alerts(client, user, budget):
+    today = date.today()
+    db.session.add(RecurringExpense(user_id=user.id, name='Meal plan', amount=90, category='Food', frequency='monthly',
+                                    next_due=today, due_day=today.day, is_active=True))
+    db.session.commit()
+    post_due_recurring(today=today)
+    assert len(alerts()) == 1 and '90%' in alerts()[0]
+    assert post_due_recurring(today=today + timedelta(days=1))['posted'] == 0
+    assert len(alerts()) == 1
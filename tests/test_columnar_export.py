@@ -0,0 +1,47 @@
+import io
+from datetime import date
+
+import pyarrow as pa
+
+from models import db, Expense
+
+
+def add(user, amount):
+    db.session.add(Expense(user_id=user.id, date=date(2026, 3, 1), category='Food', amount=amount, note='',
+                           payment_method='cash'))
+    db.session.commit()
+
+
+def export(client, **params):
+    response = client.get('/export/columnar', query_string={'table': 'expenses', 'format': 'arrow', **params})
+    assert response.status_code == 200
+    return response, pa.ipc.open_file(io.BytesIO(response.data)).read_all()
+
+
+def test_incremental_export_sends_new_rows_once(client, user):
+    add(user, 10)
+    add(user, 20)
+    response, table = export(client, incremental='1')
+    assert table.num_rows == 2
+    first, last = table.column('id').to_pylist()
+    assert response.headers['X-Export-Range'] == f'1-{last}' and first <= last
+
+    add(user, 30)
+    response, table = export(client, incremental='1')
+    assert table.column('amount').to_pylist() == [30]
+    assert response.headers['X-Export-Range'] == f'{last + 1}-{last + 1}'
+
+
+def test_empty_incremental_export_has_no_range(client, user):
+    add(user, 10)
+    export(client, incremental='1')
+    response, table = export(client, incremental='1')
+    assert table.num_rows == 0
+    assert 'X-Export-Range' not in response.headers
+
+
+def test_full_export_has_every_row(client, user):
+    add(user, 10)
+    export(client, incremental='1')
+    response, table = export(client)
+    assert table.num_rows == 1 and 'X-Export-Range' not in response.headers
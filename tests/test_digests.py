@@ -0,0 +1,80 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app import send_due_reminders, send_monthly_digests
+from models import OutboxEmail, RecurringExpense, User, db
+
+TODAY = date(2026, 10, 18)
+
+
+@pytest.fixture
+def users(user):
+    user.notify_due_reminders = True
+    bob = User(username='bob', email='bob@example.com', notify_due_reminders=True)
+    db.session.add(bob)
+    db.session.commit()
+    return user, bob
+
+
+def add_recurring(user, name, days_ahead, is_active=True):
+    due = TODAY + timedelta(days=days_ahead)
+    item = RecurringExpense(user_id=user.id, name=name, amount=10, category='Bills', frequency='monthly',
+                            next_due=due, due_day=due.day, is_active=is_active)
+    db.session.add(item)
+    db.session.commit()
+    return item
+
+
+def reminders():
+    return OutboxEmail.query.filter_by(kind='due_reminder').order_by(OutboxEmail.id).all()
+
+
+def test_one_reminder_digest_per_user_and_never_twice(users):
+    alice, bob = users
+    add_recurring(alice, 'Netflix', 0)
+    add_recurring(alice, 'Gym', 3)
+    add_recurring(alice, 'Later', 4)
+    add_recurring(alice, 'Paused', 1, is_active=False)
+    add_recurring(bob, 'Rent', 2)
+
+    assert send_due_reminders(TODAY) == 2
+    by_user = {email.user_id: email.body for email in reminders()}
+    assert 'Netflix' in by_user[alice.id] and 'Gym' in by_user[alice.id]
+    assert 'Later' not in by_user[alice.id] and 'Paused' not in by_user[alice.id]
+
+    assert send_due_reminders(TODAY) == 0
+    add_recurring(alice, 'Phone', 1)
+    assert send_due_reminders(TODAY + timedelta(days=1)) == 1
+    assert 'Phone' in reminders()[-1].body and 'Later' in reminders()[-1].body
+    assert 'Gym' not in reminders()[-1].body
+
+
+def test_next_due_date_is_reminded_again(users):
+    alice, _bob = users
+    item = add_recurring(alice, 'Netflix', 1)
+    assert send_due_reminders(TODAY) == 1
+    item.next_due = TODAY + timedelta(days=31)
+    db.session.commit()
+    assert send_due_reminders(TODAY + timedelta(days=30)) == 1
+
+
+def test_opted_out_users_get_nothing(users):
+    alice, _bob = users
+    alice.notify_due_reminders = False
+    db.session.commit()
+    add_recurring(alice, 'Netflix', 1)
+    assert send_due_reminders(TODAY) == 0
+
+
+def test_monthly_digest_covers_last_month_once(client, user):
+    user.notify_monthly_digest = True
+    db.session.commit()
+    client.post('/', data={'date': '2026-09-12', 'category': 'Food', 'amount': '25', 'note': '',
+                           'payment_method': 'cash'})
+
+    assert send_monthly_digests(TODAY) == 1
+    digest = OutboxEmail.query.filter_by(kind='monthly_digest').one()
+    assert 'September 2026' in digest.subject and 'Food' in digest.body
+    assert send_monthly_digests(TODAY + timedelta(days=5)) == 0
+    assert send_monthly_digests(date(2026, 11, 1)) == 1
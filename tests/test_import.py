@@ -0,0 +1,30 @@
+import io
+from datetime import date
+from decimal import Decimal
+
+from app import describe_import, import_statement, parse_statement_csv
+
+STATEMENT = """Account statement,,,
+Date,Description,Withdrawal,Deposit
+01/03/2026,Coffee,4.50,
+02/03/2026,Salary,,1000.00
+03/03/2026,Pending hold,,
+not a date,Broken,1.00,
+"""
+
+
+def test_debit_credit_columns():
+    rows = list(parse_statement_csv(io.StringIO(STATEMENT), date_format='%d/%m/%Y'))
+    assert rows[0] == {'date': date(2026, 3, 1), 'amount': Decimal('-4.50'), 'note': 'Coffee',
+                       'category': '', 'payment_method': ''}
+    assert rows[1]['amount'] == Decimal('1000.00')
+    # Neither a debit nor a credit: unreadable, not a zero credit
+    assert rows[2] is None
+    assert rows[3] is None
+
+
+def test_blank_rows_are_reported_as_invalid(app, user):
+    rows = parse_statement_csv(io.StringIO(STATEMENT), date_format='%d/%m/%Y')
+    *_, stats = import_statement(user.id, rows)
+    assert (stats['imported'], stats['credits'], stats['invalid']) == (1, 1, 2)
+    assert describe_import(stats).endswith('2 unreadable rows')
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as money_mate
+from app import OUTBOX_MAX_ATTEMPTS, deliver_outbox, outbox_retry_delay, queue_email
+from models import OutboxEmail, db
+
+
+class FakeConnection:
+    def __init__(self, fail_for=(), refuse=False):
+        self.fail_for = set(fail_for)
+        self.refuse = refuse
+        self.sent = []
+
+    def __enter__(self):
+        if self.refuse:
+            raise ConnectionRefusedError('SMTP server down')
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def send(self, message):
+        if message.subject in self.fail_for:
+            raise OSError('550 mailbox unavailable')
+        self.sent.append(message.subject)
+
+
+@pytest.fixture
+def smtp(app, monkeypatch):
+    connection = FakeConnection()
+    monkeypatch.setitem(app.config, 'MAIL_CONSOLE', False)
+    monkeypatch.setattr(money_mate.mail, 'connect', lambda: connection)
+    return connection
+
+
+def queue(user, *subjects):
+    for subject in subjects:
+        queue_email(user, 'test', subject, 'body')
+    db.session.commit()
+
+
+def make_due(email):
+    email.next_attempt_at = datetime(2000, 1, 1)
+    db.session.commit()
+
+
+def test_retry_delay_doubles_and_is_capped():
+    assert [outbox_retry_delay(n).total_seconds() for n in (1, 2, 3)] == [60, 120, 240]
+    assert outbox_retry_delay(20) == timedelta(hours=6)
+
+
+def test_batch_is_sent_over_one_connection(smtp, user):
+    queue(user, 'one', 'two', 'three')
+    assert deliver_outbox(batch_size=2) == 2
+    assert deliver_outbox(batch_size=2) == 1
+    assert smtp.sent == ['one', 'two', 'three']
+    assert {e.status for e in OutboxEmail.query} == {'sent'}
+    assert deliver_outbox() == 0
+
+
+def test_failed_send_backs_off_then_gives_up(smtp, user):
+    smtp.fail_for.add('bounce')
+    queue(user, 'bounce', 'fine')
+    assert deliver_outbox() == 1
+    email = OutboxEmail.query.filter_by(subject='bounce').one()
+    assert email.status == 'pending' and email.attempts == 1 and '550' in email.last_error
+
+    # Not due again until the backoff has passed
+    assert deliver_outbox() == 0
+    assert email.attempts == 1
+
+    for attempt in range(2, OUTBOX_MAX_ATTEMPTS + 1):
+        make_due(email)
+        deliver_outbox()
+        assert email.attempts == attempt
+    assert email.status == 'failed'
+    make_due(email)
+    deliver_outbox()
+    assert email.attempts == OUTBOX_MAX_ATTEMPTS
+
+
+def test_refused_connection_reschedules_whole_batch(smtp, user):
+    smtp.refuse = True
+    queue(user, 'one', 'two')
+    assert deliver_outbox() == 0
+    assert [(e.status, e.attempts) for e in OutboxEmail.query] == [('pending', 1), ('pending', 1)]
+
+    smtp.refuse = False
+    for email in OutboxEmail.query:
+        make_due(email)
+    assert deliver_outbox() == 2
@@ -0,0 +1,46 @@
+from datetime import date, timedelta
+
+from app import advance_due_date, post_due_recurring
+from models import Expense, RecurringExpense, db
+
+
+def add_recurring(user, next_due, frequency='monthly', is_active=True):
+    item = RecurringExpense(user_id=user.id, name='Rent', amount=500, category='Rent', frequency=frequency,
+                            next_due=next_due, due_day=next_due.day, is_active=is_active)
+    db.session.add(item)
+    db.session.commit()
+    return item
+
+
+def test_advance_due_date_clamps_to_month_end_and_returns_to_due_day():
+    assert advance_due_date(date(2026, 1, 31), 'monthly', 31) == date(2026, 2, 28)
+    assert advance_due_date(date(2026, 2, 28), 'monthly', 31) == date(2026, 3, 31)
+    assert advance_due_date(date(2024, 2, 29), 'yearly', 29) == date(2025, 2, 28)
+    assert advance_due_date(date(2026, 1, 1), 'weekly') == date(2026, 1, 8)
+
+
+def test_posting_catches_up_missed_occurrences_once(app, user):
+    item = add_recurring(user, date(2026, 7, 5))
+    stats = post_due_recurring(today=date(2026, 10, 10))
+    assert stats == {'items': 1, 'posted': 4, 'skipped': 0}
+    assert item.next_due == date(2026, 11, 5)
+    assert sorted(e.date for e in Expense.query.all()) == [date(2026, m, 5) for m in (7, 8, 9, 10)]
+
+    assert post_due_recurring(today=date(2026, 10, 10))['posted'] == 0
+    assert Expense.query.count() == 4
+
+
+def test_paused_items_are_not_posted(app, user):
+    add_recurring(user, date(2026, 9, 1), is_active=False)
+    assert post_due_recurring(today=date(2026, 10, 10))['posted'] == 0
+
+
+def test_resuming_skips_occurrences_missed_while_paused(client, user):
+    today = date.today()
+    item = add_recurring(user, today - timedelta(weeks=10), frequency='weekly', is_active=False)
+    client.post(f'/toggle_recurring/{item.id}')
+    db.session.refresh(item)
+    assert item.is_active and item.next_due == today
+
+    assert post_due_recurring(today=today)['posted'] == 1
+    assert item.next_due == today + timedelta(weeks=1)
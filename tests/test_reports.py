@@ -0,0 +1,40 @@
+import os
+import time
+from concurrent.futures import wait
+
+import pytest
+
+import app as money_mate
+from app import report_artifact_path, request_report
+
+
+@pytest.fixture
+def report_dir(app, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'REPORT_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(money_mate, '_report_jobs', {})
+    return tmp_path
+
+
+def test_finished_render_is_forgotten(client, user, report_dir):
+    status, key = request_report(user.id, '₹')
+    assert status == 'pending'
+    future = money_mate._report_jobs.get(key)
+    if future is not None:
+        wait([future], timeout=30)
+    assert os.path.exists(report_artifact_path(user.id, '₹', key))
+    # Done-callbacks run just after waiters are woken
+    deadline = time.monotonic() + 2
+    while key in money_mate._report_jobs and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert key not in money_mate._report_jobs
+    assert request_report(user.id, '₹') == ('ready', key)
+
+
+def test_failed_render_is_reported_once(client, user, report_dir, monkeypatch):
+    def broken(*args):
+        raise RuntimeError('reportlab exploded')
+    monkeypatch.setattr(money_mate, 'build_pdf_report', broken)
+    status, key = request_report(user.id, '₹')
+    wait([money_mate._report_jobs[key]], timeout=30)
+    assert request_report(user.id, '₹') == ('failed', key)
+    assert key not in money_mate._report_jobs
@@ -0,0 +1,44 @@
+from datetime import date
+from decimal import Decimal
+
+from app import (import_statement, post_due_recurring, rebuild_category_month_totals, rebuild_expense_categories,
+                 rebuild_monthly_rollups)
+from models import CategoryMonthTotal, Expense, ExpenseCategory, MonthlyRollup, RecurringExpense, db
+
+
+def derived_state():
+    return (
+        {(r.user_id, r.month_start): (r.expense_total, r.expense_count, r.income_total, r.income_count)
+         for r in MonthlyRollup.query if r.expense_count or r.income_count},
+        {(c.user_id, c.name): c.expense_count for c in ExpenseCategory.query if c.expense_count},
+        {(t.user_id, t.category, t.month_start): (t.total, t.expense_count)
+         for t in CategoryMonthTotal.query if t.expense_count},
+    )
+
+
+def test_running_totals_match_a_rebuild_after_every_kind_of_write(client, user):
+    def add(day, category, amount):
+        client.post('/', data={'date': day.isoformat(), 'category': category, 'amount': amount,
+                               'note': '', 'payment_method': 'cash'})
+        return Expense.query.order_by(Expense.id.desc()).first()
+
+    first = add(date(2026, 1, 31), 'Food', '12.50')
+    second = add(date(2026, 2, 1), 'Travel', '40')
+    add(date(2026, 2, 3), 'Food', '7.25')
+    client.post('/income', data={'date': '2026-02-10', 'source': 'Salary', 'amount': '1000', 'note': ''})
+    client.post(f'/edit/{first.id}', data={'date': '2026-03-01', 'category': 'Rent', 'amount': '500',
+                                           'note': '', 'payment_method': 'cash'})
+    client.post(f'/delete/{second.id}')
+    list(import_statement(user.id, [{'date': date(2026, 2, 14), 'amount': Decimal('-19.99'), 'note': 'cinema',
+                                     'category': 'Fun', 'payment_method': None}]))
+    db.session.add(RecurringExpense(user_id=user.id, name='Gym', amount=30, category='Health', frequency='monthly',
+                                    next_due=date(2026, 1, 15), due_day=15, is_active=True))
+    db.session.commit()
+    post_due_recurring(today=date(2026, 3, 20))
+
+    running = derived_state()
+    assert [len(table) for table in running] == [3, 4, 6]
+    rebuild_monthly_rollups()
+    rebuild_expense_categories()
+    rebuild_category_month_totals()
+    assert derived_state() == running
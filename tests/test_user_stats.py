@@ -0,0 +1,66 @@
+from datetime import date
+
+from app import get_user_stats
+from models import Achievement, Expense, ExpenseDay, UserStats, db
+
+
+def add_raw_expense(user, day, amount=10, category='Food'):
+    """An expense written without going through the derived-table hooks, like data from before the upgrade"""
+    expense = Expense(user_id=user.id, date=day, category=category, amount=amount, note='', payment_method='cash')
+    db.session.add(expense)
+    db.session.commit()
+    return expense
+
+
+def expense_days(user):
+    return {d.day: d.expense_count for d in ExpenseDay.query.filter_by(user_id=user.id) if d.expense_count}
+
+
+def edit(client, expense, day, amount=10, category='Food'):
+    return client.post(f'/edit/{expense.id}', data={'date': day.isoformat(), 'category': category,
+                                                     'amount': str(amount), 'note': '', 'payment_method': 'cash'})
+
+
+def test_first_write_after_upgrade_is_an_edit(client, user):
+    expense = add_raw_expense(user, date(2026, 3, 1))
+    assert UserStats.query.filter_by(user_id=user.id).first() is None
+
+    edit(client, expense, date(2026, 3, 2))
+    stats = UserStats.query.filter_by(user_id=user.id).one()
+    assert stats.expense_count == 1 and stats.expense_days == 1
+    assert expense_days(user) == {date(2026, 3, 2): 1}
+
+
+def test_edit_and_delete_move_day_counters(client, user):
+    first = add_raw_expense(user, date(2026, 3, 1))
+    add_raw_expense(user, date(2026, 3, 1))
+    get_user_stats(user.id)
+    assert expense_days(user) == {date(2026, 3, 1): 2}
+
+    edit(client, first, date(2026, 3, 2))
+    stats = UserStats.query.filter_by(user_id=user.id).one()
+    assert stats.expense_count == 2 and stats.expense_days == 2
+    assert expense_days(user) == {date(2026, 3, 1): 1, date(2026, 3, 2): 1}
+
+    client.post(f'/delete/{first.id}')
+    db.session.refresh(stats)
+    assert stats.expense_count == 1 and stats.expense_days == 1
+    assert expense_days(user) == {date(2026, 3, 1): 1}
+
+
+def test_delete_as_first_write_after_upgrade(client, user):
+    expense = add_raw_expense(user, date(2026, 3, 1))
+    add_raw_expense(user, date(2026, 3, 5))
+
+    client.post(f'/delete/{expense.id}')
+    stats = UserStats.query.filter_by(user_id=user.id).one()
+    assert stats.expense_count == 1 and stats.expense_days == 1
+    assert expense_days(user) == {date(2026, 3, 5): 1}
+
+
+def test_analytics_visits_unlock_badge_once(client, user):
+    for _ in range(12):
+        assert client.get('/analytics').status_code == 200
+    stats = UserStats.query.filter_by(user_id=user.id).one()
+    assert stats.analytics_visits == 12
+    assert Achievement.query.filter_by(user_id=user.id, badge_key='analytics_pro').count() == 1